@@ -1,33 +1,243 @@
-from fastapi import FastAPI, File, UploadFile
+import time
+IMPORT_START = time.perf_counter()  # startup timings below are measured from here
+
+from fastapi import FastAPI, File, HTTPException, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List
+import asyncio
+import json
+import logging
+import math
+import os
+import tarfile
+import zipfile
 import torch
 import torch.nn.functional as F
 import numpy as np
-import librosa
-import io
-from transformers import Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor
-import soundfile as sf
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from batching import MicroBatcher, QueueFullError, length_groups
+from cache import PredictionCache
+from metrics import Counter, Gauge, Histogram, Registry, process_rss_bytes
+from model_registry import ModelRegistry
+from preprocessing import (
+    PCM_DTYPES, UploadLimitError, condition_window, decode_pcm, expand_uploads, preprocess_audio_timed,
+    preprocess_pcm_timed
+)
+from streaming import EncoderFrameCache, RingBuffer, supports_frame_reuse
+from training.cascade import Cascade
+from training.resampling import get_resampler
 
 # ===================================================== #
 # Config
 # ===================================================== #
-MODEL_PATH = "manelbrh1342/emotion-recognition-model"  # Hugging Face model repo
+MODEL_PATH = os.environ.get("MODEL_PATH", "manelbrh1342/emotion-recognition-model")  # Hugging Face repo or local dir
 TARGET_SR = 16000
 DURATION = 4  # seconds
 MAX_LENGTH = TARGET_SR * DURATION
-TARGET_dB = -25  # target loudness for normalization
+
+# Cut leading/trailing silence and normalize loudness before inference (same steps as BaseSERDataset).
+# Off by default: the served v6 model was trained without them. Turn them on only for a model trained
+# with config.TRIM_SILENCE / NORMALIZE_LOUDNESS; every endpoint then applies them to each clip or window.
+TRIM_SILENCE = os.environ.get("TRIM_SILENCE", "0") == "1"
+NORMALIZE_LOUDNESS = os.environ.get("NORMALIZE_LOUDNESS", "0") == "1"
+
+# Inference engine: eager (fp32), int8 (dynamic quantization), onnx (onnxruntime) or early_exit
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "eager")
+ONNX_PATH = os.environ.get("ONNX_PATH", "model.onnx")  # from `python engines.py export`
+EXIT_HEADS_PATH = os.environ.get("EXIT_HEADS_PATH", "exit_heads.pt")  # from `python -m training.exit_heads`
+EXIT_THRESHOLD = float(os.environ.get("EXIT_THRESHOLD", 0.9))  # stop at the first exit this confident
+
+# Model registry manifest (see model_registry.py). With a "cascade" section, a cheap first-stage model
+# answers confident clips and only the rest reach Wav2Vec2; CASCADE_THRESHOLD overrides the calibrated one.
+MODEL_REGISTRY = os.environ.get("MODEL_REGISTRY")
+CASCADE_THRESHOLD = os.environ.get("CASCADE_THRESHOLD")
+
+# Startup: weights load in the background once the server is up; /ready turns 200 after warmup
+WARMUP_SECONDS = [float(x) for x in os.environ.get("WARMUP_SECONDS", "1,4").split(",") if x]
+WARMUP_ROUNDS = int(os.environ.get("WARMUP_ROUNDS", 2))
+
+# Executors: decode/resample and model forwards run off the event loop.
+# PREPROCESS_WORKERS=0 keeps decoding inline on the loop (old behaviour).
+PREPROCESS_POOL = os.environ.get("PREPROCESS_POOL", "thread")  # thread | process
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", 2))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 1))
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", 0))  # intra-op; 0 = torch default
+TORCH_INTEROP_THREADS = int(os.environ.get("TORCH_INTEROP_THREADS", 0))  # 0 = torch default
+
+# Micro-batching: requests arriving within BATCH_MAX_WAIT_MS share one forward
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 10))
+BATCH_QUEUE_SIZE = int(os.environ.get("BATCH_QUEUE_SIZE", 64))  # beyond this → 503
+
+# Prediction cache keyed by waveform hash + model revision (CACHE_MAX_ENTRIES=0 disables memory tier)
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 3600))
+CACHE_DIR = os.environ.get("CACHE_DIR")  # optional on-disk tier
+
+# Bulk scoring (/predict_batch): limits on files per request and total uncompressed bytes
+BULK_MAX_FILES = int(os.environ.get("BULK_MAX_FILES", 1000))
+BULK_MAX_BYTES = int(os.environ.get("BULK_MAX_BYTES", 512 * 1024 * 1024))
+
+# Opt-in torch profiler traces for `/predict?profile=true` (written to PROFILE_DIR)
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+# Long audio: DURATION-second windows (training length), WINDOW_HOP seconds apart
+WINDOW_HOP = float(os.environ.get("WINDOW_HOP", 2))
+WINDOW_BATCH_SIZE = int(os.environ.get("WINDOW_BATCH_SIZE", 8))  # windows per forward
+
+# Streaming: emit a new distribution over the latest window every STREAM_UPDATE_MS of audio
+STREAM_UPDATE_MS = int(os.environ.get("STREAM_UPDATE_MS", 500))
+
+# Client sample rates accepted by /stream and /predict_pcm (each one gets a cached resampling filter)
+SAMPLE_RATES = tuple(int(x) for x in os.environ.get(
+    "SAMPLE_RATES", "8000,11025,16000,22050,24000,32000,44100,48000").split(",") if x)
+MIN_SAMPLES = 400  # receptive field of the Wav2Vec2 conv feature encoder (one 25 ms frame at 16 kHz)
+
+# Raw PCM uploads (/predict_pcm): longest clip, which bounds the body size
+PCM_MAX_SECONDS = float(os.environ.get("PCM_MAX_SECONDS", 60))
 
 # ===================================================== #
 # FastAPI initialization
 # ===================================================== #
 app = FastAPI()
+logger = logging.getLogger("uvicorn.error")
+
+# ===================================================== #
+# Metrics (Prometheus text format at /metrics)
+# ===================================================== #
+registry = Registry()
+STAGE_SECONDS = Histogram("ser_stage_seconds", "Latency of each /predict pipeline stage", registry)
+REQUEST_SECONDS = Histogram("ser_request_seconds", "End-to-end HTTP request latency", registry)
+INPUT_DURATION = Histogram(
+    "ser_input_duration_seconds", "Duration of decoded uploads", registry,
+    buckets=(0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300, 600)
+)
+TRIMMED_SECONDS = Histogram(
+    "ser_trimmed_seconds", "Leading/trailing silence removed per upload", registry,
+    buckets=(0, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30)
+)
+BATCH_SIZE = Histogram("ser_batch_size", "Waveforms per model forward", registry, buckets=(1, 2, 4, 8, 16, 32, 64))
+IN_FLIGHT = Gauge("ser_inflight_requests", "HTTP requests currently being served", registry)
+STREAM_SESSIONS = Gauge("ser_stream_sessions", "Open /stream WebSocket sessions", registry)
+QUEUE_DEPTH = Gauge("ser_queue_depth", "Requests waiting in the micro-batching queue", registry,
+                    fn=lambda: batcher.stats()["queue_depth"])
+CACHE_HIT_RATIO = Gauge("ser_cache_hit_ratio", "Prediction cache hit ratio since start", registry,
+                        fn=lambda: prediction_cache.stats()["hit_rate"] if prediction_cache else 0.0)
+EXIT_LAYERS = Gauge("ser_early_exit_avg_layers", "Mean transformer layers run per clip (early_exit engine)",
+                    registry, fn=lambda: engine.avg_layers() if hasattr(engine, "avg_layers") else 0.0)
+RSS_BYTES = Gauge("process_resident_memory_bytes", "Resident memory of the server process", registry,
+                  fn=process_rss_bytes)
+PROFILES = Counter("ser_profiles_total", "Profiler traces written", registry)
+CASCADE_CLIPS = Counter("ser_cascade_clips_total", "Clips scored by the cascade's first stage", registry)
+CASCADE_ESCALATIONS = Counter("ser_cascade_escalations_total", "Cascade clips escalated to Wav2Vec2", registry)
+REJECTED = Counter("ser_rejected_requests_total", "Requests rejected with 503 (queue full)", registry)
+
+# ===================================================== #
+# Thread and process pools
+# ===================================================== #
+if TORCH_NUM_THREADS:
+    torch.set_num_threads(TORCH_NUM_THREADS)
+if TORCH_INTEROP_THREADS:
+    torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+
+if PREPROCESS_WORKERS == 0:
+    preprocess_pool = None
+elif PREPROCESS_POOL == "process":
+    # spawn: workers import only preprocessing.py, never the model
+    preprocess_pool = ProcessPoolExecutor(PREPROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+else:
+    preprocess_pool = ThreadPoolExecutor(PREPROCESS_WORKERS, thread_name_prefix="preprocess")
+inference_pool = ThreadPoolExecutor(INFERENCE_WORKERS, thread_name_prefix="inference")
+# Raw PCM is already decoded; keep it in threads so bodies are never pickled to worker processes
+if isinstance(preprocess_pool, ProcessPoolExecutor):
+    pcm_pool = ThreadPoolExecutor(PREPROCESS_WORKERS, thread_name_prefix="pcm")
+else:
+    pcm_pool = preprocess_pool
+
+async def run_in_pool(pool, fn, *args):
+    """Run fn in the given executor, or inline when the pool is disabled."""
+    if pool is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
 
 # ===================================================== #
-# Load model + processor
+# Load model + processor (in the background, see /ready)
 # ===================================================== #
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = Wav2Vec2ForSequenceClassification.from_pretrained(MODEL_PATH).to(device)
-processor = Wav2Vec2FeatureExtractor.from_pretrained(MODEL_PATH)
-model.eval()
+engine = model = processor = prediction_cache = cascade = None  # set by load_model()
+models = None  # ModelRegistry, set by load_model()
+startup = {"ready": False, "error": None, "import_seconds": None}
+
+def load_model():
+    """Load weights + feature extractor (and cascade first stage), build the prediction cache and warm up."""
+    global engine, model, processor, prediction_cache, cascade, models
+    from transformers import Wav2Vec2FeatureExtractor  # deferred: importing transformers takes seconds
+
+    start = time.perf_counter()
+    models = ModelRegistry.from_file(MODEL_REGISTRY) if MODEL_REGISTRY else ModelRegistry()
+    # Wav2Vec2 comes from MODEL_PATH / INFERENCE_ENGINE unless the manifest names one
+    spec = models.setdefault("wav2vec2", {
+        "format": "wav2vec2", "path": MODEL_PATH, "engine": INFERENCE_ENGINE, "onnx_path": ONNX_PATH,
+        "exit_heads_path": EXIT_HEADS_PATH, "exit_threshold": EXIT_THRESHOLD
+    })
+    engine = models.get("wav2vec2", device)
+    model = engine.model  # PyTorch module, or None for the onnx engine
+    model_path = models.resolve(spec["path"])
+    processor = Wav2Vec2FeatureExtractor.from_pretrained(model_path)
+
+    # Revision = repo/dir + resolved hub commit (if any) + engine, since int8/onnx/early-exit logits differ
+    engine_name = spec.get("engine", "eager")
+    model_revision = f"{model_path}@{getattr(engine.config, '_commit_hash', None)}:{engine_name}"
+    if engine_name == "early_exit":
+        model_revision += f"@{engine.threshold}:{os.path.getmtime(spec['exit_heads_path'])}"
+
+    if models.cascade:
+        settings = models.cascade
+        if settings.get("fallback", "wav2vec2") != "wav2vec2":
+            raise ValueError("The cascade fallback must be the served Wav2Vec2 model ('wav2vec2')")
+        cascade = Cascade(
+            models.get(settings["first"], device),
+            threshold=float(CASCADE_THRESHOLD or settings["threshold"]),
+            criterion=settings.get("criterion", "margin"),
+            input_samples=models.specs[settings["first"]].get("input_samples", MAX_LENGTH)
+        )
+        model_revision += f"|{models.revision(settings['first'])}:{cascade.criterion}>={cascade.threshold}"
+        calibrated = (settings.get("trim_silence", False), settings.get("normalize_loudness", False))
+        if calibrated != (TRIM_SILENCE, NORMALIZE_LOUDNESS):
+            logger.warning("Cascade threshold was calibrated with TRIM_SILENCE=%d NORMALIZE_LOUDNESS=%d, "
+                           "but serving uses %d / %d", *calibrated, TRIM_SILENCE, NORMALIZE_LOUDNESS)
+    prediction_cache = PredictionCache(
+        model_revision,
+        max_entries=CACHE_MAX_ENTRIES,
+        ttl_seconds=CACHE_TTL_SECONDS,
+        disk_dir=CACHE_DIR
+    )
+    loaded = time.perf_counter()
+    warmup()
+    startup.update(
+        ready=True,
+        load_seconds=loaded - start,
+        warmup_seconds=time.perf_counter() - loaded,
+        ready_seconds=time.perf_counter() - IMPORT_START
+    )
+    logger.info("Model ready: %s", startup)
+
+def warmup():
+    """Dummy forwards at typical lengths so the first request skips allocator and kernel warmup."""
+    rng = np.random.default_rng(0)
+    for _ in range(WARMUP_ROUNDS):
+        for seconds in WARMUP_SECONDS:
+            audio = 0.1 * rng.standard_normal(int(seconds * TARGET_SR), dtype=np.float32)
+            run_wav2vec2([audio])  # directly, since noise may never escalate past a cascade
+            if cascade is not None:
+                cascade.screen([audio])
+
+def ensure_ready():
+    if not startup["ready"]:
+        detail = f"Model failed to load: {startup['error']}" if startup["error"] else "Model is loading"
+        raise HTTPException(status_code=503, detail=detail)
 
 # Correct label order (same as LabelEncoder in training)
 emotion_labels = [
@@ -44,28 +254,126 @@ emotion_labels = [
 # ===================================================== #
 # Helpers
 # ===================================================== #
-def normalize_volume(audio, target_dB=-25):
-    """Normalize RMS loudness of the audio to target dB."""
-    rms = np.sqrt(np.mean(audio**2))
-    if rms < 1e-6:  # avoid division by zero
-        return audio
-    scalar = 10 ** (target_dB / 20) / rms
-    audio = audio * scalar
-    # Clip to valid range [-1, 1]
-    return np.clip(audio, -1.0, 1.0)
+def run_model(audios):
+    """Score a list of waveforms (through the cascade if configured); returns (batch, n_labels) probabilities."""
+    BATCH_SIZE.observe(len(audios))
+    if cascade is None:
+        return run_wav2vec2(audios)
+    with STAGE_SECONDS.time(stage="cascade_first"):
+        probs, confident = cascade.screen(audios)
+    unsure = np.flatnonzero(~confident)
+    CASCADE_CLIPS.inc(len(audios))
+    if len(unsure):
+        CASCADE_ESCALATIONS.inc(len(unsure))
+        probs[unsure] = run_wav2vec2([audios[i] for i in unsure])
+    return probs
 
-TARGET_SR = 16000
+def padding_changes_outputs(config):
+    """
+    GroupNorm in the conv feature encoder (feat_extract_norm="group", e.g. wav2vec2-base)
+    normalizes over the padded length, so a padded clip's output depends on its batch-mates.
+    """
+    return getattr(config, "feat_extract_norm", "group") == "group"
+
+def run_wav2vec2(audios):
+    """Run Wav2Vec2 over a list of waveforms; returns (batch, n_labels) probabilities."""
+    if len({len(a) for a in audios}) > 1 and padding_changes_outputs(engine.config):
+        # One forward per distinct length: results match scoring each clip alone
+        order, parts = [], []
+        for group in length_groups(audios):
+            order.extend(group)
+            parts.append(run_wav2vec2([audios[i] for i in group]))
+        parts = np.concatenate(parts)
+        probs = np.empty_like(parts)
+        probs[order] = parts
+        return probs
+    with STAGE_SECONDS.time(stage="feature_extraction"):
+        inputs = processor(
+            [np.asarray(a, dtype=np.float32) for a in audios],
+            sampling_rate=TARGET_SR,
+            padding=True,
+            return_attention_mask=True,
+            return_tensors="pt"
+        )
+    with STAGE_SECONDS.time(stage="forward"):
+        logits = engine(inputs)
+    with STAGE_SECONDS.time(stage="softmax"):
+        return F.softmax(logits, dim=-1).numpy()
 
-def preprocess_audio(file_bytes):
-    # Read directly from webm
-    audio, sr = sf.read(io.BytesIO(file_bytes))
-    # Resample
-    if sr != TARGET_SR:
-        audio = librosa.resample(audio.T, orig_sr=sr, target_sr=TARGET_SR)
-    # If stereo → take mono
-    if audio.ndim > 1:
-        audio = librosa.to_mono(audio)
+def run_model_profiled(audio):
+    """Single-clip forward under torch.profiler; returns (probabilities, chrome trace path)."""
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    with torch.profiler.profile(activities=activities, record_shapes=True) as prof:
+        probs = run_model([audio])[0]
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"predict-{time.time_ns()}.json")
+    prof.export_chrome_trace(path)
+    PROFILES.inc()
+    return probs, path
+
+def format_prediction(probs):
+    """Response schema shared by the prediction endpoints."""
+    return {
+        "prediction": emotion_labels[int(np.argmax(probs))],
+        "probabilities": {label: float(p) for label, p in zip(emotion_labels, probs)}
+    }
+
+async def preprocess(contents, trim=TRIM_SILENCE, normalize=NORMALIZE_LOUDNESS):
+    """Decode + resample (+ trim/normalize) in the preprocessing pool, recording latency and durations."""
+    return record_preprocessing(*await run_in_pool(
+        preprocess_pool, preprocess_audio_timed, contents, trim, normalize
+    ), trim)
+
+def record_preprocessing(audio, trimmed, timings, trim):
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    INPUT_DURATION.observe(len(audio) / TARGET_SR + trimmed)
+    if trim:
+        TRIMMED_SECONDS.observe(trimmed)
     return audio
+
+async def load_upload(file, trim=TRIM_SILENCE, normalize=NORMALIZE_LOUDNESS):
+    """Read and preprocess an upload."""
+    with STAGE_SECONDS.time(stage="upload_read"):
+        contents = await file.read()
+    return await preprocess(contents, trim, normalize)
+
+def prepare_window(audio):
+    """The trim / normalize steps uploads get, for one window of a recording (/predict_timeline, /stream)."""
+    return condition_window(audio, TRIM_SILENCE, NORMALIZE_LOUDNESS)[0]
+
+def sliding_windows(n_samples, window=MAX_LENGTH, hop=None):
+    """
+    Return (start, end) sample offsets of overlapping windows covering n_samples.
+    The last window is aligned to the end of the clip so every window is full length;
+    clips shorter than one window yield a single window.
+    """
+    hop = hop or int(WINDOW_HOP * TARGET_SR)
+    if n_samples <= window:
+        return [(0, n_samples)]
+    starts = list(range(0, n_samples - window + 1, hop))
+    if starts[-1] + window < n_samples:
+        starts.append(n_samples - window)
+    return [(s, s + window) for s in starts]
+
+def run_windows(audio, windows):
+    """Score windows WINDOW_BATCH_SIZE at a time so peak memory does not grow with clip length."""
+    probs = []
+    for i in range(0, len(windows), WINDOW_BATCH_SIZE):
+        chunk = windows[i:i + WINDOW_BATCH_SIZE]
+        probs.append(run_model([prepare_window(audio[s:e]) for s, e in chunk]))
+    return np.concatenate(probs)
+
+batcher = MicroBatcher(
+    run_model,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_queue_size=BATCH_QUEUE_SIZE,
+    executor=inference_pool
+)
+
 # ===================================================== #
 # Routes
 # ===================================================== #
@@ -73,27 +381,295 @@ def preprocess_audio(file_bytes):
 def root():
     return {"message": "Emotion recognition API is running 🚀"}
 
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            path=route.path if route else "unmatched",
+            status=status
+        )
+
+async def load_in_background():
+    try:
+        await run_in_pool(inference_pool, load_model)
+    except Exception as e:
+        startup["error"] = repr(e)
+        logger.exception("Model failed to load")
+
+@app.on_event("startup")
+async def on_startup():
+    startup["import_seconds"] = time.perf_counter() - IMPORT_START
+    await batcher.start()
+    app.state.loader = asyncio.create_task(load_in_background())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await batcher.stop()
+    inference_pool.shutdown(wait=False)
+    if preprocess_pool is not None:
+        preprocess_pool.shutdown(wait=False)
+    if pcm_pool is not preprocess_pool:
+        pcm_pool.shutdown(wait=False)
+
+@app.get("/ready")
+def ready(response: Response):
+    """Readiness probe: 503 until weights are loaded and warmed up. `/` stays the liveness check."""
+    if not startup["ready"]:
+        response.status_code = 503
+    return startup
+
+@app.get("/stats/batching")
+def batching_stats():
+    return batcher.stats()
+
+@app.get("/stats/cache")
+def cache_stats():
+    ensure_ready()
+    return prediction_cache.stats()
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+async def predict(response: Response, file: UploadFile = File(...), profile: bool = False):
+    if profile and not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled (set PROFILING_ENABLED=1)")
+    ensure_ready()
+
     # Load + preprocess audio
-    contents = await file.read()
-    audio = preprocess_audio(contents)
-
-    # Extract features
-    inputs = processor(
-        audio,
-        sampling_rate=TARGET_SR,
-        return_tensors="pt"
-    ).to(device)
-
-    # Run model
-    with torch.no_grad():
-        logits = model(**inputs).logits
-        probs = F.softmax(logits, dim=-1).cpu().numpy()[0]
-        pred_id = int(torch.argmax(logits, dim=-1).item())
-        pred_label = emotion_labels[pred_id]
+    audio = await load_upload(file)
+
+    if profile:
+        # Profiled requests bypass the cache and batcher so the trace covers one clip
+        probs, trace = await run_in_pool(inference_pool, run_model_profiled, audio)
+        response.headers["X-Profile-Trace"] = trace
+        return format_prediction(probs)
+    return await classify(response, audio)
+
+@app.post("/predict_pcm")
+async def predict_pcm(request: Request, response: Response):
+    """
+    Fast path for clients that already hold samples: the body is raw little-endian
+    mono PCM (no multipart form, no container to decode). Headers:
+        X-Sample-Rate: 16000
+        X-Sample-Format: float32 | int16   (default float32)
+    Returns the same schema as /predict.
+    """
+    ensure_ready()
+    dtype = request.headers.get("x-sample-format", "float32").lower()
+    if dtype not in PCM_DTYPES:
+        raise HTTPException(status_code=400, detail=f"X-Sample-Format must be one of {sorted(PCM_DTYPES)}")
+    try:
+        sample_rate = int(request.headers["x-sample-rate"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="X-Sample-Rate header (integer Hz) is required")
+    if sample_rate not in SAMPLE_RATES:
+        raise HTTPException(status_code=400, detail=f"X-Sample-Rate must be one of {SAMPLE_RATES}")
+
+    item_size = PCM_DTYPES[dtype].itemsize
+    max_bytes = int(PCM_MAX_SECONDS * sample_rate) * item_size
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Body exceeds {PCM_MAX_SECONDS:g} s of audio ({max_bytes} bytes)")
+    with STAGE_SECONDS.time(stage="upload_read"):
+        body = await read_body(request, max_bytes)
+    if len(body) % item_size:
+        raise HTTPException(status_code=400, detail=f"Body must be a whole number of {dtype} samples")
+    min_samples = math.ceil(MIN_SAMPLES * sample_rate / TARGET_SR)
+    if len(body) < min_samples * item_size:
+        raise HTTPException(status_code=400, detail=f"Body must hold at least {min_samples} samples (25 ms)")
+
+    try:
+        audio = record_preprocessing(*await run_in_pool(
+            pcm_pool, preprocess_pcm_timed, body, sample_rate, dtype, TRIM_SILENCE, NORMALIZE_LOUDNESS
+        ), TRIM_SILENCE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await classify(response, audio)
+
+async def read_body(request, max_bytes):
+    """Request body, rejected with 413 as soon as it grows past max_bytes (chunked uploads included)."""
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)  # a single chunk is returned as-is, without a copy
+
+async def classify(response, audio):
+    """Cache lookup, then a batched forward on a miss; shared by /predict and /predict_pcm."""
+    if len(audio) < MIN_SAMPLES:
+        raise HTTPException(status_code=400, detail="Audio is shorter than 25 ms after preprocessing")
+    # Same waveform + same model → reuse the stored result
+    key = prediction_cache.key(audio)
+    probs = await prediction_cache.lookup(key)
+    response.headers["X-Cache"] = "HIT" if probs is not None else "MISS"
+
+    # Queue for the next batched forward
+    if probs is None:
+        try:
+            probs = await batcher.submit(audio)
+        except QueueFullError as e:
+            REJECTED.inc()
+            raise HTTPException(status_code=503, detail=str(e))
+        await prediction_cache.store(key, probs)
+    if "first_prediction_seconds" not in startup:
+        startup["first_prediction_seconds"] = time.perf_counter() - IMPORT_START
+        logger.info("First prediction %.2fs after import", startup["first_prediction_seconds"])
+    return format_prediction(probs)
+
+@app.post("/predict_batch")
+async def predict_batch(files: List[UploadFile] = File(...)):
+    """
+    Score many clips in one request. Accepts several files and/or zip/tar archives;
+    clips are decoded concurrently, run through batched forwards as they become
+    ready and streamed back as NDJSON lines, in completion order:
+        {"index": 3, "file": "a.wav", "prediction": ..., "probabilities": {...}, "cached": false}
+        {"index": 4, "file": "b.wav", "error": "..."}
+    """
+    ensure_ready()
+    with STAGE_SECONDS.time(stage="upload_read"):
+        uploads = [(f.filename, await f.read()) for f in files]
+    try:
+        # Unpacking is I/O-bound and needs every upload's bytes: a thread, never the process pool
+        items = await asyncio.to_thread(expand_uploads, uploads, BULK_MAX_FILES, BULK_MAX_BYTES)
+    except UploadLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable archive: {e}")
+    del uploads
+
+    return StreamingResponse(stream_bulk_results(items), media_type="application/x-ndjson")
+
+async def stream_bulk_results(items):
+    ready = asyncio.Queue()
+    # Keep the preprocessing pool busy without decoding the whole request up front
+    decode_slots = asyncio.Semaphore(max(PREPROCESS_WORKERS, 1) * 2)
+
+    async def decode(index, name, data):
+        async with decode_slots:
+            try:
+                await ready.put((index, name, await preprocess(data), None))
+            except Exception as e:
+                await ready.put((index, name, None, f"Could not decode audio: {e}"))
+
+    def line(index, name, **fields):
+        return json.dumps({"index": index, "file": name, **fields}) + "\n"
+
+    tasks = [asyncio.create_task(decode(i, name, data)) for i, (name, data) in enumerate(items)]
+    try:
+        remaining = len(items)
+        while remaining:
+            # Whatever has finished decoding forms the next batch
+            group = [await ready.get()]
+            while len(group) < BATCH_MAX_SIZE and not ready.empty():
+                group.append(ready.get_nowait())
+            remaining -= len(group)
+
+            pending = []
+            for index, name, audio, error in group:
+                if error is not None:
+                    yield line(index, name, error=error)
+                    continue
+                key = prediction_cache.key(audio)
+                probs = await prediction_cache.lookup(key)
+                if probs is not None:
+                    yield line(index, name, **format_prediction(probs), cached=True)
+                else:
+                    pending.append((index, name, audio, key))
+            if not pending:
+                continue
+
+            pending.sort(key=lambda item: len(item[2]))  # similar lengths → less padding
+            batch_probs = await run_in_pool(inference_pool, run_model, [audio for _, _, audio, _ in pending])
+            for (index, name, _, key), probs in zip(pending, batch_probs):
+                await prediction_cache.store(key, probs)
+                yield line(index, name, **format_prediction(probs), cached=False)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/predict_timeline")
+async def predict_timeline(file: UploadFile = File(...)):
+    """Emotion timeline over overlapping DURATION-second windows plus a clip-level prediction."""
+    ensure_ready()
+    # Windows are cut from the untouched recording, so timestamps stay relative to it,
+    # and each one is then trimmed / normalized like an upload (run_windows)
+    audio = await load_upload(file, trim=False, normalize=False)
+
+    windows = sliding_windows(len(audio))
+    probs = await run_in_pool(inference_pool, run_windows, audio, windows)
+    clip_probs = probs.mean(axis=0)
 
     return {
-        "prediction": pred_label,
-        "probabilities": {label: float(p) for label, p in zip(emotion_labels, probs)}
-    }
\ No newline at end of file
+        **format_prediction(clip_probs),
+        "duration": len(audio) / TARGET_SR,
+        "timeline": [
+            {"start": s / TARGET_SR, "end": e / TARGET_SR, **format_prediction(p)}
+            for (s, e), p in zip(windows, probs)
+        ]
+    }
+
+@app.websocket("/stream")
+async def stream(ws: WebSocket, sample_rate: int = TARGET_SR, dtype: str = "float32"):
+    """
+    Real-time recognition over a WebSocket.
+    Client sends binary messages of little-endian mono PCM (`dtype` float32 or int16,
+    at `sample_rate`); server replies with JSON every STREAM_UPDATE_MS of received
+    audio, classifying the most recent DURATION seconds.
+    """
+    await ws.accept()
+    if dtype not in PCM_DTYPES or sample_rate not in SAMPLE_RATES:
+        await ws.close(code=1003, reason=f"dtype must be float32 or int16 and sample_rate one of {SAMPLE_RATES}")
+        return
+    if not startup["ready"]:
+        await ws.close(code=1013, reason="Model is loading")
+        return
+
+    cache = None
+    # Frame reuse runs on the raw ring; trimming or normalizing a window changes all of its frames
+    if model is not None and supports_frame_reuse(model) and not (TRIM_SILENCE or NORMALIZE_LOUDNESS):
+        cache = EncoderFrameCache(model, MAX_LENGTH, normalize=processor.do_normalize, device=engine.device)
+    ring = RingBuffer(cache.buffer_capacity(MAX_LENGTH) if cache else MAX_LENGTH)
+    resampler = get_resampler(sample_rate, TARGET_SR).stream()
+    update_every = TARGET_SR * STREAM_UPDATE_MS // 1000
+    next_update = update_every
+
+    STREAM_SESSIONS.inc()
+    try:
+        while True:
+            chunk = resampler.push(decode_pcm(await ws.receive_bytes(), dtype))
+            ring.write(chunk)
+            if cache:
+                cache.observe(chunk)
+            if ring.total < max(next_update, MIN_SAMPLES):
+                continue  # no window shorter than one encoder frame reaches the model
+            next_update = ring.total + update_every
+
+            if cache:
+                probs = await run_in_pool(inference_pool, cache.classify, ring)
+                if probs is None:
+                    continue
+            else:
+                try:
+                    probs = await batcher.submit(prepare_window(ring.latest(MAX_LENGTH)))
+                except QueueFullError:
+                    continue  # drop this update; the next one covers the same audio
+            await ws.send_json({"time": ring.total / TARGET_SR, **format_prediction(probs)})
+    except WebSocketDisconnect:
+        pass
+    except ValueError as e:  # a partial int16 sample or non-finite float32 samples
+        await ws.close(code=1007, reason=str(e))
+    finally:
+        STREAM_SESSIONS.dec()
@@ -0,0 +1,120 @@
+"""
+batching.py — Dynamic micro-batching for the inference endpoint
+---------------------------------------------------------------
+Collects concurrent requests into a bounded asyncio queue and runs them
+through the model as one padded batch, once either `max_batch_size`
+requests are waiting or `max_wait_ms` has passed since the first one.
+length_groups splits a batch by clip length, for models whose outputs
+change with padding (see app.run_wav2vec2).
+"""
+
+import asyncio
+from collections import Counter
+
+
+def length_groups(items):
+    """Indices of items grouped by len(), in first-seen order: sub-batches that need no padding."""
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(len(item), []).append(i)
+    return list(groups.values())
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at capacity (maps to HTTP 503)."""
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10, max_queue_size=64, executor=None):
+        """
+        - run_batch: blocking callable, list of inputs -> sequence of outputs (same order)
+        - max_batch_size: upper bound on the number of requests per forward
+        - max_wait_ms: how long the first request of a batch waits for company
+        - max_queue_size: pending requests allowed before new ones are rejected
+        - executor: where run_batch executes (None = the loop's default thread pool)
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.executor = executor
+        self._queue = None
+        self._worker = None
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._rejected = 0
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, item):
+        """Queue one input and wait for its output."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise QueueFullError(f"Inference queue is full ({self.max_queue_size} pending requests)")
+        return await future
+
+    async def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Requests whose client went away are not worth a forward pass
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            self._batch_sizes[len(batch)] += 1
+            self._requests += len(batch)
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.run_batch, [item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def stats(self):
+        """Batch-size histogram and queue counters."""
+        batches = sum(self._batch_sizes.values())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self._requests,
+            "rejected": self._rejected,
+            "batches": batches,
+            "mean_batch_size": self._requests / batches if batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+        }
@@ -0,0 +1,69 @@
+"""
+common.py — Shared helpers for the backend benchmarks
+-----------------------------------------------------
+Synthetic audio, latency summaries and a small randomly initialised
+Wav2Vec2 classifier so benchmarks run offline and reproducibly.
+"""
+
+import io
+import os
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_clip(seconds, sample_rate, channels, seed=0, fmt="WAV"):
+    """Encoded noise clip (bytes) with the given length, rate and channel count."""
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    audio = (0.1 * rng.standard_normal((int(seconds * sample_rate), channels))).astype(np.float32)
+    buf = io.BytesIO()
+    sf.write(buf, audio, sample_rate, format=fmt)
+    return buf.getvalue()
+
+
+def summarize(latencies):
+    ms = np.asarray(latencies) * 1000
+    if len(ms) == 0:
+        return {"count": 0}
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def build_tiny_model(out_dir, hidden_size=64, num_layers=2, num_heads=4, num_labels=8, seed=0):
+    """
+    Save a randomly initialised Wav2Vec2ForSequenceClassification + feature extractor.
+    The convolutional front end keeps wav2vec2-base's kernels and strides, so
+    sequence lengths (and hence attention cost scaling) match the real model.
+    """
+    import torch
+    from transformers import Wav2Vec2Config, Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+
+    torch.manual_seed(seed)
+    config = Wav2Vec2Config(
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=num_heads,
+        intermediate_size=hidden_size * 4,
+        conv_dim=(hidden_size,) * 7,
+        num_conv_pos_embeddings=16,
+        classifier_proj_size=hidden_size,
+        num_labels=num_labels,
+    )
+    Wav2Vec2ForSequenceClassification(config).save_pretrained(out_dir)
+    Wav2Vec2FeatureExtractor(return_attention_mask=False).save_pretrained(out_dir)
+    return out_dir
+
+
+def peak_rss_bytes():
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB on Linux
@@ -0,0 +1,104 @@
+"""
+concurrency.py — Event-loop blocking benchmark for /predict
+-----------------------------------------------------------
+Runs the app in-process (httpx ASGI transport) once per executor
+configuration, fires concurrent /predict uploads and probes the `/` health
+check alongside them. Work done on the event loop shows up directly as
+health-check and p99 latency.
+
+Usage (from backend/):
+    MODEL_PATH=<hf repo or dir> python benchmarks/concurrency.py --concurrency 16 --requests 96
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from common import BACKEND_DIR, make_clip, summarize
+
+# "inline" reproduces the old behaviour: decode + resample on the event loop
+CONFIGS = {
+    "inline": {"PREPROCESS_WORKERS": "0"},
+    "thread": {"PREPROCESS_POOL": "thread"},
+    "process": {"PREPROCESS_POOL": "process"},
+}
+
+
+async def run_load(args):
+    import httpx
+
+    sys.path.insert(0, BACKEND_DIR)
+    import app as server
+
+    server.load_model()
+    clip = make_clip(args.seconds, args.sample_rate, args.channels)
+    files = {"file": ("clip.wav", clip, "audio/wav")}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        (await client.post("/predict", files=files)).raise_for_status()  # warmup
+
+        predict_latencies, health_latencies = [], []
+        done = asyncio.Event()
+
+        async def worker(n):
+            for _ in range(n):
+                start = time.perf_counter()
+                (await client.post("/predict", files=files)).raise_for_status()
+                predict_latencies.append(time.perf_counter() - start)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        per_worker = max(args.requests // args.concurrency, 1)
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(per_worker) for _ in range(args.concurrency)])
+        wall = time.perf_counter() - start
+        done.set()
+        await probe_task
+        await server.on_shutdown()
+
+    return {
+        "throughput_rps": len(predict_latencies) / wall,
+        "predict": summarize(predict_latencies),
+        "health": summarize(health_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=96)
+    parser.add_argument("--seconds", type=float, default=4.0, help="Clip length")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Upload sample rate (≠16000 forces a resample)")
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="Comma-separated subset of " + ", ".join(CONFIGS))
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)  # child mode: one configuration
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(asyncio.run(run_load(args))))
+        return
+
+    results = {}
+    for name in args.configs.split(","):
+        env = {**os.environ, **CONFIGS[name]}
+        child = [f"--{k.replace('_', '-')}={v}" for k, v in vars(args).items() if k not in ("configs", "run")]
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", *child],
+            env=env, cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True, check=True
+        )
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
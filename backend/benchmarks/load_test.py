@@ -0,0 +1,198 @@
+"""
+load_test.py — Reproducible load test for the inference API
+-----------------------------------------------------------
+Starts the FastAPI app in-process against a small randomly initialised
+Wav2Vec2 (no network needed), sends a deterministic mix of synthetic clips
+of varying length, sample rate and channel count at a fixed concurrency,
+and reports throughput, latency percentiles, peak RSS and the per-stage
+breakdown from /metrics as JSON. With --baseline the run is compared against
+a stored result and the exit code is 1 if a key metric regressed.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --concurrency 8 --requests 200 --out results.json
+    python benchmarks/load_test.py --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/baseline.json --tolerance 0.1
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import numpy as np
+from common import BACKEND_DIR, build_tiny_model, make_clip, peak_rss_bytes, summarize
+
+# metric name -> True if higher is better; these decide the exit code
+KEY_METRICS = {
+    "throughput_rps": True,
+    "latency.p50_ms": False,
+    "latency.p95_ms": False,
+    "latency.p99_ms": False,
+    "peak_rss_bytes": False,
+}
+
+
+def build_workload(args):
+    """Deterministic list of (clip bytes, metadata) covering every length/rate/channel combination."""
+    combos = list(itertools.product(args.lengths, args.sample_rates, args.channels))
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(combos))
+    return [
+        (make_clip(combos[i][0], combos[i][1], combos[i][2], seed=args.seed + n),
+         {"seconds": combos[i][0], "sample_rate": combos[i][1], "channels": combos[i][2]})
+        for n, i in enumerate(order)
+    ]
+
+
+def parse_stage_totals(text):
+    """{stage: (total seconds, count)} from the ser_stage_seconds histogram in /metrics."""
+    sums = dict(re.findall(r'ser_stage_seconds_sum\{stage="(\w+)"\} (\S+)', text))
+    counts = dict(re.findall(r'ser_stage_seconds_count\{stage="(\w+)"\} (\S+)', text))
+    return {stage: (float(sums[stage]), int(counts.get(stage, 0))) for stage in sums}
+
+
+def stage_breakdown(before, after):
+    """Mean latency per stage over the load run only (warmup observations excluded)."""
+    breakdown = {}
+    for stage, (total, count) in after.items():
+        total -= before.get(stage, (0.0, 0))[0]
+        count -= before.get(stage, (0.0, 0))[1]
+        if count:
+            breakdown[stage] = {"count": count, "mean_ms": total / count * 1000}
+    return breakdown
+
+
+async def run(args):
+    import httpx
+
+    sys.path.insert(0, BACKEND_DIR)
+    import app as server
+
+    start = time.perf_counter()
+    server.load_model()
+    load_seconds = time.perf_counter() - start
+
+    workload = build_workload(args)
+    latencies, by_length, errors = [], {}, 0
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        counter = itertools.count()
+
+        async def worker():
+            nonlocal errors
+            while (n := next(counter)) < args.requests:
+                clip, meta = workload[n % len(workload)]
+                begin = time.perf_counter()
+                response = await client.post(args.endpoint, files={"file": ("clip.wav", clip, "audio/wav")})
+                elapsed = time.perf_counter() - begin
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(elapsed)
+                by_length.setdefault(meta["seconds"], []).append(elapsed)
+
+        before = parse_stage_totals((await client.get("/metrics")).text)
+        begin = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        wall = time.perf_counter() - begin
+        stages = stage_breakdown(before, parse_stage_totals((await client.get("/metrics")).text))
+        await server.on_shutdown()
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "save_baseline")},
+        "model_load_seconds": load_seconds,
+        "throughput_rps": len(latencies) / wall,
+        "errors": errors,
+        "latency": summarize(latencies),
+        "latency_by_input_seconds": {str(k): summarize(v) for k, v in sorted(by_length.items())},
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": stages,
+    }
+
+
+def lookup(result, dotted):
+    for part in dotted.split("."):
+        result = result.get(part, {}) if isinstance(result, dict) else {}
+    return result if isinstance(result, (int, float)) else None
+
+
+def compare(current, baseline, tolerance):
+    """Relative change of key metrics and per-stage means; a regression is a change beyond tolerance."""
+    metrics = dict(KEY_METRICS)
+    metrics.update({f"stages.{stage}.mean_ms": False for stage in current["stages"]})
+    rows = []
+    for name, higher_is_better in metrics.items():
+        old, new = lookup(baseline, name), lookup(current, name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": name,
+            "baseline": old,
+            "current": new,
+            "change": change,
+            "regression": worse > tolerance,
+            "key": name in KEY_METRICS,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    csv = lambda cast: lambda value: [cast(x) for x in value.split(",") if x]
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--endpoint", default="/predict")
+    parser.add_argument("--lengths", type=csv(float), default=[1, 2, 4, 8], help="Clip lengths in seconds")
+    parser.add_argument("--sample-rates", type=csv(int), default=[8000, 16000, 22050, 44100, 48000])
+    parser.add_argument("--channels", type=csv(int), default=[1, 2])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hidden-size", type=int, default=64, help="Width of the random test model")
+    parser.add_argument("--layers", type=int, default=2, help="Transformer layers of the random test model")
+    parser.add_argument("--model", default=None, help="Benchmark a real model directory instead of the random one")
+    parser.add_argument("--cache", action="store_true", help="Keep the prediction cache on (off by default)")
+    parser.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Stored results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression (0.1 = 10%%)")
+    parser.add_argument("--save-baseline", default=None, help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    # App configuration is read at import time, so set it before run() imports app
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["MODEL_PATH"] = args.model or build_tiny_model(
+        tmp.name, hidden_size=args.hidden_size, num_layers=args.layers, seed=args.seed
+    )
+    if not args.cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+    os.environ.setdefault("PROFILING_ENABLED", "0")
+
+    result = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["comparison"] = compare(result, json.load(f), args.tolerance)
+        for row in result["comparison"]:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<40} {row['baseline']:>14.3f} → {row['current']:>14.3f} "
+                  f"({row['change']:+.1%}) {flag}", file=sys.stderr)
+
+    output = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output)
+
+    regressions = [row for row in result.get("comparison", []) if row["regression"] and row["key"]]
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+cache.py — Content-addressed prediction cache
+---------------------------------------------
+Results are keyed by a hash of the decoded 16 kHz float32 waveform plus a
+namespace identifying the model revision, so a re-submitted clip skips the
+forward pass regardless of container format or upload filename.
+
+In-memory tier: LRU with a fixed number of entries and a TTL.
+Optional on-disk tier: one .npy per key, expired by file age and pruned to
+`disk_max_entries`, shared by workers pointing at the same directory.
+
+get / put are synchronous. The API uses lookup / store instead: the memory
+tier is still consulted on the event loop, but disk reads and writes
+(np.load, np.save, the rename, pruning) run in a worker thread.
+"""
+
+import hashlib
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import suppress
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, namespace, max_entries=1024, ttl_seconds=3600, disk_dir=None, disk_max_entries=100000):
+        self.namespace = namespace.encode()
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._disk_writes = 0
+        self._disk_lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, audio):
+        h = hashlib.blake2b(self.namespace, digest_size=16)
+        h.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        return h.hexdigest()
+
+    def get(self, key):
+        value = self._memory_get(key)
+        if value is None:
+            value = self._disk_hit(key, self._disk_get(key))
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        self._disk_put(key, value)
+
+    async def lookup(self, key):
+        """get() for the event loop: the disk tier is read in a worker thread."""
+        value = self._memory_get(key)
+        if value is None:
+            disk_value = await asyncio.to_thread(self._disk_get, key) if self.disk_dir else None
+            value = self._disk_hit(key, disk_value)
+        return value
+
+    async def store(self, key, value):
+        """put() for the event loop: the disk tier is written in a worker thread."""
+        self._remember(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, value)
+
+    def _memory_get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry[1]
+            del self._entries[key]
+        return None
+
+    def _disk_hit(self, key, value):
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits["disk"] += 1
+        self._remember(key, value)
+        return value
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # ---- disk tier ----
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".npy")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.disk_dir:
+            return
+        # unique per worker thread, so concurrent stores of one key don't share a temp file
+        tmp = self._path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, value)
+        os.replace(tmp, self._path(key))  # atomic: readers never see partial files
+        with self._disk_lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 1000 == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Drop expired files, then the oldest ones beyond disk_max_entries."""
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".npy"):
+                continue
+            with suppress(OSError):  # another worker may be pruning too
+                mtime = entry.stat().st_mtime
+                if now - mtime > self.ttl:
+                    os.remove(entry.path)
+                else:
+                    files.append((mtime, entry.path))
+        for _, path in sorted(files)[:max(len(files) - self.disk_max_entries, 0)]:
+            with suppress(OSError):
+                os.remove(path)
+
+    def stats(self):
+        lookups = self.misses + sum(self.hits.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk_dir": self.disk_dir,
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": sum(self.hits.values()) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,263 @@
+"""
+engines.py — Pluggable inference engines for the emotion classifier
+--------------------------------------------------------------------
+- eager: fp32 PyTorch (reference)
+- int8:  PyTorch dynamic quantization of nn.Linear layers (CPU)
+- onnx:  ONNX export of Wav2Vec2ForSequenceClassification run with onnxruntime
+- early_exit: fp32 with confidence-based exits after intermediate layers
+  (heads from `python -m training.exit_heads`, see model/training/early_exit.py)
+
+Every engine takes the feature extractor's output (input_values, attention_mask)
+and returns logits as a CPU float tensor. transformers is imported when an
+engine is built rather than at module import, which keeps server startup fast.
+
+Usage:
+    python engines.py snapshot --model <hf repo> --out snapshot/
+    python engines.py export --model <hf repo or dir> --out model.onnx [--int8]
+    python engines.py parity --model <hf repo or dir> --onnx model.onnx --exit-heads exit_heads.pt --audio-dir held_out/
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+
+TARGET_SR = 16000
+
+
+class EagerEngine:
+    name = "eager"
+
+    def __init__(self, model, device="cpu"):
+        self.model = model.to(device).eval()
+        self.config = model.config
+        self.device = device
+
+    @torch.no_grad()
+    def __call__(self, inputs):
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        return self.model(**inputs).logits.float().cpu()
+
+
+class QuantizedEngine(EagerEngine):
+    name = "int8"
+
+    def __init__(self, model, device="cpu"):
+        # Dynamic quantization kernels are CPU-only; weights are int8, activations
+        # are quantized on the fly, so no calibration pass is needed
+        model = torch.ao.quantization.quantize_dynamic(model.cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+        super().__init__(model, device="cpu")
+
+
+class EarlyExitEngine(EagerEngine):
+    name = "early_exit"
+
+    def __init__(self, model, heads_path, threshold=0.9, device="cpu"):
+        from training.early_exit import load_exit_heads
+
+        super().__init__(model, device)
+        self.early_exit = load_exit_heads(self.model, heads_path).to(device)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.layers_executed = 0
+
+    @torch.no_grad()
+    def __call__(self, inputs):
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        logits, layers = self.early_exit(
+            inputs["input_values"], inputs.get("attention_mask"), threshold=self.threshold
+        )
+        with self._lock:
+            self.clips += len(layers)
+            self.layers_executed += int(layers.sum())
+        return logits.float().cpu()
+
+    def avg_layers(self):
+        """Mean transformer layers run per clip since start."""
+        return self.layers_executed / self.clips if self.clips else 0.0
+
+
+class OnnxEngine:
+    name = "onnx"
+
+    def __init__(self, onnx_path, config):
+        import onnxruntime as ort
+
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in ort.get_available_providers()]
+        self.session = ort.InferenceSession(onnx_path, providers=providers)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model = None  # no PyTorch module behind this engine
+        self.config = config
+
+    def __call__(self, inputs):
+        feeds = {k: v.cpu().numpy() for k, v in inputs.items() if k in self.input_names}
+        feeds["input_values"] = feeds["input_values"].astype(np.float32)
+        if "attention_mask" in feeds:
+            feeds["attention_mask"] = feeds["attention_mask"].astype(np.int64)
+        logits, = self.session.run(["logits"], feeds)
+        return torch.from_numpy(logits)
+
+
+ENGINES = ["eager", "int8", "onnx", "early_exit"]
+
+
+def load_engine(name, model_path, device="cpu", onnx_path=None, exit_heads_path=None, exit_threshold=0.9):
+    """Build the named engine from a Hugging Face repo/directory (plus ONNX file / exit heads where needed)."""
+    from transformers import AutoConfig
+    from training.pruning import load_classifier
+
+    if name not in ENGINES:
+        raise ValueError(f"Unknown inference engine {name!r}; expected one of {ENGINES}")
+    if name == "onnx":
+        if not onnx_path or not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"ONNX engine needs an exported model; run `python engines.py export` first ({onnx_path})")
+        return OnnxEngine(onnx_path, AutoConfig.from_pretrained(model_path))
+    if name == "early_exit" and (not exit_heads_path or not os.path.exists(exit_heads_path)):
+        raise FileNotFoundError(f"Early-exit engine needs trained heads; run `python -m training.exit_heads` first ({exit_heads_path})")
+    model = load_classifier(model_path)  # also head-pruned checkpoints (training/prune.py)
+    if name == "early_exit":
+        return EarlyExitEngine(model, exit_heads_path, exit_threshold, device)
+    if name == "int8":
+        return QuantizedEngine(model)
+    return EagerEngine(model, device)
+
+
+# ===================================================== #
+# Export
+# ===================================================== #
+def save_snapshot(model_path, out_dir):
+    """Store config, safetensors weights and feature extractor locally so startup needs no hub access."""
+    from transformers import Wav2Vec2FeatureExtractor
+    from training.pruning import load_classifier
+
+    model = load_classifier(model_path)
+    model.save_pretrained(out_dir)  # safetensors by default
+    Wav2Vec2FeatureExtractor.from_pretrained(model_path).save_pretrained(out_dir)
+    return out_dir
+
+
+class _LogitsOnly(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_values, attention_mask):
+        return self.model(input_values, attention_mask=attention_mask).logits
+
+
+def export_onnx(model, out_path, opset=17, int8=False):
+    """Export to ONNX with dynamic batch and sample axes; optionally int8-quantize the graph."""
+    model = model.cpu().eval()
+    dummy = torch.randn(2, TARGET_SR, dtype=torch.float32)
+    mask = torch.ones(2, TARGET_SR, dtype=torch.int64)
+    root, ext = os.path.splitext(out_path)
+    fp32_path = out_path if not int8 else f"{root}.fp32{ext or '.onnx'}"
+    torch.onnx.export(
+        _LogitsOnly(model),
+        (dummy, mask),
+        fp32_path,
+        input_names=["input_values", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_values": {0: "batch", 1: "samples"},
+            "attention_mask": {0: "batch", 1: "samples"},
+            "logits": {0: "batch"}
+        },
+        opset_version=opset,
+        dynamo=False
+    )
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, out_path, weight_type=QuantType.QInt8)
+    return out_path
+
+
+# ===================================================== #
+# Parity check
+# ===================================================== #
+def load_clips(audio_dir, limit=None):
+    import librosa
+
+    paths = sorted(glob.glob(os.path.join(audio_dir, "**", "*.wav"), recursive=True))[:limit]
+    return paths, [librosa.load(p, sr=TARGET_SR, mono=True)[0] for p in paths]
+
+
+def parity_report(reference, engines, processor, clips):
+    """Logit drift, top-1 agreement and latency of each engine against the fp32 reference."""
+    def run(engine):
+        logits, seconds = [], 0.0
+        for clip in clips:
+            inputs = processor(clip, sampling_rate=TARGET_SR, return_attention_mask=True, return_tensors="pt")
+            start = time.perf_counter()
+            logits.append(engine(inputs)[0].numpy())
+            seconds += time.perf_counter() - start
+        return np.stack(logits), seconds / len(clips)
+
+    ref_logits, ref_latency = run(reference)
+    report = {reference.name: {"latency_ms": ref_latency * 1000}}
+    for engine in engines:
+        logits, latency = run(engine)
+        drift = np.abs(logits - ref_logits)
+        report[engine.name] = {
+            "max_abs_logit_diff": float(drift.max()),
+            "mean_abs_logit_diff": float(drift.mean()),
+            "top1_agreement": float((logits.argmax(1) == ref_logits.argmax(1)).mean()),
+            "latency_ms": latency * 1000
+        }
+        if hasattr(engine, "avg_layers"):
+            report[engine.name]["avg_layers"] = engine.avg_layers()
+    return report
+
+
+if __name__ == "__main__":
+    from transformers import Wav2Vec2FeatureExtractor
+    from training.pruning import load_classifier
+
+    parser = argparse.ArgumentParser(description="Export and validate inference engines")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Save a local safetensors snapshot to point MODEL_PATH at")
+    snap.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    snap.add_argument("--out", default="snapshot")
+
+    exp = sub.add_parser("export", help="Export the classifier to ONNX")
+    exp.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    exp.add_argument("--out", default="model.onnx")
+    exp.add_argument("--opset", type=int, default=17)
+    exp.add_argument("--int8", action="store_true", help="Also apply onnxruntime dynamic int8 quantization")
+
+    par = sub.add_parser("parity", help="Compare engines against fp32 on a held-out folder of .wav files")
+    par.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    par.add_argument("--onnx", default=None, help="Exported ONNX model to include in the comparison")
+    par.add_argument("--exit-heads", default=None, help="Early-exit heads to include in the comparison")
+    par.add_argument("--exit-threshold", type=float, default=0.9)
+    par.add_argument("--audio-dir", required=True)
+    par.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        print(f"Saved snapshot to {save_snapshot(args.model, args.out)}")
+    elif args.command == "export":
+        model = load_classifier(args.model)
+        print(f"Exported {export_onnx(model, args.out, opset=args.opset, int8=args.int8)}")
+    else:
+        import json
+
+        processor = Wav2Vec2FeatureExtractor.from_pretrained(args.model)
+        paths, clips = load_clips(args.audio_dir, args.limit)
+        if not clips:
+            raise SystemExit(f"No .wav files found under {args.audio_dir}")
+        candidates = [load_engine("int8", args.model)]
+        if args.onnx:
+            candidates.append(load_engine("onnx", args.model, onnx_path=args.onnx))
+        if args.exit_heads:
+            candidates.append(load_engine("early_exit", args.model, exit_heads_path=args.exit_heads,
+                                          exit_threshold=args.exit_threshold))
+        report = parity_report(load_engine("eager", args.model), candidates, processor, clips)
+        print(json.dumps({"clips": len(clips), "engines": report}, indent=2))
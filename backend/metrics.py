@@ -0,0 +1,137 @@
+"""
+metrics.py — Minimal Prometheus-style metrics
+---------------------------------------------
+Thread-safe counters, gauges and histograms with labels, rendered in the
+Prometheus text exposition format by Registry.render(). Observations come
+from the event loop as well as the preprocessing and inference threads.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, registry=None):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Counter; declare `labelnames` if inc() takes labels, else it reports 0 before the first inc."""
+    kind = "counter"
+
+    def __init__(self, name, help, registry=None, labelnames=()):
+        super().__init__(name, help, registry)
+        self._values = {} if labelnames else {(): 0}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            return self.header() + [f"{self.name}{_label_str(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge set explicitly, or read from `fn` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, registry=None, fn=None):
+        super().__init__(name, help, registry)
+        self.fn = fn
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def render(self):
+        value = self.fn() if self.fn is not None else self._value
+        return self.header() + [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, registry=None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, registry)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_str(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+def process_rss_bytes():
+    """Resident set size of this process (Linux /proc, else peak RSS from getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,82 @@
+"""
+model_registry.py — Named models loaded from a JSON manifest
+------------------------------------------------------------
+Lets the API serve more than one model (e.g. the cascade's CRNN next to
+Wav2Vec2). Relative paths are resolved against the manifest's directory.
+Formats:
+- torch_export: a torch.export program (.pt2) mapping (batch, samples) 16 kHz
+  float32 waveforms to logits; loading needs no model code
+- wav2vec2: a Hugging Face repo or directory, built with engines.load_engine
+  (`engine` picks eager / int8 / onnx / early_exit; extra keys are passed on)
+
+    {
+      "models": {
+        "crnn": {"format": "torch_export", "path": "crnn.pt2", "input_samples": 64000},
+        "wav2vec2": {"format": "wav2vec2", "path": "snapshot", "engine": "eager"}
+      },
+      "cascade": {"first": "crnn", "fallback": "wav2vec2", "criterion": "margin", "threshold": 0.41,
+                  "trim_silence": false, "normalize_loudness": false}
+    }
+
+The manifest is written by `python -m training.calibrate_cascade`; the two
+preprocessing flags record how the threshold was calibrated.
+"""
+
+import json
+import os
+import torch
+
+FORMATS = ("torch_export", "wav2vec2")
+
+
+class ModelRegistry:
+    def __init__(self, models=None, cascade=None, base_dir="."):
+        self.specs = {}
+        self.cascade = cascade
+        self.base_dir = base_dir
+        self._loaded = {}
+        for name, spec in (models or {}).items():
+            self.register(name, spec)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            manifest = json.load(f)
+        return cls(manifest.get("models"), manifest.get("cascade"), base_dir=os.path.dirname(os.path.abspath(path)))
+
+    def register(self, name, spec):
+        if spec.get("format") not in FORMATS:
+            raise ValueError(f"Model {name!r}: unknown format {spec.get('format')!r}; expected one of {FORMATS}")
+        self.specs[name] = dict(spec)
+
+    def setdefault(self, name, spec):
+        if name not in self.specs:
+            self.register(name, spec)
+        return self.specs[name]
+
+    def resolve(self, path):
+        """Manifest-relative path if that file exists, else the value as given (e.g. a hub repo id)."""
+        candidate = os.path.join(self.base_dir, path)
+        return candidate if os.path.exists(candidate) else path
+
+    def get(self, name, device="cpu"):
+        """Load (once) and return the named model."""
+        if name not in self._loaded:
+            if name not in self.specs:
+                raise KeyError(f"No model named {name!r} in the registry (have {sorted(self.specs)})")
+            self._loaded[name] = self._load(self.specs[name], device)
+        return self._loaded[name]
+
+    def _load(self, spec, device):
+        path = self.resolve(spec["path"])
+        if spec["format"] == "torch_export":
+            return torch.export.load(path).module()
+        from engines import load_engine
+
+        options = {k: v for k, v in spec.items() if k not in ("format", "path", "engine", "cost_ms")}
+        return load_engine(spec.get("engine", "eager"), path, device=device, **options)
+
+    def revision(self, name):
+        """Identifies the named model's weights, for cache namespaces."""
+        path = self.resolve(self.specs[name]["path"])
+        return f"{name}={path}@{os.path.getmtime(path) if os.path.exists(path) else None}"
@@ -0,0 +1,133 @@
+"""
+preprocessing.py — Audio decoding and preprocessing for the API
+---------------------------------------------------------------
+Kept free of model state so it can run in worker threads or processes
+without loading the classifier. Silence trimming and loudness normalization
+live in model/training/vad.py, shared with the training datasets.
+"""
+
+import io
+import os
+import tarfile
+import time
+import zipfile
+import numpy as np
+import soundfile as sf
+from training.resampling import get_resampler
+from training.vad import normalize_volume, trim_silence
+
+TARGET_SR = 16000
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+PCM_DTYPES = {"float32": np.dtype("<f4"), "int16": np.dtype("<i2")}  # raw uploads and /stream
+
+
+class UploadLimitError(ValueError):
+    """Raised when a bulk upload exceeds the file-count or size limits (maps to HTTP 413)."""
+
+
+def preprocess_audio(file_bytes, timings=None, trim=True, normalize=True):
+    """
+    Decode to 16 kHz mono float32, then (optionally) cut leading/trailing
+    silence and normalize loudness, as BaseSERDataset does in training.
+    Returns (audio, seconds trimmed); per-stage seconds go into `timings` if given.
+    """
+    start = time.perf_counter()
+    # Decode straight to float32, (time, channels)
+    audio, sr = sf.read(io.BytesIO(file_bytes), dtype="float32", always_2d=True)
+    # Downmix before resampling so only one channel goes through the filter
+    audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+    if timings is not None:
+        timings["decode"] = time.perf_counter() - start
+    return condition_audio(audio, sr, timings, trim, normalize)
+
+def decode_pcm(body, dtype):
+    """
+    View raw little-endian mono PCM as float32 in [-1, 1]. float32 bodies are
+    wrapped without copying (read-only); int16 costs one conversion pass.
+    Raises ValueError on NaN / Inf samples.
+    """
+    samples = np.frombuffer(body, dtype=PCM_DTYPES[dtype])
+    if dtype == "int16":
+        return samples.astype(np.float32) / 32768.0
+    samples = samples.astype(np.float32, copy=False)  # no-op on little-endian hosts
+    if not np.isfinite(samples).all():
+        raise ValueError("PCM samples must be finite (no NaN or Inf)")
+    return samples
+
+def preprocess_pcm(body, sample_rate, dtype, timings=None, trim=True, normalize=True):
+    """preprocess_audio for raw PCM bodies: no container to parse. Returns (audio, seconds trimmed)."""
+    start = time.perf_counter()
+    audio = decode_pcm(body, dtype)
+    if timings is not None:
+        timings["decode"] = time.perf_counter() - start
+    return condition_audio(audio, sample_rate, timings, trim, normalize)
+
+def condition_audio(audio, sr, timings=None, trim=True, normalize=True):
+    """Resample mono float32 audio to 16 kHz, then trim silence / normalize loudness."""
+    start = time.perf_counter()
+    # Resample with the cached polyphase filter bank for this rate
+    audio = get_resampler(sr, TARGET_SR)(audio)
+    resampled = time.perf_counter()
+    audio, removed = condition_window(audio, trim, normalize)
+    if timings is not None:
+        timings["resample"] = resampled - start
+        timings["vad"] = time.perf_counter() - resampled
+    return audio, removed / TARGET_SR
+
+def condition_window(audio, trim=True, normalize=True):
+    """Trim silence / normalize loudness of 16 kHz audio; returns (audio, samples removed)."""
+    removed = 0
+    if trim:
+        audio, removed = trim_silence(audio, TARGET_SR)
+    if normalize:
+        audio = normalize_volume(audio)
+    return audio, removed
+
+def preprocess_audio_timed(file_bytes, trim=True, normalize=True):
+    """preprocess_audio returning (audio, seconds trimmed, timings), for workers that cannot share a dict."""
+    timings = {}
+    audio, trimmed = preprocess_audio(file_bytes, timings, trim, normalize)
+    return audio, trimmed, timings
+
+def preprocess_pcm_timed(body, sample_rate, dtype, trim=True, normalize=True):
+    """preprocess_pcm returning (audio, seconds trimmed, timings)."""
+    timings = {}
+    audio, trimmed = preprocess_pcm(body, sample_rate, dtype, timings, trim, normalize)
+    return audio, trimmed, timings
+
+def expand_uploads(uploads, max_files, max_bytes):
+    """
+    Flatten a list of (filename, bytes) uploads into audio (name, bytes) items,
+    unpacking any zip/tar archives in memory. Limits are checked against the
+    uncompressed sizes so archives cannot expand past max_bytes.
+    """
+    items, total = [], 0
+
+    def add(name, read, size):
+        nonlocal total
+        total += size
+        if len(items) >= max_files:
+            raise UploadLimitError(f"Too many files (limit {max_files})")
+        if total > max_bytes:
+            raise UploadLimitError(f"Uploads exceed {max_bytes} bytes uncompressed")
+        items.append((name, read()))
+
+    for filename, data in uploads:
+        lower = (filename or "").lower()
+        if lower.endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and not _is_hidden(info.filename):
+                        add(info.filename, lambda: archive.read(info), info.file_size)
+        elif lower.endswith(ARCHIVE_EXTENSIONS):
+            with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+                for member in archive:
+                    if member.isfile() and not _is_hidden(member.name):
+                        add(member.name, lambda: archive.extractfile(member).read(), member.size)
+        else:
+            add(filename, lambda: data, len(data))
+    return items
+
+def _is_hidden(path):
+    """Skip dotfiles and macOS resource forks that archivers add."""
+    return any(part.startswith(".") or part == "__MACOSX" for part in path.split("/")) or os.path.basename(path) == ""
@@ -0,0 +1,141 @@
+"""
+streaming.py — Incremental audio state for the streaming endpoint
+------------------------------------------------------------------
+RingBuffer keeps the most recent window of PCM samples. EncoderFrameCache
+keeps the Wav2Vec2 convolutional feature-encoder frames for that window so
+each update only encodes the newly arrived samples; the transformer then
+runs on a fixed-size window, so per-update cost is independent of how long
+the session has been running.
+"""
+
+import math
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0  # samples written since the session started
+        self._buf = np.zeros(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def write(self, samples):
+        # Anything older than one capacity would be overwritten anyway
+        self.total += max(len(samples) - self.capacity, 0)
+        samples = samples[-self.capacity:]
+        start = self.total % self.capacity
+        end = start + len(samples)
+        if end <= self.capacity:
+            self._buf[start:end] = samples
+        else:
+            split = self.capacity - start
+            self._buf[start:] = samples[:split]
+            self._buf[:end - self.capacity] = samples[split:]
+        self.total += len(samples)
+
+    def latest(self, n):
+        """Copy of the last n samples (fewer if the buffer holds less)."""
+        n = min(n, len(self))
+        end = self.total % self.capacity
+        start = end - n
+        if start >= 0:
+            return self._buf[start:end].copy()
+        return np.concatenate([self._buf[start:], self._buf[:end]])
+
+
+def encoder_geometry(config):
+    """Receptive field and hop (in samples) of the convolutional feature encoder."""
+    receptive_field = 1
+    for kernel, stride in reversed(list(zip(config.conv_kernel, config.conv_stride))):
+        receptive_field = (receptive_field - 1) * stride + kernel
+    return receptive_field, math.prod(config.conv_stride)
+
+
+def supports_frame_reuse(model):
+    """
+    Frames can only be computed chunk by chunk when the encoder is local in time.
+    With feat_extract_norm="group" (wav2vec2-base) the first conv layer normalises
+    over the whole input, so every frame depends on every sample of the window.
+    """
+    return model.config.feat_extract_norm == "layer"
+
+
+class EncoderFrameCache:
+    def __init__(self, model, window_samples, normalize=True, device="cpu"):
+        self.model = model
+        self.device = device
+        self.normalize = normalize
+        self.receptive_field, self.hop = encoder_geometry(model.config)
+        self.window_frames = int(model._get_feat_extract_output_lengths(window_samples))
+        self.frames = None  # (channels, time) for the latest window
+        self.n_frames = 0  # frames computed since the session started
+        # Running input statistics stand in for the per-utterance normalisation
+        # the feature extractor would apply to a complete clip
+        self._count, self._mean, self._m2 = 0, 0.0, 0.0
+
+    def buffer_capacity(self, window_samples):
+        """Ring size needed so samples for not-yet-encoded frames are still available."""
+        return window_samples + self.receptive_field
+
+    def observe(self, samples):
+        """Update running mean/variance (Chan et al. parallel update)."""
+        n = len(samples)
+        if n == 0:
+            return
+        mean = float(samples.mean())
+        m2 = float(((samples - mean) ** 2).sum())
+        total = self._count + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self._count * n / total
+        self._count = total
+
+    def _encode_new(self, ring):
+        ready = (ring.total - self.receptive_field) // self.hop + 1
+        # Frames whose samples have already left the ring are skipped
+        first_available = -(-(ring.total - len(ring)) // self.hop)
+        if first_available > self.n_frames:
+            self.frames, self.n_frames = None, first_available
+        if ready <= self.n_frames:
+            return
+        start = self.n_frames * self.hop
+        span = (ready - 1 - self.n_frames) * self.hop + self.receptive_field
+        samples = ring.latest(ring.total - start)[:span]
+        if self.normalize:
+            std = math.sqrt(self._m2 / max(self._count, 1) + 1e-7)
+            samples = (samples - self._mean) / std
+        x = torch.from_numpy(samples.astype(np.float32))[None].to(self.device)
+        new_frames = self.model.wav2vec2.feature_extractor(x)[0]
+        if self.frames is not None:
+            new_frames = torch.cat([self.frames, new_frames], dim=1)
+        self.frames = new_frames[:, -self.window_frames:]
+        self.n_frames = ready
+
+    @torch.no_grad()
+    def classify(self, ring):
+        """Encode newly arrived samples and classify the latest window; returns probabilities."""
+        self._encode_new(ring)
+        if self.frames is None:
+            return None
+        logits = classify_frames(self.model, self.frames[None])
+        return F.softmax(logits, dim=-1)[0].cpu().numpy()
+
+
+def classify_frames(model, frames):
+    """Wav2Vec2ForSequenceClassification forward starting from conv-encoder frames (batch, C, T)."""
+    w2v = model.wav2vec2
+    hidden, _ = w2v.feature_projection(frames.transpose(1, 2))
+    outputs = w2v.encoder(hidden, output_hidden_states=model.config.use_weighted_layer_sum)
+    if model.config.use_weighted_layer_sum:
+        stacked = torch.stack(outputs.hidden_states, dim=1)
+        weights = F.softmax(model.layer_weights, dim=-1).view(-1, 1, 1)
+        hidden = (stacked * weights).sum(dim=1)
+    else:
+        hidden = outputs[0]
+        if w2v.adapter is not None:
+            hidden = w2v.adapter(hidden)
+    return model.classifier(model.projector(hidden).mean(dim=1))
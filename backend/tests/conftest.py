@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The API modules are imported flat, as in the image (WORKDIR /app), and the
+# modules shared with training as training.* (PYTHONPATH=../model)
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(1, os.path.join(os.path.dirname(BACKEND), "model"))
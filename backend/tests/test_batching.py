@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import torch
+from transformers import Wav2Vec2Config, Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+
+import app
+from batching import length_groups
+from engines import EagerEngine
+
+
+def tiny_model(feat_extract_norm):
+    torch.manual_seed(0)
+    config = Wav2Vec2Config(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        conv_dim=(32, 32, 32), conv_stride=(5, 4, 4), conv_kernel=(10, 4, 4), num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2, feat_extract_norm=feat_extract_norm,
+        do_stable_layer_norm=feat_extract_norm == "layer", num_labels=8,
+    )
+    return Wav2Vec2ForSequenceClassification(config).eval()
+
+
+def test_length_groups():
+    assert length_groups([[0] * 3, [0] * 5, [0] * 3, [0]]) == [[0, 2], [1], [3]]
+
+
+@pytest.mark.parametrize("feat_extract_norm", ["group", "layer"])
+def test_batched_matches_single_clip(monkeypatch, feat_extract_norm):
+    monkeypatch.setattr(app, "engine", EagerEngine(tiny_model(feat_extract_norm)))
+    monkeypatch.setattr(app, "processor", Wav2Vec2FeatureExtractor(return_attention_mask=False))
+    rng = np.random.default_rng(0)
+    audios = [rng.standard_normal(n).astype(np.float32) for n in (16000, 8000, 16000, 12000)]
+
+    batched = app.run_wav2vec2(audios)
+    single = np.concatenate([app.run_wav2vec2([audio]) for audio in audios])
+    np.testing.assert_allclose(batched, single, atol=1e-5)
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import numpy as np
+
+from cache import PredictionCache
+
+
+def test_store_and_lookup_touch_the_disk_off_the_event_loop(tmp_path, monkeypatch):
+    disk_threads = []
+    disk_get, disk_put = PredictionCache._disk_get, PredictionCache._disk_put
+
+    def record_get(self, key):
+        disk_threads.append(threading.get_ident())
+        return disk_get(self, key)
+
+    def record_put(self, key, value):
+        disk_threads.append(threading.get_ident())
+        disk_put(self, key, value)
+
+    monkeypatch.setattr(PredictionCache, "_disk_get", record_get)
+    monkeypatch.setattr(PredictionCache, "_disk_put", record_put)
+    probs = np.array([0.1, 0.9], dtype=np.float32)
+
+    async def run():
+        writer = PredictionCache("m", disk_dir=str(tmp_path))
+        key = writer.key(np.zeros(16, dtype=np.float32))
+        await writer.store(key, probs)
+        reader = PredictionCache("m", disk_dir=str(tmp_path))  # empty memory tier: must read the file
+        return threading.get_ident(), await reader.lookup(key), await reader.lookup(key), reader.stats()
+
+    loop_thread, from_disk, from_memory, stats = asyncio.run(run())
+
+    assert len(disk_threads) == 2 and loop_thread not in disk_threads
+    np.testing.assert_array_equal(from_disk, probs)
+    np.testing.assert_array_equal(from_memory, probs)
+    assert stats["hits"] == {"memory": 1, "disk": 1} and stats["misses"] == 0
+
+
+def test_lookup_without_a_disk_tier_counts_a_miss():
+    cache = PredictionCache("m")
+    assert asyncio.run(cache.lookup("absent")) is None
+    assert cache.misses == 1
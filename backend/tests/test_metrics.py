@@ -0,0 +1,14 @@
+import app
+from metrics import Counter, Registry
+
+
+def test_unlabeled_counter_is_exported_before_its_first_inc():
+    assert "\nser_rejected_requests_total 0\n" in app.registry.render()
+
+
+def test_labeled_counter_has_no_unlabeled_sample():
+    registry = Registry()
+    counter = Counter("errors_total", "Errors", registry, labelnames=("kind",))
+    assert [line for line in registry.render().splitlines() if not line.startswith("#")] == []
+    counter.inc(kind="decode")
+    assert registry.render().endswith('errors_total{kind="decode"} 1\n')
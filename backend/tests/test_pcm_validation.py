@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from preprocessing import decode_pcm
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Every rejection below happens before the model is needed
+    monkeypatch.setitem(app.startup, "ready", True)
+    return TestClient(app.app)
+
+
+def post_pcm(client, samples, sample_rate=16000, dtype="float32"):
+    headers = {"X-Sample-Rate": str(sample_rate), "X-Sample-Format": dtype}
+    return client.post("/predict_pcm", content=np.asarray(samples, dtype=dtype).tobytes(), headers=headers)
+
+
+@pytest.mark.parametrize("sample_rate", [22051, 96000, 1])
+def test_unlisted_sample_rate(client, sample_rate):
+    assert post_pcm(client, np.zeros(16000), sample_rate).status_code == 400
+
+
+@pytest.mark.parametrize("n_samples", [0, 2, 399])
+def test_shorter_than_receptive_field(client, n_samples):
+    assert post_pcm(client, np.zeros(n_samples)).status_code == 400
+
+
+def test_short_at_client_rate(client):
+    # 25 ms at 48 kHz is 1200 samples
+    assert post_pcm(client, np.zeros(1199), 48000).status_code == 400
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_non_finite_samples(client, value):
+    samples = np.zeros(16000, dtype=np.float32)
+    samples[100] = value
+    with pytest.raises(ValueError):
+        decode_pcm(samples.tobytes(), "float32")
+    assert post_pcm(client, samples).status_code == 400
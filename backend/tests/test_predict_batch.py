@@ -0,0 +1,36 @@
+import io
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(app.startup, "ready", True)
+    return TestClient(app.app)
+
+
+def test_archives_are_unpacked_outside_the_preprocessing_pool(client, monkeypatch):
+    pooled = []
+    run_in_pool = app.run_in_pool
+
+    async def record(pool, fn, *args):
+        pooled.append(fn.__name__)
+        return await run_in_pool(pool, fn, *args)
+
+    monkeypatch.setattr(app, "run_in_pool", record)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.wav", b"not audio")
+    response = client.post("/predict_batch", files=[("files", ("clips.zip", archive.getvalue(), "application/zip"))])
+
+    assert response.status_code == 200
+    assert "Could not decode audio" in response.text  # a.wav was unpacked, then failed to decode in the pool
+    assert "expand_uploads" not in pooled and "preprocess_audio_timed" in pooled
+
+
+def test_unreadable_archive(client):
+    response = client.post("/predict_batch", files=[("files", ("clips.zip", b"PK\x03\x04broken", "application/zip"))])
+    assert response.status_code == 400
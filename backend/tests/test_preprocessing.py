@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import app
+from preprocessing import condition_audio, condition_window
+
+
+def speech_in_silence():
+    rng = np.random.default_rng(0)
+    audio = np.zeros(3 * app.TARGET_SR, dtype=np.float32)
+    audio[app.TARGET_SR:2 * app.TARGET_SR] = 0.05 * rng.standard_normal(app.TARGET_SR)
+    return audio
+
+
+def test_off_by_default():
+    # The served model was trained on untrimmed, unnormalized clips
+    assert not app.TRIM_SILENCE and not app.NORMALIZE_LOUDNESS
+
+
+@pytest.mark.parametrize("trim, normalize", [(False, False), (True, False), (True, True)])
+def test_windows_get_the_same_steps_as_uploads(monkeypatch, trim, normalize):
+    monkeypatch.setattr(app, "TRIM_SILENCE", trim)
+    monkeypatch.setattr(app, "NORMALIZE_LOUDNESS", normalize)
+    seen = []
+    monkeypatch.setattr(app, "run_model", lambda audios: seen.extend(audios) or np.zeros((len(audios), 8)))
+    audio = speech_in_silence()
+
+    upload, _ = condition_audio(audio, app.TARGET_SR, trim=trim, normalize=normalize)
+    app.run_windows(audio, [(0, len(audio))])  # /predict_timeline
+    np.testing.assert_array_equal(seen[0], upload)
+    np.testing.assert_array_equal(app.prepare_window(audio), upload)  # /stream
+    assert len(upload) < len(audio) if trim else len(upload) == len(audio)
+    assert condition_window(audio, trim, normalize)[1] == len(audio) - len(upload)
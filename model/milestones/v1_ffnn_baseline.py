@@ -16,12 +16,15 @@ Next step → try sequence models (LSTM) that can “listen” over time.
 
 from training.datasets import RAVDESSDataset
 from training.train import train_model
+from training.split import split_dataset
 from training.model import FFNN
 from training import config
-from training.feature_extraction import get_transform
+from training.feature_extraction import feature_pipeline
 
 if __name__ == "__main__":
-    transform = get_transform('mfcc')
+    # Batched on-device features unless config.BATCHED_FEATURES is off
+    transform, batch_transform = feature_pipeline('mfcc', pool=True)
     dataset = RAVDESSDataset(root_dir=config.DATASET_PATHS["ravdess"], transform=transform)
+    train_set, val_set, test_set = split_dataset(dataset)
     model = FFNN(input_dim=config.N_MFCC, hidden_dim=64, output_dim=len(config.EMOTIONS))
-    train_model(model, dataset=dataset, epochs=config.EPOCHS, lr=config.LEARNING_RATE)
+    train_model(model, dataset=train_set, val_dataset=val_set, test_dataset=test_set, epochs=config.EPOCHS, lr=config.LEARNING_RATE, batch_transform=batch_transform)
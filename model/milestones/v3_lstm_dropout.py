@@ -19,12 +19,15 @@ Next step → combine CNN + LSTM (CRNN).
 
 from training.datasets import RAVDESSDataset
 from training.train import train_model
+from training.split import split_dataset
 from training.model import EmotionLSTM
 from training import config
-from training.feature_extraction import get_transform
+from training.feature_extraction import feature_pipeline
 
 if __name__ == "__main__":
-    transform = get_transform('logmel')
+    # Batched on-device features unless config.BATCHED_FEATURES is off
+    transform, batch_transform = feature_pipeline('logmel')
     dataset = RAVDESSDataset(root_dir=config.DATASET_PATHS["ravdess"], transform=transform)
+    train_set, val_set, test_set = split_dataset(dataset)
     model = EmotionLSTM(input_dim=config.N_MELS, hidden_dim=128, output_dim=len(config.EMOTIONS), num_layers=2, dropout=0.3)
-    train_model(model, dataset=dataset, epochs=config.EPOCHS, lr=config.LEARNING_RATE)
+    train_model(model, dataset=train_set, val_dataset=val_set, test_dataset=test_set, epochs=config.EPOCHS, lr=config.LEARNING_RATE, batch_transform=batch_transform)
@@ -21,12 +21,15 @@ Next step → try pretrained transformer (Wav2Vec2).
 
 from training.datasets import RAVDESSDataset
 from training.train import train_model
+from training.split import split_dataset
 from training.model import CRNN
 from training import config
-from training.feature_extraction import get_transform
+from training.feature_extraction import feature_pipeline
 
 if __name__ == "__main__":
-    transform = get_transform('logmel', augment='specaugment')
+    # Batched on-device features unless config.BATCHED_FEATURES is off
+    transform, batch_transform = feature_pipeline('logmel', augment='specaugment')
     dataset = RAVDESSDataset(root_dir=config.DATASET_PATHS["ravdess"], transform=transform)
+    train_set, val_set, test_set = split_dataset(dataset)
     model = CRNN(n_mels=config.N_MELS, cnn_channels=128, lstm_hidden=256, lstm_layers=2, dropout=0.3, num_classes=len(config.EMOTIONS))
-    train_model(model, dataset=dataset, epochs=60, lr=1e-3, weight_decay=1e-5, scheduler="plateau")
+    train_model(model, dataset=train_set, val_dataset=val_set, test_dataset=test_set, epochs=60, lr=1e-3, weight_decay=1e-5, scheduler="plateau", batch_transform=batch_transform)
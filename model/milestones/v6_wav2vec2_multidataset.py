@@ -21,10 +21,12 @@ Weaknesses:
 
 from training.datasets import MultiDataset
 from training.train import train_model
+from training.split import split_dataset
 from training.model import Wav2Vec2Classifier
 from training import config
 
 if __name__ == "__main__":
     dataset = MultiDataset(datasets=["ravdess", "cremad", "tess", "savee"])
+    train_set, val_set, test_set = split_dataset(dataset)
     model = Wav2Vec2Classifier(pretrained="facebook/wav2vec2-base", num_labels=len(config.EMOTIONS))
-    train_model(model, dataset=dataset, epochs=15, lr=1e-5, optimizer="adamw", class_weighted=True, scheduler="linear")
+    train_model(model, dataset=train_set, val_dataset=val_set, test_dataset=test_set, epochs=15, lr=1e-5, optimizer="adamw", class_weighted=True, scheduler="linear")
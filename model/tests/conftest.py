@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The training package is imported as `training`, as when run from model/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+import torch
+from torch.utils.data import Dataset, Subset
+from training.calibrate_cascade import collect_probs
+
+
+class Clips(Dataset):
+    variable_length = True
+
+    def __init__(self, lengths):
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, idx):
+        return torch.ones(self.lengths[idx]), torch.tensor(idx % 2)
+
+
+def test_clips_reach_the_models_unpadded():
+    seen = []
+
+    def predict(audios):
+        seen.extend(len(audio) for audio in audios)
+        return torch.zeros(len(audios), 8)
+
+    probs, labels = collect_probs(predict, Subset(Clips([16000, 9000, 30000, 12345]), [0, 1, 3]), batch_size=2)
+    assert seen == [16000, 9000, 12345]
+    assert probs.shape == (3, 8) and labels.tolist() == [0, 1, 1]
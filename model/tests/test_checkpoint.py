@@ -0,0 +1,57 @@
+import os
+import pytest
+import torch
+from training.checkpoint import CheckpointWriter
+
+
+def test_keeps_the_last_checkpoints(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), keep=2)
+    for epoch in range(1, 5):
+        writer.save_epoch({"epoch": epoch, "weights": torch.zeros(3)}, epoch)
+    writer.close()
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 2
+    assert torch.load(tmp_path / names[-1])["epoch"] == 4
+
+
+def test_keep_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        CheckpointWriter(str(tmp_path), keep=0)
+
+
+def tiny_run(**kwargs):
+    from torch.utils.data import TensorDataset
+    from training.model import FFNN
+    from training.train import train_model
+
+    torch.manual_seed(0)
+    dataset = TensorDataset(torch.randn(16, 4), torch.arange(16) % 2)
+    return train_model(FFNN(4, 8, 2), dataset, epochs=2, batch_size=8, num_workers=0, amp=None, log_every=0, **kwargs)
+
+
+def test_no_checkpoint_dir_writes_only_the_best_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tiny_run()
+    assert os.listdir(tmp_path) == ["best_model.pt"]
+
+
+def test_resume_latest_needs_checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match="checkpoint_dir"):
+        tiny_run(resume="latest")
+
+
+def test_write_error_does_not_mask_the_training_error(tmp_path, monkeypatch):
+    import training.train as train
+
+    monkeypatch.chdir(tmp_path)
+    real_save = CheckpointWriter.save_epoch
+
+    def save_then_fail(self, state, epoch):
+        real_save(self, state, epoch)
+        self.save(state, str(tmp_path / "missing" / "dir" / "x.pt"))  # this write fails in the background
+        raise KeyboardInterrupt  # stands in for a training error
+
+    monkeypatch.setattr(train.CheckpointWriter, "save_epoch", save_then_fail)
+    with pytest.raises(KeyboardInterrupt):
+        tiny_run(checkpoint_dir=str(tmp_path / "ckpt"))
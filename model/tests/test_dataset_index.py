@@ -0,0 +1,16 @@
+import numpy as np
+import soundfile as sf
+from training.datasets.index import load_index
+
+
+def test_unreadable_files_are_skipped(tmp_path, capsys):
+    root = tmp_path / "corpus"
+    root.mkdir()
+    sf.write(root / "ok.wav", np.zeros(1600, dtype=np.float32), 16000)
+    (root / "broken.wav").write_bytes(b"not a wav file")
+
+    for _ in range(2):  # fresh scan, then the saved index
+        index = load_index("test", str(root), lambda path: "neutral", index_dir=str(tmp_path / "index"), workers=1)
+        assert [p.rsplit("/", 1)[-1] for p in index.path] == ["ok.wav"]
+        assert index.sample_rate.tolist() == [16000]
+        assert "broken.wav" in capsys.readouterr().out
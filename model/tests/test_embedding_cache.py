@@ -0,0 +1,57 @@
+import os
+import torch
+from torch.utils.data import Dataset, Subset
+from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+from training import config
+from training.embedding_cache import EmbeddingDataset, extract_embeddings
+from training.train import class_weights
+
+
+class Clips(Dataset):
+    """Fixed-length waveforms with on-disk stand-in files, so cache_key can stat them."""
+
+    def __init__(self, root, labels):
+        self.emotions = config.EMOTIONS
+        self.samples = []
+        for i, label in enumerate(labels):
+            path = os.path.join(root, f"{i}.wav")
+            with open(path, "w") as f:
+                f.write(label)
+            self.samples.append((path, label))
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        torch.manual_seed(idx)
+        return torch.randn(config.MAX_AUDIO_SAMPLES), torch.tensor(self.emotions.index(self.samples[idx][1]))
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    model_config = Wav2Vec2Config(
+        hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32,
+        conv_dim=(16, 16), conv_stride=(5, 4), conv_kernel=(10, 4), num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2, num_labels=len(config.EMOTIONS), name_or_path="facebook/wav2vec2-base",
+    )
+    return Wav2Vec2ForSequenceClassification(model_config).eval()
+
+
+def test_fine_tuned_weights_get_their_own_store(tmp_path):
+    dataset = Clips(str(tmp_path), ["neutral", "happy", "sad", "happy"])
+    model = tiny_model()
+    store = extract_embeddings(model, dataset, str(tmp_path / "store"), device="cpu")
+    assert extract_embeddings(model, dataset, str(tmp_path / "store"), device="cpu") == store
+
+    with torch.no_grad():  # "fine-tune": same name_or_path, new weights
+        model.wav2vec2.encoder.layers[0].attention.q_proj.weight.add_(1.0)
+    assert extract_embeddings(model, dataset, str(tmp_path / "store"), device="cpu") != store
+
+
+def test_class_weights_on_embedding_subset(tmp_path):
+    dataset = Clips(str(tmp_path), ["neutral", "happy", "sad", "happy"])
+    embeddings = EmbeddingDataset(extract_embeddings(tiny_model(), dataset, str(tmp_path / "store"), device="cpu"))
+    weights = class_weights(Subset(embeddings, [1, 2, 3]))
+    assert weights[config.EMOTIONS.index("happy")] == 0.5
+    assert weights[config.EMOTIONS.index("sad")] == 1.0
+    torch.testing.assert_close(class_weights(embeddings), embeddings.class_weights())
@@ -0,0 +1,27 @@
+import pytest
+import torch
+from training import config
+from training.feature_extraction import feature_pipeline
+from training.model import CRNN, FFNN, EmotionLSTM
+
+
+@pytest.mark.parametrize("feature_type, pool, model", [
+    ("mfcc", True, lambda: FFNN(config.N_MFCC, 16, len(config.EMOTIONS))),
+    ("mfcc", False, lambda: EmotionLSTM(config.N_MFCC, 16, len(config.EMOTIONS))),
+    ("logmel", False, lambda: CRNN(config.N_MELS, 4, 8, 1, 0.0, len(config.EMOTIONS))),
+])
+def test_per_clip_and_batched_features_agree(feature_type, pool, model):
+    torch.manual_seed(0)
+    waveforms = torch.randn(3, config.SAMPLE_RATE)
+    transform, _ = feature_pipeline(feature_type, batched=False, pool=pool)
+    _, batch_transform = feature_pipeline(feature_type, batched=True, pool=pool)
+
+    # As BaseSERDataset.__getitem__ and the default collate do
+    per_clip = torch.stack([transform(w.unsqueeze(0)).squeeze(0) for w in waveforms])
+    batched = batch_transform(waveforms)
+    assert per_clip.shape == batched.shape
+    torch.testing.assert_close(per_clip, batched, atol=1e-3, rtol=1e-4)
+
+    model = model().eval()
+    with torch.no_grad():
+        torch.testing.assert_close(model(per_clip), model(batched), atol=1e-3, rtol=1e-4)
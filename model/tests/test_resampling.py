@@ -0,0 +1,27 @@
+import numpy as np
+import torch
+import torchaudio.functional as AF
+from training.resampling import MAX_BLOCK, Resampler, block_sizes
+
+
+def tone(freq, sr, seconds=1.0):
+    return np.sin(2 * np.pi * freq * np.arange(int(sr * seconds)) / sr).astype(np.float32)
+
+
+def test_matches_torchaudio():
+    audio = np.random.default_rng(0).standard_normal(44100).astype(np.float32)
+    expected = AF.resample(torch.from_numpy(audio), 44100, 16000).numpy()
+    np.testing.assert_allclose(Resampler(44100, 16000)(audio), expected, atol=1e-4)
+
+
+def test_coprime_rate_uses_a_bounded_kernel():
+    # 22051:16000 does not reduce: the exact filter bank would hold ~3.5e8 taps
+    orig, new = block_sizes(22051, 16000)
+    assert max(orig, new) <= MAX_BLOCK
+    assert abs(new / orig / (16000 / 22051) - 1) < 1e-5
+    resampler = Resampler(22051, 16000)
+    assert resampler.kernel.size < 4 * MAX_BLOCK ** 2
+
+    out = resampler(tone(440, 22051))
+    assert abs(len(out) - 16000) <= 1
+    np.testing.assert_allclose(out[200:-200], tone(440, 16000)[200:len(out) - 200], atol=1e-2)
@@ -0,0 +1,40 @@
+import os
+import torch
+from training.waveform_cache import WaveformCache
+
+
+class Clips:
+    """The parts of BaseSERDataset that the cache uses."""
+
+    def __init__(self, root_dir, names):
+        self.root_dir = root_dir
+        self.samples = []
+        for name in names:
+            path = os.path.join(root_dir, name)
+            with open(path, "w") as f:
+                f.write(name)
+            self.samples.append((path, "neutral"))
+
+    def load_waveform(self, filepath, pad=True):
+        return torch.full((1, 100), float(len(filepath)))
+
+
+def builds(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(".json"))
+
+
+def test_new_build_only_replaces_same_settings(tmp_path):
+    root, cache_dir = tmp_path / "clips", str(tmp_path / "cache")
+    root.mkdir()
+    WaveformCache.open_or_build(Clips(str(root), ["a.wav"]), cache_dir, "float32")
+    float32 = builds(cache_dir)
+    WaveformCache.open_or_build(Clips(str(root), ["a.wav"]), cache_dir, "float16")
+    assert len(builds(cache_dir)) == 2  # the float32 build is still valid
+    float16 = sorted(set(builds(cache_dir)) - set(float32))
+
+    # A changed file list supersedes the float16 build only
+    cache = WaveformCache.open_or_build(Clips(str(root), ["a.wav", "b.wav"]), cache_dir, "float16")
+    assert len(cache) == 2
+    remaining = builds(cache_dir)
+    assert len(remaining) == 2 and float32[0] in remaining and float16[0] not in remaining
+    assert len(os.listdir(cache_dir)) == 4  # one .json and one .npy each
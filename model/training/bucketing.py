@@ -0,0 +1,125 @@
+"""
+bucketing.py — Length-bucketed batches with dynamic padding
+-----------------------------------------------------------
+With config.VARIABLE_LENGTH, datasets return clips cropped to
+MAX_AUDIO_SAMPLES but not padded. LengthBucketSampler shuffles the clips,
+takes pools of BUCKET_BATCHES batches, sorts each pool by length and cuts it
+into batches, then shuffles the batch order. pad_collate pads each batch only
+to its longest clip (rounded up to PAD_MULTIPLE) and returns an attention
+mask, which train_model passes on to models whose forward accepts it
+(Wav2Vec2Classifier).
+
+Estimate the epoch-time saving on a dataset's real durations (from model/):
+    python -m training.bucketing --datasets ravdess,cremad,tess,savee --model facebook/wav2vec2-base
+"""
+
+import argparse
+import time
+import numpy as np
+import torch
+from torch.utils.data import Sampler, Subset, default_collate
+from training import config
+
+
+class LengthBucketSampler(Sampler):
+    """Batch sampler yielding index lists of similar length; reshuffled every epoch."""
+
+    def __init__(self, lengths, batch_size=config.BATCH_SIZE, bucket_batches=config.BUCKET_BATCHES,
+                 shuffle=True, drop_last=False, seed=42):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_batches = bucket_batches
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def batches(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        pool = self.batch_size * self.bucket_batches
+        batches = []
+        for start in range(0, len(order), pool):
+            chunk = order[start:start + pool]
+            chunk = chunk[np.argsort(self.lengths[chunk], kind="stable")]
+            batches.extend(chunk[i:i + self.batch_size] for i in range(0, len(chunk), self.batch_size))
+        if self.drop_last:
+            batches = [batch for batch in batches if len(batch) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self):
+        batches = self.batches()
+        self.epoch += 1
+        return iter([batch.tolist() for batch in batches])
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        pool = self.batch_size * self.bucket_batches
+        full, rest = divmod(len(self.lengths), pool)
+        return full * self.bucket_batches + -(-rest // self.batch_size)
+
+
+def pad_collate(batch, pad_multiple=config.PAD_MULTIPLE):
+    """[(waveform (samples,), label)] -> (waveforms (B, T), attention_mask (B, T), labels) with T the padded batch max."""
+    waveforms, labels = zip(*batch)
+    longest = max(len(w) for w in waveforms)
+    longest = -(-longest // pad_multiple) * pad_multiple
+    X = torch.zeros(len(waveforms), longest, dtype=waveforms[0].dtype)
+    mask = torch.zeros(len(waveforms), longest, dtype=torch.long)
+    for row, w in enumerate(waveforms):
+        X[row, :len(w)] = w
+        mask[row, :len(w)] = 1
+    return X, mask, default_collate(labels)
+
+
+def dataset_lengths(dataset):
+    """Per-clip lengths in samples of a BaseSERDataset or a Subset of one."""
+    if isinstance(dataset, Subset):
+        return dataset_lengths(dataset.dataset)[np.asarray(dataset.indices)]
+    return dataset.lengths()
+
+
+def padded_samples(lengths, batches, pad_multiple=config.PAD_MULTIPLE):
+    """Total samples computed when each batch is padded to its longest clip."""
+    return sum(len(batch) * -(-int(lengths[batch].max()) // pad_multiple) * pad_multiple for batch in batches)
+
+
+def time_batches(model, lengths, batches):
+    """Seconds for forward + backward over random waveforms shaped like the given batches."""
+    model.train()
+    start = time.perf_counter()
+    for batch in batches:
+        X, mask, _ = pad_collate([(torch.randn(int(lengths[i])), 0) for i in batch])
+        model(X, attention_mask=mask).logits.sum().backward()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    from transformers import Wav2Vec2ForSequenceClassification
+    from training.datasets import MultiDataset
+
+    parser = argparse.ArgumentParser(description="Fixed 4 s padding vs length-bucketed batches")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--model", default="facebook/wav2vec2-base")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--timed-batches", type=int, default=4, help="batches timed per scheme (epoch time is extrapolated)")
+    args = parser.parse_args()
+
+    lengths = MultiDataset(datasets=args.datasets.split(",")).lengths()
+    fixed_lengths = np.full(len(lengths), config.MAX_AUDIO_SAMPLES)
+    fixed = LengthBucketSampler(fixed_lengths, args.batch_size).batches()
+    bucketed = LengthBucketSampler(lengths, args.batch_size).batches()
+    print(f"{len(lengths)} clips, mean {lengths.mean() / config.SAMPLE_RATE:.2f} s; samples computed per epoch: "
+          f"fixed {padded_samples(fixed_lengths, fixed) / 1e6:.1f}M, bucketed {padded_samples(lengths, bucketed) / 1e6:.1f}M")
+
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(args.model, num_labels=len(config.EMOTIONS))
+    rng = np.random.default_rng(0)
+    sample = lambda batches: [batches[i] for i in rng.choice(len(batches), args.timed_batches, replace=False)]
+    time_batches(model, lengths, sample(bucketed)[:1])  # warm up
+    fixed_s = time_batches(model, fixed_lengths, sample(fixed)) / args.timed_batches * len(fixed)
+    bucketed_s = time_batches(model, lengths, sample(bucketed)) / args.timed_batches * len(bucketed)
+    print(f"Estimated train epoch (forward + backward): fixed {fixed_s:.0f} s, bucketed {bucketed_s:.0f} s "
+          f"({(1 - bucketed_s / fixed_s) * 100:.0f}% less)")
@@ -0,0 +1,215 @@
+"""
+calibrate_cascade.py — Export the CRNN first stage and pick the cascade threshold
+---------------------------------------------------------------------------------
+- LogMelCRNN: LogMel features (feature_extraction.py) + a trained CRNN in one
+  module taking raw (batch, samples) 16 kHz waveforms.
+- export_crnn: torch.export program with a dynamic batch axis, loadable by the
+  backend without any model code.
+- calibrate_threshold: on held-out clips scored by both models, the cascade
+  accuracy, escalation rate and expected cost per request for every candidate
+  threshold, and the cheapest threshold that reaches the target accuracy.
+
+The held-out clips are prepared as the API prepares requests, so the
+confidence cut-off is fitted to the distribution it gates when serving: the
+dataset is loaded unpadded (variable_length), trimmed / normalized per
+config.TRIM_SILENCE / NORMALIZE_LOUDNESS (recorded in the manifest, and the
+API's flags must match), the CRNN sees each clip cropped / zero-padded to
+4 s (cascade.fit_length) and Wav2Vec2 sees it unpadded.
+
+Usage (from model/):
+    python -m training.calibrate_cascade --crnn best_model.pt --wav2vec2 <fine-tuned dir> \\
+        --out-dir cascade/ --target-accuracy 0.94
+    # then serve with MODEL_REGISTRY=cascade/registry.json
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from training import config
+from training.bucketing import pad_collate
+from training.cascade import CRITERIA, confidence, fit_length
+from training.feature_extraction import LogMel
+from training.model import CRNN
+
+
+class LogMelCRNN(nn.Module):
+    """Raw waveform -> log-mel (batch, time, n_mels) -> CRNN logits."""
+
+    def __init__(self, crnn):
+        super().__init__()
+        logmel = LogMel()
+        self.melspec = logmel.melspec
+        self.amplitude_to_db = logmel.amplitude_to_db
+        self.crnn = crnn
+
+    def forward(self, waveform):
+        features = self.amplitude_to_db(self.melspec(waveform))  # (batch, n_mels, time)
+        return self.crnn(features.transpose(1, 2))
+
+
+def export_crnn(model, out_path, input_samples=config.MAX_AUDIO_SAMPLES, max_batch=64):
+    """Save a torch.export program for fixed-length input; the LSTM is unrolled, so the length is static."""
+    model = model.cpu().eval()
+    batch = torch.export.Dim("batch", min=1, max=max_batch)
+    program = torch.export.export(
+        model, (torch.randn(2, input_samples),), dynamic_shapes={"waveform": {0: batch}}
+    )
+    torch.export.save(program, out_path)
+    return out_path
+
+
+@torch.no_grad()
+def collect_probs(predict, dataset, batch_size=config.BATCH_SIZE):
+    """
+    Softmax outputs of predict(list of 1-D float32 waveforms) over a dataset,
+    plus labels. Clips of a variable-length dataset are passed unpadded.
+    """
+    variable = getattr(getattr(dataset, "dataset", dataset), "variable_length", False)
+    probs, labels = [], []
+    for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=pad_collate if variable else None):
+        X, y = batch[0], batch[-1]
+        lengths = batch[1].sum(1).tolist() if len(batch) == 3 else [X.shape[1]] * len(X)
+        logits = predict([x[:n].numpy() for x, n in zip(X, lengths)])
+        probs.append(torch.softmax(logits.float(), dim=-1).cpu().numpy())
+        labels.append(y.numpy())
+    return np.concatenate(probs), np.concatenate(labels)
+
+
+@torch.no_grad()
+def measure_cost_ms(predict, input_samples=config.MAX_AUDIO_SAMPLES, repeats=20):
+    """Median single-clip latency in ms (the per-request cost of a stage)."""
+    clip = torch.randn(1, input_samples)
+    predict(clip)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(clip)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def calibrate_threshold(first_probs, fallback_probs, labels, first_cost_ms, fallback_cost_ms,
+                        target_accuracy=None, criterion="margin"):
+    """
+    Sweep every distinct first-stage confidence as a threshold. A clip keeps the
+    first stage's answer when its confidence >= threshold, otherwise it pays for
+    the fallback too. Picks the cheapest threshold whose accuracy reaches
+    target_accuracy (default: fallback accuracy minus one point).
+    """
+    conf = confidence(first_probs, criterion)
+    first_correct = first_probs.argmax(1) == labels
+    fallback_correct = fallback_probs.argmax(1) == labels
+    fallback_accuracy = float(fallback_correct.mean())
+    if target_accuracy is None:
+        target_accuracy = fallback_accuracy - 0.01
+
+    curve = []
+    for threshold in np.concatenate([np.unique(conf), [np.inf]]):
+        confident = conf >= threshold
+        escalation_rate = float(1 - confident.mean())
+        curve.append({
+            "threshold": float(threshold),
+            "accuracy": float(np.where(confident, first_correct, fallback_correct).mean()),
+            "escalation_rate": escalation_rate,
+            "expected_cost_ms": first_cost_ms + escalation_rate * fallback_cost_ms,
+        })
+    feasible = [row for row in curve if row["accuracy"] >= target_accuracy]
+    if feasible:
+        chosen = min(feasible, key=lambda row: (row["expected_cost_ms"], -row["accuracy"]))
+    else:  # target unreachable: best accuracy, cheapest among ties
+        chosen = max(curve, key=lambda row: (row["accuracy"], -row["expected_cost_ms"]))
+    return {
+        "criterion": criterion,
+        "target_accuracy": target_accuracy,
+        "target_met": bool(feasible),
+        "first_accuracy": float(first_correct.mean()),
+        "fallback_accuracy": fallback_accuracy,
+        "first_cost_ms": first_cost_ms,
+        "fallback_cost_ms": fallback_cost_ms,
+        "chosen": chosen,
+        "speedup_vs_fallback": fallback_cost_ms / chosen["expected_cost_ms"],
+        "curve": curve,
+    }
+
+
+if __name__ == "__main__":
+    from torch.utils.data import Subset
+    from transformers import Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+    from training.datasets import MultiDataset
+    from training.split import stratified_split
+
+    parser = argparse.ArgumentParser(description="Export the CRNN first stage and calibrate the cascade threshold")
+    parser.add_argument("--crnn", required=True, help="CRNN state_dict from train_model")
+    parser.add_argument("--cnn-channels", type=int, default=128)
+    parser.add_argument("--lstm-hidden", type=int, default=256)
+    parser.add_argument("--lstm-layers", type=int, default=2)
+    parser.add_argument("--wav2vec2", default="manelbrh1342/emotion-recognition-model")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--criterion", choices=CRITERIA, default="margin")
+    parser.add_argument("--target-accuracy", type=float, default=None,
+                        help="Default: Wav2Vec2 validation accuracy minus one point")
+    parser.add_argument("--out-dir", default="cascade")
+    args = parser.parse_args()
+
+    crnn = CRNN(n_mels=config.N_MELS, cnn_channels=args.cnn_channels, lstm_hidden=args.lstm_hidden,
+                lstm_layers=args.lstm_layers, dropout=0.0, num_classes=len(config.EMOTIONS))
+    crnn.load_state_dict(torch.load(args.crnn, map_location="cpu", weights_only=True))
+    first = LogMelCRNN(crnn).eval()
+
+    processor = Wav2Vec2FeatureExtractor.from_pretrained(args.wav2vec2)
+    wav2vec2 = Wav2Vec2ForSequenceClassification.from_pretrained(args.wav2vec2).eval()
+
+    def screen(audios):
+        # As Cascade.screen: every clip cropped / zero-padded to the CRNN's fixed length
+        return first(torch.from_numpy(fit_length(audios, config.MAX_AUDIO_SAMPLES)))
+
+    def fallback(audios):
+        # As the API runs escalated clips: unpadded, per-clip normalization, and only
+        # clips of equal length share a forward (padding shifts group-norm statistics)
+        logits = torch.zeros(len(audios), len(config.EMOTIONS))
+        for length in set(len(audio) for audio in audios):
+            rows = [i for i, audio in enumerate(audios) if len(audio) == length]
+            inputs = processor([audios[i] for i in rows], sampling_rate=config.SAMPLE_RATE, return_tensors="pt")
+            logits[rows] = wav2vec2(inputs["input_values"]).logits.float()
+        return logits
+
+    dataset = MultiDataset(datasets=args.datasets.split(","), variable_length=True)
+    _, val_idx, _ = stratified_split(dataset.samples, [label for _, label in dataset.samples])
+    held_out = Subset(dataset, val_idx)
+    first_probs, labels = collect_probs(screen, held_out)
+    fallback_probs, _ = collect_probs(fallback, held_out)
+    report = calibrate_threshold(
+        first_probs, fallback_probs, labels,
+        first_cost_ms=measure_cost_ms(first), fallback_cost_ms=measure_cost_ms(lambda X: fallback(list(X.numpy()))),
+        target_accuracy=args.target_accuracy, criterion=args.criterion
+    )
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    export_crnn(first, os.path.join(args.out_dir, "crnn.pt2"))
+    manifest = {
+        "models": {
+            "crnn": {"format": "torch_export", "path": "crnn.pt2", "input_samples": config.MAX_AUDIO_SAMPLES,
+                     "cost_ms": report["first_cost_ms"]},
+            # omit to fall back to the server's MODEL_PATH / INFERENCE_ENGINE
+            "wav2vec2": {"format": "wav2vec2", "path": args.wav2vec2, "cost_ms": report["fallback_cost_ms"]},
+        },
+        "cascade": {"first": "crnn", "fallback": "wav2vec2", "criterion": args.criterion,
+                    "threshold": report["chosen"]["threshold"],
+                    # preprocessing the threshold was calibrated under; the API's flags must match
+                    "trim_silence": config.TRIM_SILENCE, "normalize_loudness": config.NORMALIZE_LOUDNESS},
+    }
+    with open(os.path.join(args.out_dir, "registry.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(args.out_dir, "calibration.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    chosen = report["chosen"]
+    print(f"Threshold {chosen['threshold']:.4f} ({args.criterion}): accuracy {chosen['accuracy']*100:.2f}% "
+          f"(Wav2Vec2 alone {report['fallback_accuracy']*100:.2f}%), escalates {chosen['escalation_rate']*100:.1f}% "
+          f"of clips, expected {chosen['expected_cost_ms']:.1f} ms/request vs {report['fallback_cost_ms']:.1f} ms "
+          f"({report['speedup_vs_fallback']:.1f}x)")
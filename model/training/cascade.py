@@ -0,0 +1,57 @@
+"""
+cascade.py — Two-stage cascade: cheap model first, Wav2Vec2 when unsure
+-----------------------------------------------------------------------
+A log-mel CRNN scores every clip; only clips whose CRNN confidence (top-1
+probability, or top-1 minus top-2 margin) falls below a calibrated
+threshold are escalated to Wav2Vec2. The first stage is a torch.export
+program taking (batch, samples) 16 kHz waveforms, so serving needs no
+model code; see training/calibrate_cascade.py for export and calibration.
+"""
+
+import numpy as np
+import torch
+
+CRITERIA = ("max_prob", "margin")
+
+
+def confidence(probs, criterion="margin"):
+    """Per-row confidence of (N, C) probabilities: top-1 probability or top-1 minus top-2."""
+    probs = np.asarray(probs)
+    if criterion == "max_prob":
+        return probs.max(axis=1)
+    if criterion == "margin":
+        top2 = np.partition(probs, -2, axis=1)[:, -2:]
+        return top2[:, 1] - top2[:, 0]
+    raise ValueError(f"Unknown criterion {criterion!r}; expected one of {CRITERIA}")
+
+
+def fit_length(audios, n_samples):
+    """Crop / zero-pad each waveform to n_samples (the training length) and stack to (batch, n_samples)."""
+    batch = np.zeros((len(audios), n_samples), dtype=np.float32)
+    for row, audio in zip(batch, audios):
+        audio = np.asarray(audio, dtype=np.float32)[:n_samples]
+        row[:len(audio)] = audio
+    return batch
+
+
+class Cascade:
+    """
+    first:         callable mapping a (batch, input_samples) float tensor to logits
+    threshold:     clips with confidence >= threshold keep the first stage's answer
+    input_samples: fixed input length of the first stage (4 s at 16 kHz in training)
+    """
+
+    def __init__(self, first, threshold, criterion="margin", input_samples=64000):
+        if criterion not in CRITERIA:
+            raise ValueError(f"Unknown criterion {criterion!r}; expected one of {CRITERIA}")
+        self.first = first
+        self.threshold = threshold
+        self.criterion = criterion
+        self.input_samples = input_samples
+
+    @torch.no_grad()
+    def screen(self, audios):
+        """First-stage (probabilities, confident mask) for a list of 16 kHz waveforms."""
+        batch = torch.from_numpy(fit_length(audios, self.input_samples))
+        probs = torch.softmax(self.first(batch).float(), dim=-1).numpy()
+        return probs, confidence(probs, self.criterion) >= self.threshold
@@ -0,0 +1,160 @@
+"""
+checkpoint.py — Background, atomic, resumable checkpoints
+---------------------------------------------------------
+CheckpointWriter takes a snapshot of the state on the training thread (a
+tensor copy to host memory, non-blocking from CUDA) and leaves serializing
+and writing to a background thread, so a slow disk no longer stalls the
+epoch loop. Files are written to a temporary name and renamed into place,
+so a crash never leaves a truncated checkpoint; only the last `keep`
+epoch checkpoints are kept.
+
+training_state / restore_training_state capture everything train_model
+needs to continue exactly where it stopped: model, optimizer, scheduler and
+grad-scaler state, the epoch, the best F1, the history and the Python /
+NumPy / torch (and CUDA) RNG states.
+"""
+
+import glob
+import os
+import queue
+import random
+import re
+import threading
+import numpy as np
+import torch
+
+CHECKPOINT_PATTERN = "checkpoint_epoch{:03d}.pt"
+
+
+def snapshot(obj):
+    """Copy of a (nested) state with every tensor detached into host memory."""
+    if torch.is_tensor(obj):
+        if obj.device.type == "cpu":
+            return obj.detach().clone()
+        host = torch.empty(obj.shape, dtype=obj.dtype, pin_memory=True)
+        return host.copy_(obj.detach(), non_blocking=True)
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+
+def rng_state():
+    state = {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def training_state(model, optimizer, scheduler, scaler, epoch, best_f1, history):
+    """Everything needed to resume after `epoch` (1-based, completed)."""
+    return {
+        "epoch": epoch,
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "scheduler": scheduler.state_dict() if scheduler is not None else None,
+        "scaler": scaler.state_dict(),
+        "best_f1": best_f1,
+        "history": history,
+        "rng": rng_state(),
+    }
+
+
+def restore_training_state(state, model, optimizer, scheduler, scaler):
+    """Load a training_state checkpoint; returns (epochs completed, best F1, history)."""
+    model.load_state_dict(state["model"])
+    optimizer.load_state_dict(state["optimizer"])
+    if scheduler is not None and state["scheduler"] is not None:
+        scheduler.load_state_dict(state["scheduler"])
+    scaler.load_state_dict(state["scaler"])
+    set_rng_state(state["rng"])
+    return state["epoch"], state["best_f1"], state["history"]
+
+
+def latest_checkpoint(directory):
+    """Path of the highest-epoch checkpoint in directory, or None."""
+    paths = glob.glob(os.path.join(directory, CHECKPOINT_PATTERN.replace("{:03d}", "*")))
+    epochs = [(int(re.search(r"(\d+)\.pt$", path).group(1)), path) for path in paths]
+    return max(epochs)[1] if epochs else None
+
+
+def load_checkpoint(path):
+    # Full training state includes optimizer / RNG objects, not just tensors
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+
+class CheckpointWriter:
+    """
+    save(state, path) returns as soon as the snapshot is taken; one background
+    thread writes files in order. A write error is re-raised by the next
+    save() or by close().
+    """
+
+    def __init__(self, directory=".", keep=3):
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1 (the checkpoint to resume from), got {keep}")
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=2)  # bounds host memory held by pending snapshots
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, state, path):
+        self._raise_pending()
+        state = snapshot(state)
+        event = None
+        if torch.cuda.is_available():
+            event = torch.cuda.Event()
+            event.record()
+        self._queue.put((state, path, event))
+
+    def save_epoch(self, state, epoch):
+        """Numbered training-state checkpoint; older ones beyond `keep` are pruned after the write."""
+        self.save(state, os.path.join(self.directory, CHECKPOINT_PATTERN.format(epoch)))
+
+    def close(self, raise_error=True):
+        """Wait for pending writes to finish; raise_error=False only prints a write error."""
+        self._queue.put(None)
+        self._thread.join()
+        if raise_error:
+            self._raise_pending()
+        elif self._error is not None:
+            print(f"Background checkpoint write failed: {self._error!r}")
+            self._error = None
+
+    def _raise_pending(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Background checkpoint write failed") from error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            state, path, event = item
+            try:
+                if event is not None:
+                    event.synchronize()  # device-to-host copies done
+                tmp_path = path + ".tmp"
+                torch.save(state, tmp_path)
+                os.replace(tmp_path, path)
+                self._prune()
+            except Exception as error:  # surfaced on the training thread
+                self._error = error
+
+    def _prune(self):
+        pattern = os.path.join(self.directory, CHECKPOINT_PATTERN.replace("{:03d}", "*"))
+        for path in sorted(glob.glob(pattern))[:-self.keep]:
+            os.remove(path)
@@ -12,12 +12,24 @@ DATASET_PATHS = {
     "savee": "datasets/savee"
 }
 
+# Persisted file index of each corpus (datasets/index.py), reused until a directory changes
+INDEX_DIR = "cache/index"
+INDEX_WORKERS = 16  # threads listing directories / reading WAV headers
+
 # Training hyperparameters
 BATCH_SIZE = 32
 EPOCHS = 30
 LEARNING_RATE = 1e-3
 WEIGHT_DECAY = 1e-5
 
+# Training engine (train.py)
+NUM_WORKERS = 4        # DataLoader worker processes (0: load in the training process)
+PREFETCH_FACTOR = 2    # batches prefetched per worker
+AMP = None             # None, "bf16" (CPU/CUDA autocast) or "fp16" (CUDA)
+LOG_EVERY = 50         # print throughput every N optimizer steps (0: per epoch only)
+EVAL_BATCH_SIZE = 128  # evaluate_model runs without gradients, so batches can be larger
+KEEP_CHECKPOINTS = 3   # epoch checkpoints kept in train_model's checkpoint_dir
+
 # Audio parameters
 
 SAMPLE_RATE = 16000
@@ -28,6 +40,36 @@ HOP_LENGTH = 160
 MAX_AUDIO_SECONDS = 4
 MAX_AUDIO_SAMPLES = SAMPLE_RATE * MAX_AUDIO_SECONDS  # 64000
 
+# Compute MFCC / log-mel + SpecAugment on whole batches on the training device
+# (feature_extraction.BatchFeatures) instead of per clip in the DataLoader
+BATCHED_FEATURES = True
+
+# Variable-length training (bucketing.py): clips are cropped to MAX_AUDIO_SAMPLES but
+# not padded; batches group similar durations and pad to the batch max with an attention mask
+VARIABLE_LENGTH = False
+BUCKET_BATCHES = 100      # batches drawn per shuffled pool before sorting by length
+PAD_MULTIPLE = 320        # pad batch length up to a multiple (one Wav2Vec2 frame = 320 samples)
+
+# Silence trimming + loudness normalization (the API's TRIM_SILENCE / NORMALIZE_LOUDNESS).
+# Off, as the milestones and the served v6 model were trained; a model trained with them
+# must be served with both env vars set to match.
+TRIM_SILENCE = False
+TRIM_TOP_DB = 30          # frames this far below the loudest frame count as silence
+NORMALIZE_LOUDNESS = False
+TARGET_DB = -25           # RMS loudness target (dBFS)
+
+# Memory-mapped cache of the preprocessed waveforms (waveform_cache.py); None decodes every epoch
+WAVEFORM_CACHE_DIR = None
+WAVEFORM_CACHE_DTYPE = "float32"  # "float16" halves the disk / page-cache footprint
+
+# Frozen Wav2Vec2 encoder outputs for head-only experiments (embedding_cache.py)
+EMBEDDING_CACHE_DIR = "cache/embeddings"
+
+# Knowledge distillation (distill.py): cached teacher logits, soft / hard loss mix
+TEACHER_LOGITS_DIR = "cache/teacher_logits"
+DISTILL_ALPHA = 0.5        # weight of the soft (teacher) term; 1 - alpha goes to the hard labels
+DISTILL_TEMPERATURE = 2.0  # softens both distributions in the soft term
+
 
 # Emotion classes (fixed across datasets)
 EMOTIONS = [
@@ -1,7 +1,7 @@
+from .base_dataset import BaseSERDataset
 from .ravdess import RAVDESSDataset
 from .cremad import CREMADDataset
 from .tess import TESSDataset
 from .savee import SAVEEDataset
 from .emotions import EmotionsDataset
 from .multi import MultiDataset
-from .base_dataset import BaseSERDataset
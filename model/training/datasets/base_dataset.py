@@ -4,51 +4,105 @@ base_dataset.py — Base dataset class
 Provides a unified interface for all SER datasets.
 """
 
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 import torchaudio
 from training import config
-import os
+from training.resampling import get_resampler
+from training.vad import normalize_volume, trim_silence
+from training.datasets.index import load_index
 
 class BaseSERDataset(Dataset):
-    def __init__(self, root_dir, transform=None, emotions=config.EMOTIONS):
+    corpus = None  # index name; subclasses set it and implement label_for
+
+    def __init__(self, root_dir, transform=None, emotions=config.EMOTIONS,
+                 cache_dir=config.WAVEFORM_CACHE_DIR, cache_dtype=config.WAVEFORM_CACHE_DTYPE,
+                 variable_length=config.VARIABLE_LENGTH):
+        """variable_length: crop to MAX_AUDIO_SAMPLES but do not pad (see bucketing.py)."""
         self.root_dir = root_dir
         self.transform = transform
         self.emotions = emotions
+        self.variable_length = variable_length
+        self.index = None
         self.samples = self._load_files()
+        self.cache = None
+        if cache_dir:
+            self.build_cache(cache_dir, cache_dtype)
 
-    def _load_files(self):
-        """Implemented by subclasses: return list of (filepath, label)."""
+    def build_cache(self, cache_dir, dtype="float32", num_workers=0):
+        """Preprocess every file once into a memory-mapped cache (reused while sources and config match)."""
+        from training.waveform_cache import WaveformCache
+
+        self.cache = None  # decode from source while building
+        self.cache = WaveformCache.open_or_build(self, cache_dir, dtype, num_workers)
+        return self
+
+    @staticmethod
+    def label_for(relpath):
+        """Implemented by subclasses: emotion label for a file (path relative to root_dir), or None to skip it."""
         raise NotImplementedError
 
+    def _load_files(self):
+        """(filepath, label) sequence from the corpus's persisted file index (see index.py)."""
+        self.index = load_index(self.corpus, self.root_dir, self.label_for)
+        return self.index.samples()
+
     def __len__(self):
         return len(self.samples)
 
     def __getitem__(self, idx):
         filepath, label = self.samples[idx]
+        if self.cache is not None:
+            waveform = self.cache[idx]
+            if self.variable_length:
+                waveform = waveform[:self.cache.lengths[idx]]
+            waveform = waveform.unsqueeze(0)
+        else:
+            waveform = self.load_waveform(filepath, pad=not self.variable_length)
+
+        if self.transform:
+            features = self.transform(waveform)
+        else:
+            features = waveform
+
+        label_idx = self.emotions.index(label)
+        return features.squeeze(0), torch.tensor(label_idx)
+
+    def load_waveform(self, filepath, pad=True):
+        """Decode one file to a (1, MAX_AUDIO_SAMPLES) 16 kHz mono float32 tensor (pad=False: up to that length)."""
         waveform, sr = torchaudio.load(filepath)
-        if sr != config.SAMPLE_RATE:
-            waveform = torchaudio.functional.resample(waveform, sr, config.SAMPLE_RATE)
 
-        # Ensure mono
+        # Ensure mono (before resampling, so only one channel is filtered)
         if waveform.shape[0] > 1:
             waveform = waveform.mean(dim=0, keepdim=True)
 
+        if sr != config.SAMPLE_RATE:
+            waveform = get_resampler(sr, config.SAMPLE_RATE)(waveform)
+
+        # Same silence trimming and loudness normalization as the serving path
+        if config.TRIM_SILENCE or config.NORMALIZE_LOUDNESS:
+            audio = waveform[0].numpy()
+            if config.TRIM_SILENCE:
+                audio, _ = trim_silence(audio, config.SAMPLE_RATE, top_db=config.TRIM_TOP_DB)
+            if config.NORMALIZE_LOUDNESS:
+                audio = normalize_volume(audio, config.TARGET_DB)
+            waveform = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).unsqueeze(0)
+
         # Trim or pad to MAX_AUDIO_SAMPLES
         max_len = config.MAX_AUDIO_SAMPLES
         if waveform.shape[1] > max_len:
             waveform = waveform[:, :max_len]
-        elif waveform.shape[1] < max_len:
+        elif pad and waveform.shape[1] < max_len:
             pad = max_len - waveform.shape[1]
             waveform = torch.nn.functional.pad(waveform, (0, pad))
+        return waveform
 
-        if self.transform:
-            features = self.transform(waveform)
-        else:
-            features = waveform
-
-        label_idx = self.emotions.index(label)
-        return features.squeeze(0), torch.tensor(label_idx)
+    def lengths(self):
+        """Per-clip length in samples after cropping: exact from the cache, else from the index's durations."""
+        if self.cache is not None:
+            return np.asarray(self.cache.lengths)
+        return np.minimum(np.round(self.index.duration * config.SAMPLE_RATE), config.MAX_AUDIO_SAMPLES).astype(np.int64)
 
     def class_weights(self):
         """Return tensor of class weights (for imbalance)."""
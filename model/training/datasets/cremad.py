@@ -5,19 +5,18 @@ Uses filename convention: "ID_XXX_XXX_XXX.wav"
 """
 
 import os
-from datasets.base_dataset import BaseSERDataset
-from datasets.emotions import LABEL_MAP
+from training import config
+from training.datasets.base_dataset import BaseSERDataset
+from training.datasets.emotions import LABEL_MAP
 
 class CREMADDataset(BaseSERDataset):
-    def __init__(self, root_dir, transform=None, emotions=None):
-        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS)
+    corpus = "cremad"
 
-    def _load_files(self):
-        samples = []
-        for f in os.listdir(self.root_dir):
-            if f.endswith(".wav"):
-                emo = f.split("_")[2]
-                if emo in LABEL_MAP["cremad"]:
-                    label = LABEL_MAP["cremad"][emo]
-                    samples.append((os.path.join(self.root_dir, f), label))
-        return samples
+    def __init__(self, root_dir, transform=None, emotions=None, **kwargs):
+        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS, **kwargs)
+
+    @staticmethod
+    def label_for(relpath):
+        # e.g. 1001_DFA_ANG_XX.wav
+        parts = os.path.basename(relpath).split("_")
+        return LABEL_MAP["cremad"].get(parts[2]) if len(parts) == 4 else None
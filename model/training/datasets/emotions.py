@@ -1,26 +1,43 @@
 """
 emotions.py — Custom Emotions dataset loader
 --------------------------------------------
-Handles the "audio-emotions/Emotions" dataset with folders named by emotion.
+Handles the "audio-emotions/Emotions" dataset with folders named by emotion,
+and holds LABEL_MAP, each corpus's own emotion codes mapped onto
+config.EMOTIONS.
 """
 
 import os
-from datasets.base_dataset import BaseSERDataset
 from training import config
+from training.datasets.base_dataset import BaseSERDataset
+
+LABEL_MAP = {
+    "ravdess": {
+        "01": "neutral", "02": "calm", "03": "happy", "04": "sad",
+        "05": "angry", "06": "fearful", "07": "disgust", "08": "surprised"
+    },
+    "cremad": {
+        "ANG": "angry", "DIS": "disgust", "FEA": "fearful",
+        "HAP": "happy", "NEU": "neutral", "SAD": "sad"
+    },
+    "tess": {
+        "angry": "angry", "disgust": "disgust", "fear": "fearful", "happy": "happy", "neutral": "neutral",
+        "sad": "sad", "pleasant_surprise": "surprised", "pleasant_surprised": "surprised", "ps": "surprised"
+    },
+    "savee": {
+        "a": "angry", "d": "disgust", "f": "fearful", "h": "happy",
+        "n": "neutral", "sa": "sad", "su": "surprised"
+    },
+}
 
 class EmotionsDataset(BaseSERDataset):
-    def __init__(self, root_dir, transform=None, emotions=None):
-        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS)
+    corpus = "emotions"
+
+    def __init__(self, root_dir, transform=None, emotions=None, **kwargs):
+        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS, **kwargs)
 
-    def _load_files(self):
-        samples = []
-        for folder in os.listdir(self.root_dir):
-            folder_path = os.path.join(self.root_dir, folder)
-            if not os.path.isdir(folder_path):
-                continue
-            label = folder.lower().strip()
-            if label in config.EMOTIONS:
-                for f in os.listdir(folder_path):
-                    if f.endswith(".wav"):
-                        samples.append((os.path.join(folder_path, f), label))
-        return samples
+    @staticmethod
+    def label_for(relpath):
+        # <emotion>/<clip>.wav, one level deep
+        parts = relpath.split(os.sep)
+        label = parts[0].lower().strip()
+        return label if len(parts) == 2 and label in config.EMOTIONS else None
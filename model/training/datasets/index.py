@@ -0,0 +1,184 @@
+"""
+index.py — Persisted, parallel-scanned file index for SER corpora
+-----------------------------------------------------------------
+Scanning a corpus means listing every directory and reading every WAV header
+(duration, sample rate). That is done once per corpus root, with a thread pool
+(directory listings and libsndfile header reads release the GIL), and saved
+as an .npz under config.INDEX_DIR.
+
+Later runs stat only the indexed directories. If none has changed mtime, the
+saved index is used as is. Otherwise the tree is re-listed, and only
+new or modified files (by size and mtime) have their headers read again. A
+file overwritten in place does not touch its directory's mtime; pass
+refresh=True to re-read everything.
+
+Files whose header cannot be read stay in the saved index (so they are not
+re-read on every scan) but are left out of the loaded FileIndex, with a
+warning.
+
+The index is an inventory of WAV files; labels are derived from paths by each
+loader's label_for() when the index is loaded, so fixing a label map never
+requires a rescan. Columns are numpy arrays rather than Python lists, so
+DataLoader workers share them copy-on-write instead of each touching (and
+copying) a list of tuples.
+"""
+
+import hashlib
+import os
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+from training import config
+
+INDEX_VERSION = 1
+AUDIO_EXTENSIONS = (".wav",)
+
+
+class FileIndex:
+    """Column arrays path / label / corpus / duration (s) / sample_rate, one row per clip."""
+
+    FIELDS = ("path", "label", "corpus", "duration", "sample_rate")
+
+    def __init__(self, path, label, corpus, duration, sample_rate):
+        self.path = np.asarray(path, dtype=str)
+        self.label = np.asarray(label, dtype=str)
+        self.corpus = np.asarray(corpus, dtype=str)
+        self.duration = np.asarray(duration, dtype=np.float32)
+        self.sample_rate = np.asarray(sample_rate, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.path)
+
+    @classmethod
+    def concat(cls, indexes):
+        return cls(*(np.concatenate([getattr(index, field) for index in indexes]) for field in cls.FIELDS))
+
+    def samples(self):
+        return SampleView(self.path, self.label)
+
+
+class SampleView(Sequence):
+    """(path, label) pairs read from the index arrays on access, so nothing is materialized per worker."""
+
+    def __init__(self, paths, labels):
+        self.paths = paths
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        return str(self.paths[idx]), str(self.labels[idx])
+
+
+def load_index(corpus, root_dir, label_for, index_dir=None, workers=None, refresh=False):
+    """FileIndex of root_dir's labelled clips; label_for(path relative to root) -> label or None to skip."""
+    index_dir = index_dir or config.INDEX_DIR
+    workers = workers or config.INDEX_WORKERS
+    root_dir = os.path.abspath(root_dir)
+    digest = hashlib.sha256(root_dir.encode()).hexdigest()[:8]
+    index_path = os.path.join(index_dir, f"{corpus}-{digest}.npz")
+
+    saved = None if refresh else _read(index_path, root_dir)
+    if saved is None or not _dirs_unchanged(saved):
+        saved = _scan(root_dir, saved, workers)
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = index_path + ".tmp.npz"
+        np.savez(tmp_path, version=INDEX_VERSION, root=root_dir, **saved)
+        os.replace(tmp_path, index_path)
+
+    paths = saved["path"]
+    readable = saved["sample_rate"] > 0
+    if not readable.all():
+        unreadable = paths[~readable]
+        print(f"Warning: skipping {len(unreadable)} unreadable file(s) in {root_dir}, e.g. {unreadable[0]}")
+    labels = [label_for(os.path.relpath(path, root_dir)) if ok else None for path, ok in zip(paths, readable)]
+    keep = np.array([label is not None for label in labels], dtype=bool)
+    return FileIndex(
+        paths[keep], np.array([label for label in labels if label is not None], dtype=str),
+        np.full(int(keep.sum()), corpus), saved["duration"][keep], saved["sample_rate"][keep],
+    )
+
+
+def _read(index_path, root_dir):
+    if not os.path.exists(index_path):
+        return None
+    with np.load(index_path) as data:
+        if int(data["version"]) != INDEX_VERSION or str(data["root"]) != root_dir:
+            return None
+        return {key: data[key] for key in data.files if key not in ("version", "root")}
+
+
+def _dirs_unchanged(saved):
+    for directory, mtime in zip(saved["dirs"], saved["dir_mtime_ns"]):
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def _list_dir(directory):
+    """(subdirectories, [(path, size, mtime_ns)] of audio files, directory mtime)."""
+    subdirs, files = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    return subdirs, files, os.stat(directory).st_mtime_ns
+
+
+def _header(path):
+    """(duration seconds, sample rate) from the file header; unreadable files get (0, 0) and are not loaded."""
+    try:
+        info = sf.info(path)
+    except (RuntimeError, sf.LibsndfileError):
+        return 0.0, 0
+    return info.frames / info.samplerate, info.samplerate
+
+
+def _scan(root_dir, previous, workers):
+    """List the tree level by level and read headers of new / changed files, all on a thread pool."""
+    known = {}
+    if previous is not None:
+        for path, size, mtime, duration, sr in zip(previous["path"], previous["size"], previous["mtime_ns"],
+                                                   previous["duration"], previous["sample_rate"]):
+            known[str(path)] = (int(size), int(mtime), float(duration), int(sr))
+
+    dirs, dir_mtimes, files = [], [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        level = [root_dir]
+        while level:
+            next_level = []
+            for directory, (subdirs, dir_files, mtime) in zip(level, pool.map(_list_dir, level)):
+                dirs.append(directory)
+                dir_mtimes.append(mtime)
+                files.extend(dir_files)
+                next_level.extend(subdirs)
+            level = next_level
+        files.sort()
+
+        stale = [path for path, size, mtime in files if known.get(path, (None, None))[:2] != (size, mtime)]
+        headers = dict(zip(stale, pool.map(_header, stale)))
+
+    durations, rates = [], []
+    for path, _, _ in files:
+        duration, sr = headers[path] if path in headers else known[path][2:]
+        durations.append(duration)
+        rates.append(sr)
+    return {
+        "path": np.array([path for path, _, _ in files], dtype=str),
+        "size": np.array([size for _, size, _ in files], dtype=np.int64),
+        "mtime_ns": np.array([mtime for _, _, mtime in files], dtype=np.int64),
+        "duration": np.array(durations, dtype=np.float32),
+        "sample_rate": np.array(rates, dtype=np.int32),
+        "dirs": np.array(dirs, dtype=str),
+        "dir_mtime_ns": np.array(dir_mtimes, dtype=np.int64),
+    }
@@ -0,0 +1,67 @@
+"""
+multi.py — Combined multi-corpus dataset
+----------------------------------------
+Concatenates the persisted file indexes of several corpora (see index.py)
+into one dataset, with a `corpus` column for per-corpus weighted sampling:
+
+    dataset = MultiDataset(datasets=["ravdess", "cremad", "tess", "savee"])
+    sampler = dataset.corpus_sampler({"ravdess": 2, "cremad": 1, "tess": 1, "savee": 1})
+    loader = DataLoader(dataset, batch_size=32, sampler=sampler)
+"""
+
+import os
+import numpy as np
+import torch
+from torch.utils.data import WeightedRandomSampler
+from training import config
+from training.datasets.base_dataset import BaseSERDataset
+from training.datasets.cremad import CREMADDataset
+from training.datasets.emotions import EmotionsDataset
+from training.datasets.index import FileIndex, load_index
+from training.datasets.ravdess import RAVDESSDataset
+from training.datasets.savee import SAVEEDataset
+from training.datasets.tess import TESSDataset
+
+LOADERS = {
+    "ravdess": RAVDESSDataset,
+    "cremad": CREMADDataset,
+    "tess": TESSDataset,
+    "savee": SAVEEDataset,
+    "emotions": EmotionsDataset,
+}
+
+class MultiDataset(BaseSERDataset):
+    corpus = "multi"
+
+    def __init__(self, datasets=("ravdess", "cremad", "tess", "savee"), transform=None,
+                 emotions=config.EMOTIONS, root_dirs=None, **kwargs):
+        """root_dirs: {corpus: directory}, defaulting to config.DATASET_PATHS."""
+        unknown = set(datasets) - set(LOADERS)
+        if unknown:
+            raise ValueError(f"Unknown datasets {sorted(unknown)}; expected some of {sorted(LOADERS)}")
+        self.root_dirs = {name: (root_dirs or config.DATASET_PATHS)[name] for name in datasets}
+        root_dir = os.path.commonpath([os.path.abspath(path) for path in self.root_dirs.values()])
+        super().__init__(root_dir, transform=transform, emotions=emotions, **kwargs)
+
+    def _load_files(self):
+        self.index = FileIndex.concat([
+            load_index(name, root, LOADERS[name].label_for) for name, root in self.root_dirs.items()
+        ])
+        return self.index.samples()
+
+    def corpus_sampler(self, weights=None, indices=None, num_samples=None, generator=None):
+        """
+        Sampler drawing each corpus with probability proportional to weights[corpus]
+        (default: equal), clips uniform within a corpus. With indices (e.g. the train
+        split), it draws positions into that Subset. Built from the index arrays in
+        the main process; workers only receive indices.
+        """
+        corpus = self.index.corpus if indices is None else self.index.corpus[np.asarray(indices)]
+        names, inverse, counts = np.unique(corpus, return_inverse=True, return_counts=True)
+        corpus_weights = np.array([(weights or {}).get(name, 0.0 if weights else 1.0) for name in names])
+        per_clip = torch.from_numpy(corpus_weights / counts)[torch.from_numpy(inverse)]
+        return WeightedRandomSampler(per_clip, num_samples or len(corpus), replacement=True, generator=generator)
+
+    def corpus_counts(self):
+        names, counts = np.unique(self.index.corpus, return_counts=True)
+        return dict(zip(names.tolist(), counts.tolist()))
@@ -5,23 +5,18 @@ Parses filenames to extract emotion labels and harmonizes with EMOTIONS list.
 """
 
 import os
-from datasets.base_dataset import BaseSERDataset
-from datasets.emotions import LABEL_MAP
+from training import config
+from training.datasets.base_dataset import BaseSERDataset
+from training.datasets.emotions import LABEL_MAP
 
 class RAVDESSDataset(BaseSERDataset):
-    def __init__(self, root_dir, transform=None, emotions=None):
-        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS)
+    corpus = "ravdess"
 
-    def _load_files(self):
-        samples = []
-        for root, _, files in os.walk(self.root_dir):
-            for f in files:
-                if f.endswith(".wav"):
-                    parts = f.split("-")
-                    emotion_id = int(parts[2])
-                    label = {
-                        1: "neutral", 2: "calm", 3: "happy", 4: "sad",
-                        5: "angry", 6: "fearful", 7: "disgust", 8: "surprised"
-                    }[emotion_id]
-                    samples.append((os.path.join(root, f), label))
-        return samples
+    def __init__(self, root_dir, transform=None, emotions=None, **kwargs):
+        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS, **kwargs)
+
+    @staticmethod
+    def label_for(relpath):
+        # e.g. Actor_01/03-01-05-01-02-01-01.wav: the third field is the emotion
+        parts = os.path.basename(relpath).split("-")
+        return LABEL_MAP["ravdess"].get(parts[2]) if len(parts) == 7 else None
@@ -5,20 +5,19 @@ Files are named like DC_a01.wav where 'a' = angry.
 """
 
 import os
-from datasets.base_dataset import BaseSERDataset
-from datasets.emotions import LABEL_MAP
+from training import config
+from training.datasets.base_dataset import BaseSERDataset
+from training.datasets.emotions import LABEL_MAP
 
 class SAVEEDataset(BaseSERDataset):
-    def __init__(self, root_dir, transform=None, emotions=None):
-        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS)
+    corpus = "savee"
 
-    def _load_files(self):
-        samples = []
-        for f in os.listdir(self.root_dir):
-            if f.endswith(".wav"):
-                code = ''.join([c for c in f if c.isalpha()])
-                for k, v in LABEL_MAP["savee"].items():
-                    if code.startswith(k):
-                        samples.append((os.path.join(self.root_dir, f), v))
-                        break
-        return samples
+    def __init__(self, root_dir, transform=None, emotions=None, **kwargs):
+        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS, **kwargs)
+
+    @staticmethod
+    def label_for(relpath):
+        # DC_a01.wav, or a01.wav inside a speaker folder: letters before the number ('a', 'sa', 'su', ...)
+        stem = os.path.splitext(os.path.basename(relpath))[0].split("_")[-1]
+        code = stem.rstrip("0123456789")
+        return LABEL_MAP["savee"].get(code)
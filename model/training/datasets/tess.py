@@ -5,21 +5,20 @@ Files are stored in subfolders by emotion (e.g., Angry/, Sad/, etc.)
 """
 
 import os
-from datasets.base_dataset import BaseSERDataset
-from datasets.emotions import LABEL_MAP
+from training import config
+from training.datasets.base_dataset import BaseSERDataset
+from training.datasets.emotions import LABEL_MAP
 
 class TESSDataset(BaseSERDataset):
-    def __init__(self, root_dir, transform=None, emotions=None):
-        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS)
+    corpus = "tess"
 
-    def _load_files(self):
-        samples = []
-        for emo_dir in os.listdir(self.root_dir):
-            full_path = os.path.join(self.root_dir, emo_dir)
-            if os.path.isdir(full_path):
-                label = LABEL_MAP["tess"].get(emo_dir.lower())
-                if label:
-                    for f in os.listdir(full_path):
-                        if f.endswith(".wav"):
-                            samples.append((os.path.join(full_path, f), label))
-        return samples
+    def __init__(self, root_dir, transform=None, emotions=None, **kwargs):
+        super().__init__(root_dir, transform=transform, emotions=emotions or config.EMOTIONS, **kwargs)
+
+    @staticmethod
+    def label_for(relpath):
+        # Folder names are "OAF_angry" / "YAF_pleasant_surprised", or just "angry" in some mirrors
+        folder = os.path.basename(os.path.dirname(relpath)).lower()
+        if folder[:4] in ("oaf_", "yaf_"):
+            folder = folder[4:]
+        return LABEL_MAP["tess"].get(folder)
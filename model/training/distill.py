@@ -0,0 +1,204 @@
+"""
+distill.py — Knowledge distillation from the Wav2Vec2 model into a small CPU student
+------------------------------------------------------------------------------------
+The fine-tuned Wav2Vec2 (v6) is the teacher; a CRNN or a narrow
+SpecTransformer on log-mel features is the student.
+
+- teacher_logits: one teacher pass over a dataset (or a Subset of one); the
+  (N, classes) logits are cached as .npy, keyed like the waveform cache by the
+  clips and preprocessing config, plus the teacher id.
+- DistillationDataset: yields (features, (label, teacher logits)), which
+  train_model passes to its criterion.
+- DistillationLoss: alpha * T² * KL(teacher || student) at temperature T,
+  plus (1 - alpha) * cross-entropy on the hard labels.
+- compare_models: test accuracy / F1, parameter count and single-clip CPU
+  latency (4 s clip, features included) for the teacher and the student.
+
+Usage (from model/):
+    python -m training.distill --teacher <fine-tuned dir> --student crnn --out-dir distill/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, Dataset, Subset
+from training import config
+from training.bucketing import dataset_lengths, pad_collate
+from training.calibrate_cascade import measure_cost_ms
+from training.metrics import ConfusionMatrix
+from training.train import logits_of
+from training.waveform_cache import cache_key
+
+
+def dataset_samples(dataset):
+    """(path, label) pairs of a BaseSERDataset or a Subset of one."""
+    if isinstance(dataset, Subset):
+        samples = dataset_samples(dataset.dataset)
+        return [samples[i] for i in dataset.indices]
+    return dataset.samples
+
+
+def _root(dataset):
+    return _root(dataset.dataset) if isinstance(dataset, Subset) else dataset
+
+
+@torch.no_grad()
+def teacher_logits(teacher, dataset, model_id, out_dir=config.TEACHER_LOGITS_DIR, batch_size=config.BATCH_SIZE):
+    """
+    (len(dataset), classes) float32 teacher logits, in dataset order. teacher
+    maps a waveform batch (and attention_mask=, for variable-length datasets)
+    to logits. Reuses the cached array for the same clips, config and model_id.
+    """
+    variable = getattr(_root(dataset), "variable_length", False)
+    key = repr((cache_key(dataset_samples(dataset)), model_id, variable))
+    path = os.path.join(out_dir, hashlib.sha256(key.encode()).hexdigest()[:16] + ".npy")
+    if os.path.exists(path):
+        return np.load(path)
+
+    logits = []
+    for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=pad_collate if variable else None):
+        output = teacher(batch[0]) if len(batch) == 2 else teacher(batch[0], attention_mask=batch[1])
+        logits.append(logits_of(output).float().cpu().numpy())
+    logits = np.concatenate(logits)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, logits)
+    os.replace(tmp_path, path)
+    return logits
+
+
+class DistillationDataset(Dataset):
+    """(features, (label, teacher logits)) for each item of dataset, with logits from teacher_logits."""
+
+    def __init__(self, dataset, logits):
+        if len(logits) != len(dataset):
+            raise ValueError(f"{len(logits)} teacher logits for a dataset of {len(dataset)} clips")
+        self.dataset = dataset
+        self.logits = torch.as_tensor(np.asarray(logits, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        features, label = self.dataset[idx]
+        return features, (label, self.logits[idx])
+
+    def lengths(self):
+        return dataset_lengths(self.dataset)
+
+
+class DistillationLoss(nn.Module):
+    """criterion(student logits, (labels, teacher logits)) for train_model."""
+
+    def __init__(self, alpha=config.DISTILL_ALPHA, temperature=config.DISTILL_TEMPERATURE, weight=None):
+        super().__init__()
+        self.alpha = alpha
+        self.temperature = temperature
+        self.hard = nn.CrossEntropyLoss(weight=weight)
+
+    def forward(self, logits, targets):
+        labels, teacher = targets
+        t = self.temperature
+        # T² keeps the soft-term gradients on the same scale as the hard term's
+        soft = F.kl_div(F.log_softmax(logits / t, dim=-1), F.log_softmax(teacher.float() / t, dim=-1),
+                        reduction="batchmean", log_target=True) * t * t
+        return self.alpha * soft + (1 - self.alpha) * self.hard(logits, labels)
+
+
+def logit_metrics(logits, labels):
+    """Accuracy / weighted F1 of precomputed logits."""
+    metrics = ConfusionMatrix(logits.shape[1])
+    metrics.update(torch.as_tensor(logits).argmax(1), torch.as_tensor(labels))
+    return metrics.compute()
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+def compare_models(rows, input_samples=config.MAX_AUDIO_SAMPLES):
+    """
+    rows: {name: (predict(waveforms) -> logits, model, test metrics)}. Returns
+    one dict per model with accuracy, f1, parameters and cpu_ms_per_clip
+    (median single-clip latency on CPU at the current torch thread count).
+    """
+    report = []
+    for name, (predict, model, metrics) in rows.items():
+        with torch.inference_mode():
+            latency = measure_cost_ms(predict, input_samples)
+        report.append({"model": name, "accuracy": metrics["accuracy"], "f1": metrics["f1"],
+                       "parameters": count_parameters(model), "cpu_ms_per_clip": latency})
+    return report
+
+
+if __name__ == "__main__":
+    from transformers import Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+    from training.datasets import MultiDataset
+    from training.feature_extraction import BatchFeatures
+    from training.model import CRNN, SpecTransformer
+    from training.split import split_dataset
+    from training.train import class_weights, evaluate_model, train_model
+
+    parser = argparse.ArgumentParser(description="Distill the Wav2Vec2 teacher into a log-mel CRNN / transformer")
+    parser.add_argument("--teacher", default="manelbrh1342/emotion-recognition-model")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--student", choices=["crnn", "transformer"], default="crnn")
+    parser.add_argument("--epochs", type=int, default=60)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--alpha", type=float, default=config.DISTILL_ALPHA)
+    parser.add_argument("--temperature", type=float, default=config.DISTILL_TEMPERATURE)
+    parser.add_argument("--threads", type=int, default=1, help="torch CPU threads for the latency measurement")
+    parser.add_argument("--out-dir", default="distill")
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    processor = Wav2Vec2FeatureExtractor.from_pretrained(args.teacher)
+    teacher = Wav2Vec2ForSequenceClassification.from_pretrained(args.teacher).to(device).eval()
+
+    def teacher_predict(waveforms, attention_mask=None):
+        # Same feature extractor as serving (zero-mean / unit-variance per clip, padding excluded)
+        lengths = [len(w) for w in waveforms] if attention_mask is None else attention_mask.sum(1).tolist()
+        inputs = processor([w[:n].numpy() for w, n in zip(waveforms, lengths)], sampling_rate=config.SAMPLE_RATE,
+                           padding=True, return_attention_mask=True, return_tensors="pt")
+        return teacher(inputs["input_values"].to(device), attention_mask=inputs["attention_mask"].to(device)).logits
+
+    dataset = MultiDataset(datasets=args.datasets.split(","))
+    train_set, val_set, test_set = split_dataset(dataset)
+    train_logits = teacher_logits(teacher_predict, train_set, args.teacher)
+    test_logits = teacher_logits(teacher_predict, test_set, args.teacher)
+
+    if args.student == "transformer":
+        student = SpecTransformer(n_mels=config.N_MELS, d_model=144, nhead=4, num_layers=4, dim_feedforward=384,
+                                  dropout=0.1, num_classes=len(config.EMOTIONS))
+    else:
+        student = CRNN(n_mels=config.N_MELS, cnn_channels=128, lstm_hidden=256, lstm_layers=2, dropout=0.3,
+                       num_classes=len(config.EMOTIONS))
+    criterion = DistillationLoss(args.alpha, args.temperature, weight=class_weights(train_set))
+    os.makedirs(args.out_dir, exist_ok=True)
+    train_model(student, DistillationDataset(train_set, train_logits), val_dataset=val_set, epochs=args.epochs,
+                lr=args.lr, scheduler="plateau", batch_transform=BatchFeatures("logmel", augment="specaugment"),
+                criterion=criterion, device=device)
+    student.load_state_dict(torch.load("best_model.pt", map_location="cpu", weights_only=True))
+    torch.save(student.state_dict(), os.path.join(args.out_dir, f"student_{args.student}.pt"))
+
+    features = BatchFeatures("logmel").to(device)
+    student_metrics = evaluate_model(student, test_set, device=device, batch_transform=features)
+    labels = [config.EMOTIONS.index(label) for _, label in dataset_samples(test_set)]
+    torch.set_num_threads(args.threads)
+    student, features, teacher, device = student.cpu().eval(), features.cpu().eval(), teacher.cpu(), "cpu"
+    report = compare_models({
+        "wav2vec2 (teacher)": (teacher_predict, teacher, logit_metrics(test_logits, labels)),
+        f"{args.student} (student)": (lambda waveforms: student(features(waveforms)), student, student_metrics),
+    })
+    with open(os.path.join(args.out_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'model':<20} {'test acc':>9} {'F1':>7} {'params':>8} {'CPU ms/clip':>12}  ({args.threads} thread(s))")
+    for row in report:
+        print(f"{row['model']:<20} {row['accuracy']*100:>8.2f}% {row['f1']:>7.4f} "
+              f"{row['parameters']/1e6:>7.2f}M {row['cpu_ms_per_clip']:>12.1f}")
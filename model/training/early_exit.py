@@ -0,0 +1,171 @@
+"""
+early_exit.py — Confidence-based early exit for Wav2Vec2 classifiers
+--------------------------------------------------------------------
+Small classifier heads (masked mean-pool -> LayerNorm -> Linear) read the
+hidden states of intermediate transformer layers of a frozen, fine-tuned
+Wav2Vec2ForSequenceClassification. At inference the encoder runs one layer
+at a time and a clip stops at the first exit whose top softmax probability
+reaches `threshold`; clips that never get there fall through to the
+model's own classifier after the last layer, so threshold > 1 reproduces
+the full model exactly.
+"""
+
+import torch
+import torch.nn as nn
+
+
+def masked_mean(hidden_states, frame_mask=None):
+    """Mean over frames, ignoring padding: (batch, frames, hidden) -> (batch, hidden)."""
+    if frame_mask is None:
+        return hidden_states.mean(dim=1)
+    weights = frame_mask.unsqueeze(-1).to(hidden_states.dtype)
+    return (hidden_states * weights).sum(dim=1) / weights.sum(dim=1)
+
+
+class ExitHead(nn.Module):
+    """Classifier on mean-pooled hidden states; pooling happens outside so it can be cached."""
+
+    def __init__(self, hidden_size, num_labels):
+        super().__init__()
+        self.norm = nn.LayerNorm(hidden_size)
+        self.classifier = nn.Linear(hidden_size, num_labels)
+
+    def forward(self, pooled):
+        return self.classifier(self.norm(pooled))
+
+
+class EarlyExitWav2Vec2(nn.Module):
+    """
+    model:       fine-tuned Wav2Vec2ForSequenceClassification (kept frozen)
+    exit_layers: 1-based transformer layer indices that get an exit head;
+                 defaults to every layer but the last (which uses the model's own head)
+    """
+
+    def __init__(self, model, exit_layers=None):
+        super().__init__()
+        config = model.config
+        if config.use_weighted_layer_sum:
+            raise ValueError("Early exit needs a classifier on the last layer (use_weighted_layer_sum=False)")
+        num_layers = config.num_hidden_layers
+        self.exit_layers = sorted(exit_layers or range(1, num_layers))
+        if not all(1 <= layer < num_layers for layer in self.exit_layers):
+            raise ValueError(f"exit_layers must lie in [1, {num_layers - 1}], got {self.exit_layers}")
+        self.model = model
+        self.config = config
+        self.heads = nn.ModuleDict({
+            str(layer): ExitHead(config.hidden_size, config.num_labels) for layer in self.exit_layers
+        })
+        for p in self.model.parameters():
+            p.requires_grad_(False)
+
+    # ---- encoder, one layer at a time ----
+    def _embed(self, input_values, attention_mask):
+        """Feature encoder + projection + positional conv; returns (hidden states, frame mask)."""
+        w2v = self.model.wav2vec2
+        features = w2v.feature_extractor(input_values).transpose(1, 2)
+        frame_mask = None
+        if attention_mask is not None:
+            frame_mask = w2v._get_feature_vector_attention_mask(features.shape[1], attention_mask).bool()
+        hidden_states, _ = w2v.feature_projection(features)
+        if frame_mask is not None:
+            hidden_states = hidden_states.masked_fill(~frame_mask.unsqueeze(-1), 0.0)
+        encoder = w2v.encoder
+        hidden_states = hidden_states + encoder.pos_conv_embed(hidden_states)
+        if not self.config.do_stable_layer_norm:
+            hidden_states = encoder.layer_norm(hidden_states)
+        return encoder.dropout(hidden_states), frame_mask
+
+    @staticmethod
+    def _additive_mask(frame_mask, dtype):
+        if frame_mask is None or bool(frame_mask.all()):
+            return None
+        mask = torch.zeros(frame_mask.shape, dtype=dtype, device=frame_mask.device)
+        mask = mask.masked_fill(~frame_mask, torch.finfo(dtype).min)
+        return mask[:, None, None, :].expand(-1, 1, frame_mask.shape[1], -1)
+
+    def _layer(self, index, hidden_states, attn_mask):
+        out = self.model.wav2vec2.encoder.layers[index](hidden_states, attention_mask=attn_mask)
+        return out[0] if isinstance(out, tuple) else out
+
+    def _exit_input(self, hidden_states):
+        # Stable-layer-norm encoders normalise only after the last layer
+        if self.config.do_stable_layer_norm:
+            return self.model.wav2vec2.encoder.layer_norm(hidden_states)
+        return hidden_states
+
+    def _final_logits(self, hidden_states, frame_mask):
+        if self.config.do_stable_layer_norm:
+            hidden_states = self.model.wav2vec2.encoder.layer_norm(hidden_states)
+        return self.model.classifier(masked_mean(self.model.projector(hidden_states), frame_mask))
+
+    # ---- training / analysis ----
+    @torch.no_grad()
+    def exit_features(self, input_values, attention_mask=None):
+        """Full forward pass: ({exit layer: pooled hidden states}, final classifier logits)."""
+        hidden_states, frame_mask = self._embed(input_values, attention_mask)
+        attn_mask = self._additive_mask(frame_mask, hidden_states.dtype)
+        pooled = {}
+        for index in range(self.config.num_hidden_layers):
+            hidden_states = self._layer(index, hidden_states, attn_mask)
+            if str(index + 1) in self.heads:
+                pooled[index + 1] = masked_mean(self._exit_input(hidden_states), frame_mask)
+        return pooled, self._final_logits(hidden_states, frame_mask)
+
+    def exit_logits(self, input_values, attention_mask=None):
+        """Logits of every exit plus the final classifier: {layer: (batch, num_labels)}."""
+        pooled, final = self.exit_features(input_values, attention_mask)
+        logits = {layer: self.heads[str(layer)](p) for layer, p in pooled.items()}
+        logits[self.config.num_hidden_layers] = final
+        return logits
+
+    # ---- inference ----
+    @torch.no_grad()
+    def forward(self, input_values, attention_mask=None, threshold=0.9):
+        """
+        Returns (logits, layers_executed). Each clip leaves the batch at its
+        first exit with max softmax >= threshold, so later layers only run on
+        the clips that are still undecided.
+        """
+        hidden_states, frame_mask = self._embed(input_values, attention_mask)
+        num_layers = self.config.num_hidden_layers
+        logits = hidden_states.new_zeros(input_values.shape[0], self.config.num_labels)
+        layers_executed = torch.full((input_values.shape[0],), num_layers, dtype=torch.long)
+        active = torch.arange(input_values.shape[0], device=input_values.device)
+        attn_mask = self._additive_mask(frame_mask, hidden_states.dtype)
+
+        for index in range(num_layers):
+            hidden_states = self._layer(index, hidden_states, attn_mask)
+            head = self.heads[str(index + 1)] if str(index + 1) in self.heads else None
+            if head is None:
+                continue
+            exit_logits = head(masked_mean(self._exit_input(hidden_states), frame_mask))
+            done = exit_logits.softmax(dim=-1).amax(dim=-1) >= threshold
+            if not done.any():
+                continue
+            logits[active[done]] = exit_logits[done]
+            layers_executed[active[done].cpu()] = index + 1
+            keep = ~done
+            active, hidden_states = active[keep], hidden_states[keep]
+            if frame_mask is not None:
+                frame_mask = frame_mask[keep]
+                attn_mask = self._additive_mask(frame_mask, hidden_states.dtype)
+            if len(active) == 0:
+                return logits, layers_executed
+
+        logits[active] = self._final_logits(hidden_states, frame_mask)
+        return logits, layers_executed
+
+
+def save_exit_heads(early_exit_model, path):
+    torch.save({
+        "exit_layers": early_exit_model.exit_layers,
+        "state_dict": early_exit_model.heads.state_dict(),
+    }, path)
+
+
+def load_exit_heads(model, path, map_location="cpu"):
+    """Attach heads trained by fit_exit_heads to a loaded Wav2Vec2ForSequenceClassification."""
+    checkpoint = torch.load(path, map_location=map_location, weights_only=True)
+    early_exit_model = EarlyExitWav2Vec2(model, exit_layers=checkpoint["exit_layers"])
+    early_exit_model.heads.load_state_dict(checkpoint["state_dict"])
+    return early_exit_model.eval()
@@ -0,0 +1,192 @@
+"""
+embedding_cache.py — Frozen-encoder embeddings for fast head experiments
+------------------------------------------------------------------------
+Head-only and last-layer experiments on the v5/v6 Wav2Vec2 models keep
+recomputing the same encoder outputs. extract_embeddings runs the encoder
+once over a dataset and writes, per requested transformer layer:
+- pooled:   (N, hidden) masked mean over frames
+- sequence: (N, frames, hidden) frame-level states (zero past each clip's end)
+as memory-mapped .npy arrays (float16 by default), with a JSON manifest.
+
+EmbeddingDataset serves them as (features, label) pairs, so train_model can
+fit FFNN (pooled) or EmotionLSTM (sequence) heads directly, at seconds per
+epoch. The classifier's projector is linear, so training
+Wav2Vec2ForSequenceClassification's own projector + classifier on the pooled
+last layer matches training them on the live encoder.
+
+The store is keyed by the dataset's files and preprocessing config (as the
+waveform cache is), a hash of the encoder's weights (a fine-tuned model
+still reports its base model's name_or_path) and the layer selection; a
+stale store is rebuilt on next use.
+
+Usage (from model/):
+    python -m training.embedding_cache --model <fine-tuned dir> --layers 12 --head ffnn
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+from training import config
+from training.bucketing import pad_collate
+from training.early_exit import masked_mean
+from training.waveform_cache import cache_key
+
+KINDS = ("pooled", "sequence")
+
+
+def weights_fingerprint(module):
+    """Hash of a module's parameters and buffers (names, shapes, dtypes and values)."""
+    digest = hashlib.sha256()
+    for name, tensor in module.state_dict().items():
+        tensor = tensor.detach().cpu()
+        digest.update(f"{name}\0{tuple(tensor.shape)}\0{tensor.dtype}\n".encode())
+        digest.update(tensor.reshape(-1).view(torch.uint8).numpy().tobytes())  # raw bytes, bfloat16 included
+    return digest.hexdigest()[:16]
+
+
+def store_key(dataset, model_id, weights, layers, kinds, dtype):
+    settings = repr((cache_key(dataset.samples), model_id, weights, tuple(layers), tuple(kinds), dtype))
+    return hashlib.sha256(settings.encode()).hexdigest()[:16]
+
+
+def _encoder(model):
+    """Wav2Vec2Model inside a Wav2Vec2Classifier or a Wav2Vec2ForSequenceClassification."""
+    model = getattr(model, "model", model)
+    return model.wav2vec2
+
+
+@torch.no_grad()
+def extract_embeddings(model, dataset, out_dir=config.EMBEDDING_CACHE_DIR, layers=None, kinds=("pooled",),
+                       model_id=None, dtype="float16", batch_size=config.BATCH_SIZE, device=None):
+    """
+    One frozen encoder pass over dataset; returns the store directory. layers are
+    hidden-state indices (0 = CNN/positional embeddings, L = last transformer
+    layer; default: last). Reuses an existing store with the same key, which
+    includes a hash of the encoder weights.
+    """
+    encoder = _encoder(model)
+    num_layers = encoder.config.num_hidden_layers
+    layers = sorted(layers or [num_layers])
+    if any(kind not in KINDS for kind in kinds):
+        raise ValueError(f"Unknown embedding kinds {kinds}; expected some of {KINDS}")
+    model_id = model_id or encoder.config.name_or_path
+    weights = weights_fingerprint(encoder)
+    store = os.path.join(out_dir, store_key(dataset, model_id, weights, layers, kinds, dtype))
+    if os.path.exists(os.path.join(store, "manifest.json")):
+        return store
+
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    encoder = encoder.to(device).eval()
+    variable = getattr(dataset, "variable_length", False)
+    loader = DataLoader(dataset, batch_size=batch_size, collate_fn=pad_collate if variable else None)
+    frames = int(encoder._get_feat_extract_output_lengths(torch.tensor(config.MAX_AUDIO_SAMPLES)))
+    hidden = encoder.config.hidden_size
+    os.makedirs(store, exist_ok=True)
+    arrays = {}
+    for layer in layers:
+        if "pooled" in kinds:
+            arrays["pooled", layer] = np.lib.format.open_memmap(
+                os.path.join(store, f"pooled_{layer}.npy.tmp"), mode="w+", dtype=dtype, shape=(len(dataset), hidden))
+        if "sequence" in kinds:
+            arrays["sequence", layer] = np.lib.format.open_memmap(
+                os.path.join(store, f"sequence_{layer}.npy.tmp"), mode="w+", dtype=dtype,
+                shape=(len(dataset), frames, hidden))
+
+    labels, n_frames, row = [], [], 0
+    for batch in loader:
+        X, y = batch[0].to(device), batch[-1]
+        mask = batch[1].to(device) if len(batch) == 3 else None
+        out = encoder(X, attention_mask=mask, output_hidden_states=True)
+        frame_mask = None if mask is None else encoder._get_feature_vector_attention_mask(out.last_hidden_state.shape[1], mask)
+        lengths = (torch.full((len(y),), out.last_hidden_state.shape[1]) if frame_mask is None
+                   else frame_mask.sum(-1).cpu())
+        for layer in layers:
+            # The last layer's entry is the encoder output the classifier sees (after the
+            # final LayerNorm in stable-layer-norm models, which hidden_states omits)
+            states = out.last_hidden_state if layer == num_layers else out.hidden_states[layer]
+            if ("pooled", layer) in arrays:
+                arrays["pooled", layer][row:row + len(y)] = masked_mean(states, frame_mask).float().cpu().numpy()
+            if ("sequence", layer) in arrays:
+                seq = states.float().cpu().numpy()
+                for i, length in enumerate(lengths.tolist()):
+                    arrays["sequence", layer][row + i, :length] = seq[i, :length]
+        labels.extend(y.tolist())
+        n_frames.extend(lengths.tolist())
+        row += len(y)
+
+    for array in arrays.values():
+        array.flush()
+    for kind, layer in arrays:
+        os.replace(os.path.join(store, f"{kind}_{layer}.npy.tmp"), os.path.join(store, f"{kind}_{layer}.npy"))
+    arrays.clear()
+    manifest = {"model": model_id, "weights": weights, "layers": layers, "kinds": list(kinds), "dtype": dtype, "hidden_size": hidden,
+                "labels": labels, "frames": n_frames, "emotions": list(getattr(dataset, "emotions", config.EMOTIONS))}
+    with open(os.path.join(store, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return store
+
+
+class EmbeddingDataset(Dataset):
+    """(embedding, label index) pairs read from an extract_embeddings store via a copy-on-write memory map."""
+
+    def __init__(self, store, layer=None, kind="pooled"):
+        with open(os.path.join(store, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.layer = self.manifest["layers"][-1] if layer is None else layer
+        self.kind = kind
+        self.embeddings = np.load(os.path.join(store, f"{kind}_{self.layer}.npy"), mmap_mode="c")
+        self.labels = torch.tensor(self.manifest["labels"])
+        # Stand-in (path, label) pairs and the label set, so stratified_split and
+        # train.class_weights (on a Subset too) work as on the source dataset
+        self.emotions = self.manifest["emotions"]
+        self.samples = [(i, self.emotions[label]) for i, label in enumerate(self.manifest["labels"])]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        return torch.from_numpy(self.embeddings[idx].astype(np.float32)), self.labels[idx]
+
+    def class_weights(self):
+        counts = torch.bincount(self.labels, minlength=len(self.emotions)).float()
+        return 1.0 / counts.clamp(min=1)
+
+
+if __name__ == "__main__":
+    import time
+    from torch.utils.data import Subset
+    from transformers import Wav2Vec2ForSequenceClassification
+    from training.datasets import MultiDataset
+    from training.model import FFNN, EmotionLSTM
+    from training.split import stratified_split
+    from training.train import train_model
+
+    parser = argparse.ArgumentParser(description="Cache frozen Wav2Vec2 embeddings and train a head on them")
+    parser.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--layers", default=None, help="Comma-separated hidden-state indices (default: last layer)")
+    parser.add_argument("--sequence", action="store_true", help="Also store frame-level states (for LSTM heads)")
+    parser.add_argument("--out-dir", default=config.EMBEDDING_CACHE_DIR)
+    parser.add_argument("--head", choices=["ffnn", "lstm"], default=None, help="Train this head on the cached embeddings")
+    parser.add_argument("--epochs", type=int, default=config.EPOCHS)
+    args = parser.parse_args()
+
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(args.model)
+    dataset = MultiDataset(datasets=args.datasets.split(","))
+    layers = [int(x) for x in args.layers.split(",")] if args.layers else None
+    kinds = ("pooled", "sequence") if args.sequence or args.head == "lstm" else ("pooled",)
+    start = time.perf_counter()
+    store = extract_embeddings(model, dataset, args.out_dir, layers=layers, kinds=kinds, model_id=args.model)
+    print(f"Embeddings in {store} ({time.perf_counter() - start:.1f} s)")
+
+    if args.head:
+        embeddings = EmbeddingDataset(store, kind="sequence" if args.head == "lstm" else "pooled")
+        hidden = embeddings.manifest["hidden_size"]
+        train_idx, _, _ = stratified_split(embeddings.samples, [label for _, label in embeddings.samples])
+        head = (EmotionLSTM(hidden, 128, len(config.EMOTIONS)) if args.head == "lstm"
+                else FFNN(hidden, 256, len(config.EMOTIONS)))
+        train_model(head, Subset(embeddings, train_idx), epochs=args.epochs, num_workers=0)
@@ -0,0 +1,142 @@
+"""
+exit_heads.py — Fit and evaluate early-exit heads
+-------------------------------------------------
+Trains the intermediate-layer heads of training.early_exit against a frozen,
+fine-tuned Wav2Vec2 classifier and reports, for a sweep of confidence
+thresholds, the average number of transformer layers executed against the
+accuracy lost relative to the full model.
+
+The backbone never changes, so each clip's pooled hidden states are computed
+once and the heads are trained on those cached features; extra epochs cost
+next to nothing.
+
+Usage (from model/):
+    python -m training.exit_heads --model <fine-tuned dir or hf repo> --out exit_heads.pt --report exit_report.json
+"""
+
+import argparse
+import json
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+from training import config
+from training.early_exit import EarlyExitWav2Vec2, save_exit_heads
+
+DEFAULT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+def collect_exit_features(early_exit_model, dataset, batch_size=config.BATCH_SIZE, device=None):
+    """One frozen pass over the dataset: ({layer: (N, hidden)}, final logits (N, C), labels (N,))."""
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    early_exit_model = early_exit_model.to(device).eval()
+    pooled, finals, labels = {}, [], []
+    for X, y in DataLoader(dataset, batch_size=batch_size):
+        batch_pooled, final = early_exit_model.exit_features(X.to(device))
+        for layer, p in batch_pooled.items():
+            pooled.setdefault(layer, []).append(p.cpu())
+        finals.append(final.cpu())
+        labels.append(y)
+    return {layer: torch.cat(p) for layer, p in pooled.items()}, torch.cat(finals), torch.cat(labels)
+
+
+def fit_exit_heads(early_exit_model, dataset, epochs=config.EPOCHS, lr=config.LEARNING_RATE,
+                   weight_decay=config.WEIGHT_DECAY, batch_size=config.BATCH_SIZE, device=None, features=None):
+    """
+    Train every exit head with cross-entropy on the dataset labels; the
+    fine-tuned backbone stays frozen. Pass `features` (from
+    collect_exit_features) to reuse an earlier backbone pass.
+    """
+    config.set_seed(42)
+    pooled, _, labels = features or collect_exit_features(early_exit_model, dataset, batch_size, device)
+    heads = early_exit_model.heads.cpu().train()
+    opt = torch.optim.AdamW(heads.parameters(), lr=lr, weight_decay=weight_decay)
+    criterion = nn.CrossEntropyLoss()
+
+    for epoch in range(epochs):
+        total_loss = 0.0
+        order = torch.randperm(len(labels))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            loss = sum(criterion(heads[str(layer)](p[idx]), labels[idx]) for layer, p in pooled.items())
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+            total_loss += loss.item()
+        print(f"Epoch {epoch+1}/{epochs} - Exit-head loss: {total_loss / max(len(order) // batch_size, 1):.4f}")
+    return early_exit_model.eval()
+
+
+@torch.no_grad()
+def exit_report(early_exit_model, dataset=None, thresholds=DEFAULT_THRESHOLDS, batch_size=config.BATCH_SIZE,
+                device=None, features=None):
+    """
+    Average layers executed and accuracy at each threshold, simulated from a
+    single full pass (a clip takes the first exit whose confidence reaches the
+    threshold, exactly as EarlyExitWav2Vec2.forward does).
+    """
+    pooled, final, labels = features or collect_exit_features(early_exit_model, dataset, batch_size, device)
+    heads = early_exit_model.heads.cpu().eval()
+    num_layers = early_exit_model.config.num_hidden_layers
+    exits = [(layer, heads[str(layer)](p).softmax(-1)) for layer, p in sorted(pooled.items())]
+    exits.append((num_layers, final.softmax(-1)))
+    confidence = torch.stack([probs.amax(-1) for _, probs in exits])   # (exits, N)
+    preds = torch.stack([probs.argmax(-1) for _, probs in exits])      # (exits, N)
+    layers = torch.tensor([layer for layer, _ in exits])
+    full_accuracy = (preds[-1] == labels).float().mean().item()
+
+    report = {
+        "clips": len(labels),
+        "num_layers": num_layers,
+        "exit_layers": early_exit_model.exit_layers,
+        "full_model_accuracy": full_accuracy,
+        "per_exit_accuracy": {int(l): (p == labels).float().mean().item() for l, p in zip(layers, preds)},
+        "thresholds": [],
+    }
+    for threshold in thresholds:
+        reached = confidence >= threshold
+        reached[-1] = True  # the final classifier always answers
+        first = reached.int().argmax(dim=0)
+        chosen = preds[first, torch.arange(len(labels))]
+        accuracy = (chosen == labels).float().mean().item()
+        executed = layers[first].float()
+        report["thresholds"].append({
+            "threshold": threshold,
+            "accuracy": accuracy,
+            "accuracy_drop": full_accuracy - accuracy,
+            "avg_layers": executed.mean().item(),
+            "layer_fraction": executed.mean().item() / num_layers,
+            "exit_histogram": {int(l): int((first == i).sum()) for i, l in enumerate(layers)},
+        })
+    return report
+
+
+if __name__ == "__main__":
+    from transformers import Wav2Vec2ForSequenceClassification
+    from training.datasets import MultiDataset
+    from training.split import stratified_split
+
+    parser = argparse.ArgumentParser(description="Fit early-exit heads on a frozen fine-tuned Wav2Vec2")
+    parser.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--exit-layers", default=None, help="Comma-separated 1-based layers (default: all but the last)")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--lr", type=float, default=config.LEARNING_RATE)
+    parser.add_argument("--thresholds", default=",".join(map(str, DEFAULT_THRESHOLDS)))
+    parser.add_argument("--out", default="exit_heads.pt")
+    parser.add_argument("--report", default=None, help="Write the held-out report JSON here")
+    args = parser.parse_args()
+
+    dataset = MultiDataset(datasets=args.datasets.split(","))
+    train_idx, val_idx, _ = stratified_split(dataset.samples, [label for _, label in dataset.samples])
+    exit_layers = [int(x) for x in args.exit_layers.split(",")] if args.exit_layers else None
+    model = EarlyExitWav2Vec2(Wav2Vec2ForSequenceClassification.from_pretrained(args.model), exit_layers=exit_layers)
+
+    fit_exit_heads(model, Subset(dataset, train_idx), epochs=args.epochs, lr=args.lr)
+    save_exit_heads(model, args.out)
+    report = exit_report(model, Subset(dataset, val_idx), thresholds=[float(t) for t in args.thresholds.split(",")])
+    for row in report["thresholds"]:
+        print(f"threshold {row['threshold']:.2f}: {row['avg_layers']:.2f}/{report['num_layers']} layers, "
+              f"accuracy {row['accuracy']*100:.2f}% ({-row['accuracy_drop']*100:+.2f} pts)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
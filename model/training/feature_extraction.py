@@ -3,20 +3,36 @@ feature_extraction.py — Audio feature extraction utilities
 --------------------------------------------------------
 Provides MFCC, log-mel, and SpecAugment transforms for SER datasets.
 All parameters are sourced from config.py for consistency.
+
+Two ways to apply them:
+- get_transform: per-clip pipeline run in Dataset.__getitem__ (DataLoader
+  workers), one STFT at a time.
+- BatchFeatures: runs on collated (batch, samples) waveforms on the training
+  device, so the STFT / mel / dB ops are batched, and SpecAugment draws an
+  independent mask per example in one vectorized op.
+Both end in ToSequence, so either gives the models the same (time, features)
+items, or (features,) with pool=True.
+
+Benchmark the two (from model/):
+    python -m training.feature_extraction --feature logmel --augment specaugment --batch-size 32
 """
 
+import argparse
+import time
 import torch
+import torch.nn as nn
 import torchaudio
 from training import config
 
-class ToMono:
-    def __call__(self, waveform):
+class ToMono(nn.Module):
+    def forward(self, waveform):
         if waveform.shape[0] > 1:
             return waveform.mean(dim=0, keepdim=True)
         return waveform
 
-class MFCC:
+class MFCC(nn.Module):
     def __init__(self):
+        super().__init__()
         self.mfcc = torchaudio.transforms.MFCC(
             sample_rate=config.SAMPLE_RATE,
             n_mfcc=config.N_MFCC,
@@ -26,11 +42,12 @@ class MFCC:
                 'n_mels': config.N_MELS
             }
         )
-    def __call__(self, waveform):
+    def forward(self, waveform):
         return self.mfcc(waveform)
 
-class LogMel:
+class LogMel(nn.Module):
     def __init__(self):
+        super().__init__()
         self.melspec = torchaudio.transforms.MelSpectrogram(
             sample_rate=config.SAMPLE_RATE,
             n_fft=config.N_FFT,
@@ -38,19 +55,49 @@ class LogMel:
             n_mels=config.N_MELS
         )
         self.amplitude_to_db = torchaudio.transforms.AmplitudeToDB()
-    def __call__(self, waveform):
+    def forward(self, waveform):
         mel = self.melspec(waveform)
         return self.amplitude_to_db(mel)
 
-class SpecAugment:
-    def __init__(self, freq_mask_param=8, time_mask_param=8):
-        self.freq_mask = torchaudio.transforms.FrequencyMasking(freq_mask_param)
-        self.time_mask = torchaudio.transforms.TimeMasking(time_mask_param)
-    def __call__(self, spec):
+class SpecAugment(nn.Module):
+    """iid_masks=True: on a (batch, 1, freq, time) input every example gets its own masks."""
+    def __init__(self, freq_mask_param=8, time_mask_param=8, iid_masks=False):
+        super().__init__()
+        self.freq_mask = torchaudio.transforms.FrequencyMasking(freq_mask_param, iid_masks=iid_masks)
+        self.time_mask = torchaudio.transforms.TimeMasking(time_mask_param, iid_masks=iid_masks)
+    def forward(self, spec):
         return self.time_mask(self.freq_mask(spec))
 
+class ToSequence(nn.Module):
+    """(..., n_features, time) -> (..., time, n_features); pool=True averages over time to (..., n_features)."""
+    def __init__(self, pool=False):
+        super().__init__()
+        self.pool = pool
+    def forward(self, spec):
+        spec = spec.transpose(-2, -1)
+        return spec.mean(dim=-2) if self.pool else spec
+
+class BatchFeatures(nn.Module):
+    """
+    (batch, samples) waveforms -> (batch, time, n_features) features on the
+    waveforms' device. SpecAugment only runs in train() mode. pool=True
+    averages over time to (batch, n_features), for the FFNN baseline.
+    """
+    def __init__(self, feature_type, augment=None, pool=False):
+        super().__init__()
+        self.extract = MFCC() if feature_type == 'mfcc' else LogMel()
+        self.augment = SpecAugment(iid_masks=True) if augment == 'specaugment' else None
+        self.to_sequence = ToSequence(pool)
+
+    def forward(self, waveforms):
+        spec = self.extract(waveforms)  # (batch, n_features, time)
+        if self.augment is not None and self.training:
+            spec = self.augment(spec.unsqueeze(1)).squeeze(1)
+        return self.to_sequence(spec)
+
 # Utility to build transform pipeline
-def get_transform(feature_type, augment=None):
+def get_transform(feature_type, augment=None, pool=False):
+    """(1, samples) waveform -> (1, time, n_features), or (1, n_features) with pool=True."""
     transforms = [ToMono()]
     if feature_type == 'mfcc':
         transforms.append(MFCC())
@@ -58,4 +105,54 @@ def get_transform(feature_type, augment=None):
         transforms.append(LogMel())
     if augment == 'specaugment':
         transforms.append(SpecAugment())
+    transforms.append(ToSequence(pool))
     return torch.nn.Sequential(*transforms)
+
+def feature_pipeline(feature_type, augment=None, batched=config.BATCHED_FEATURES, pool=False):
+    """
+    (dataset transform, train_model batch_transform) for a milestone: either
+    per-clip features in the dataset, or raw waveforms from the dataset and
+    BatchFeatures on the device.
+    """
+    if batched:
+        return None, BatchFeatures(feature_type, augment, pool=pool)
+    return get_transform(feature_type, augment, pool=pool), None
+
+
+@torch.no_grad()
+def benchmark(feature_type='logmel', augment=None, batch_size=config.BATCH_SIZE, batches=10, device='cpu'):
+    """Clips/s of the per-clip pipeline vs BatchFeatures on the same random 4 s batches."""
+    per_item = get_transform(feature_type, augment)
+    batched = BatchFeatures(feature_type, augment).to(device).train()
+    waveforms = torch.randn(batch_size, config.MAX_AUDIO_SAMPLES)
+    per_item(waveforms[:1]), batched(waveforms.to(device))  # warm up
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        # As a DataLoader would: one clip at a time, then collate and copy to the device
+        torch.stack([per_item(w.unsqueeze(0)).squeeze(0) for w in waveforms]).to(device)
+    per_item_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        batched(waveforms.to(device))
+    if device.startswith('cuda'):
+        torch.cuda.synchronize()
+    batched_s = time.perf_counter() - start
+
+    clips = batch_size * batches
+    return {"per_item_clips_per_s": clips / per_item_s, "batched_clips_per_s": clips / batched_s,
+            "speedup": per_item_s / batched_s}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-clip vs batched feature extraction throughput")
+    parser.add_argument("--feature", choices=["mfcc", "logmel"], default="logmel")
+    parser.add_argument("--augment", choices=["specaugment"], default=None)
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+    result = benchmark(args.feature, args.augment, args.batch_size, args.batches, args.device)
+    print(f"per-item: {result['per_item_clips_per_s']:.0f} clips/s  batched ({args.device}): "
+          f"{result['batched_clips_per_s']:.0f} clips/s  ({result['speedup']:.1f}x)")
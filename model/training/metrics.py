@@ -0,0 +1,44 @@
+"""
+metrics.py — Streaming classification metrics
+---------------------------------------------
+ConfusionMatrix accumulates a (classes, classes) count matrix on the device
+the predictions live on: one bincount per batch, no host sync and O(C²)
+memory however long the epoch. compute() derives accuracy and the
+support-weighted precision / recall / F1 that sklearn's
+precision_recall_fscore_support(average="weighted", zero_division=0) gives.
+"""
+
+import torch
+
+
+class ConfusionMatrix:
+    """Rows are targets, columns predictions."""
+
+    def __init__(self, num_classes, device="cpu"):
+        self.num_classes = num_classes
+        self.matrix = torch.zeros(num_classes, num_classes, dtype=torch.long, device=device)
+
+    def update(self, preds, targets):
+        flat = targets.reshape(-1).long() * self.num_classes + preds.reshape(-1).long()
+        self.matrix += torch.bincount(flat, minlength=self.num_classes ** 2).view(self.num_classes, self.num_classes)
+
+    def reset(self):
+        self.matrix.zero_()
+
+    def compute(self):
+        """accuracy, weighted precision / recall / f1, and the matrix as a CPU tensor (one host sync)."""
+        m = self.matrix.double()
+        tp = m.diag()
+        support = m.sum(dim=1)
+        predicted = m.sum(dim=0)
+        precision = torch.where(predicted > 0, tp / predicted.clamp(min=1), torch.zeros_like(tp))
+        recall = torch.where(support > 0, tp / support.clamp(min=1), torch.zeros_like(tp))
+        denom = precision + recall
+        f1 = torch.where(denom > 0, 2 * precision * recall / denom.clamp(min=1e-12), torch.zeros_like(tp))
+        weights = support / support.sum().clamp(min=1)
+        stats = torch.stack([tp.sum() / m.sum().clamp(min=1), (precision * weights).sum(),
+                             (recall * weights).sum(), (f1 * weights).sum()]).tolist()
+        return {
+            "accuracy": stats[0], "precision": stats[1], "recall": stats[2], "f1": stats[3],
+            "confusion_matrix": self.matrix.cpu(),
+        }
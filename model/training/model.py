@@ -5,6 +5,7 @@ Contains all architectures used across milestones:
 - FFNN (baseline)
 - EmotionLSTM
 - CRNN (CNN + BiLSTM)
+- SpecTransformer (narrow transformer on log-mel, a distillation student)
 - Wav2Vec2Classifier (Hugging Face)
 """
 
@@ -66,6 +67,30 @@ class CRNN(nn.Module):
         return self.fc(torch.cat((hn[-2], hn[-1]), dim=1))
 
 
+# ---- Narrow transformer ----
+class SpecTransformer(nn.Module):
+    """Conv subsampling (4x in time) -> pre-norm transformer encoder -> mean pool -> FC."""
+    def __init__(self, n_mels, d_model, nhead, num_layers, dim_feedforward, dropout, num_classes, max_frames=512):
+        super().__init__()
+        self.subsample = nn.Sequential(
+            nn.Conv1d(n_mels, d_model, kernel_size=3, stride=2, padding=1),
+            nn.GELU(),
+            nn.Conv1d(d_model, d_model, kernel_size=3, stride=2, padding=1),
+            nn.GELU()
+        )
+        self.position = nn.Parameter(torch.zeros(1, max_frames, d_model))
+        layer = nn.TransformerEncoderLayer(d_model, nhead, dim_feedforward, dropout,
+                                           batch_first=True, norm_first=True)
+        self.encoder = nn.TransformerEncoder(layer, num_layers, enable_nested_tensor=False)
+        self.norm = nn.LayerNorm(d_model)
+        self.fc = nn.Linear(d_model, num_classes)
+
+    def forward(self, x):
+        x = self.subsample(x.transpose(1, 2)).transpose(1, 2)  # (batch, time/4, d_model)
+        x = self.encoder(x + self.position[:, :x.size(1)])
+        return self.fc(self.norm(x.mean(dim=1)))
+
+
 # ---- Wav2Vec2 ----
 class Wav2Vec2Classifier(nn.Module):
     def __init__(self, pretrained="facebook/wav2vec2-base", num_labels=8):
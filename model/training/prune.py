@@ -0,0 +1,198 @@
+"""
+prune.py — Score, prune and report a smaller Wav2Vec2 classifier
+----------------------------------------------------------------
+Importance is measured once, on the validation split, on the fine-tuned
+Wav2Vec2ForSequenceClassification:
+- heads: |dLoss / d gate| summed over the split, with a gate of 1 on each
+  head's output (Michel et al., 2019), normalized per layer
+- layers: validation loss increase when the layer is skipped
+
+Each pruning level ("head fraction:layers", e.g. 0.25:2) drops the
+least important layers, then the lowest-scoring fraction of the remaining
+heads (every layer keeps at least one), physically (training/pruning.py).
+It optionally runs a short recovery fine-tune with train_model and is saved
+with save_pretrained plus the feature extractor, ready for MODEL_PATH.
+The report lists heads / layers kept, parameters, checkpoint size, test
+accuracy / F1 and single-clip CPU latency for every level.
+
+Usage (from model/):
+    python -m training.prune --model <fine-tuned dir> --levels 0.25:0,0.5:0,0:2,0.25:2,0.5:4 \\
+        --recovery-epochs 2 --out-dir pruned/
+"""
+
+import argparse
+import copy
+import json
+import os
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from training import config
+from training.bucketing import pad_collate
+from training.calibrate_cascade import measure_cost_ms
+from training.pruning import count_heads, load_classifier, prune_heads, prune_layers, pruned_heads_of
+from training.train import evaluate_model, make_loader, train_model, unpack_batch
+
+
+class Normalize(nn.Module):
+    """Per-clip zero mean / unit variance, as Wav2Vec2FeatureExtractor(do_normalize=True) does when serving."""
+
+    def forward(self, waveforms):
+        mean = waveforms.mean(dim=-1, keepdim=True)
+        var = waveforms.var(dim=-1, keepdim=True, unbiased=False)
+        return (waveforms - mean) / torch.sqrt(var + 1e-7)
+
+
+def original_heads(model, layer):
+    """Original head index of each head still in the layer's weights."""
+    pruned = pruned_heads_of(model.config).get(layer, [])
+    return [h for h in range(model.config.num_attention_heads) if h not in pruned]
+
+
+def head_importance(model, dataset, batch_transform=None, batch_size=config.BATCH_SIZE, device=None):
+    """{(layer, original head): importance}, each layer's scores scaled to unit L2 norm."""
+    device = device or next(model.parameters()).device
+    layers = model.wav2vec2.encoder.layers
+    gates = [torch.ones(layer.attention.num_heads, device=device, requires_grad=True) for layer in layers]
+
+    def gate_hook(gate):
+        def hook(module, args):
+            x = args[0]  # (batch, frames, heads * head_dim), the input of out_proj
+            return (x.view(*x.shape[:-1], len(gate), -1).mul(gate[:, None]).flatten(-2),)
+        return hook
+
+    hooks = [layer.attention.out_proj.register_forward_pre_hook(gate_hook(gate)) for layer, gate in zip(layers, gates)]
+    scores = [torch.zeros(len(gate), device=device) for gate in gates]
+    criterion = nn.CrossEntropyLoss()
+    was_training = model.training
+    model.eval()
+    try:
+        collate = pad_collate if config.VARIABLE_LENGTH else None
+        for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=collate):
+            X, y, kwargs = unpack_batch(batch, device, takes_mask=True)
+            if batch_transform is not None:
+                X = batch_transform(X)
+            loss = criterion(model(X, **kwargs).logits, y)
+            for score, grad in zip(scores, torch.autograd.grad(loss, gates)):
+                score += grad.abs()
+    finally:
+        for hook in hooks:
+            hook.remove()
+        model.train(was_training)
+    importance = {}
+    for layer, score in enumerate(scores):
+        score = score / score.norm().clamp(min=1e-12)
+        for head, value in zip(original_heads(model, layer), score.tolist()):
+            importance[layer, head] = value
+    return importance
+
+
+def layer_importance(model, dataset, batch_transform=None, batch_size=config.EVAL_BATCH_SIZE, device=None):
+    """[validation loss increase when layer i is skipped] for every layer."""
+    device = device or next(model.parameters()).device
+    encoder = model.wav2vec2.encoder
+    loader = make_loader(dataset, batch_size, device=device, num_workers=0, bucket_by_length=config.VARIABLE_LENGTH)
+    evaluate = lambda: evaluate_model(model, None, device=device, batch_transform=batch_transform, loader=loader)["loss"]
+    base_loss = evaluate()
+    layers, layer_weights = encoder.layers, getattr(model, "layer_weights", None)
+    increase = []
+    try:
+        for i in range(len(layers)):
+            encoder.layers = nn.ModuleList(layer for j, layer in enumerate(layers) if j != i)
+            if layer_weights is not None:
+                model.layer_weights = nn.Parameter(torch.cat([layer_weights[:i + 1], layer_weights[i + 2:]]).detach())
+            increase.append(evaluate() - base_loss)
+    finally:
+        encoder.layers = layers
+        if layer_weights is not None:
+            model.layer_weights = layer_weights
+    return increase
+
+
+def pruning_plan(head_scores, layer_scores, head_fraction, num_layers):
+    """(layers to drop, {layer: heads to remove}) for one level, in the scored model's numbering."""
+    drop = sorted(sorted(range(len(layer_scores)), key=lambda i: layer_scores[i])[:num_layers])
+    candidates = sorted((score, layer, head) for (layer, head), score in head_scores.items() if layer not in drop)
+    remaining = {}
+    for _, layer, head in candidates:
+        remaining[layer] = remaining.get(layer, 0) + 1
+    heads = {}
+    for score, layer, head in candidates[:round(head_fraction * len(candidates))]:
+        if remaining[layer] > 1:
+            heads.setdefault(layer, []).append(head)
+            remaining[layer] -= 1
+    return drop, heads
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+if __name__ == "__main__":
+    from transformers import Wav2Vec2FeatureExtractor
+    from training.datasets import MultiDataset
+    from training.split import split_dataset
+
+    parser = argparse.ArgumentParser(description="Structured head / layer pruning of the Wav2Vec2 classifier")
+    parser.add_argument("--model", default="manelbrh1342/emotion-recognition-model")
+    parser.add_argument("--datasets", default="ravdess,cremad,tess,savee")
+    parser.add_argument("--levels", default="0.25:0,0.5:0,0:2,0.25:2,0.5:4",
+                        help="Comma-separated 'head fraction:layers dropped' levels")
+    parser.add_argument("--recovery-epochs", type=int, default=0, help="Fine-tune each pruned model this many epochs")
+    parser.add_argument("--lr", type=float, default=1e-5)
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=1, help="torch CPU threads for the latency measurement")
+    parser.add_argument("--out-dir", default="pruned")
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    threads = torch.get_num_threads()
+    processor = Wav2Vec2FeatureExtractor.from_pretrained(args.model)
+    normalize = Normalize() if processor.do_normalize else None
+    base = load_classifier(args.model).to(device).eval()
+    dataset = MultiDataset(datasets=args.datasets.split(","))
+    train_set, val_set, test_set = split_dataset(dataset)
+
+    head_scores = head_importance(base, val_set, normalize, args.batch_size, device)
+    layer_scores = layer_importance(base, val_set, normalize, device=device)
+    print("Val loss increase per skipped layer: " + ", ".join(f"{i}: {s:+.4f}" for i, s in enumerate(layer_scores)))
+
+    levels = [(0.0, 0)] + [(float(h), int(n)) for h, n in (level.split(":") for level in args.levels.split(","))]
+    report = []
+    for head_fraction, num_layers in levels:
+        model = copy.deepcopy(base)
+        drop, heads = pruning_plan(head_scores, layer_scores, head_fraction, num_layers)
+        prune_heads(model, heads)
+        prune_layers(model, drop)
+        if args.recovery_epochs and (heads or drop):
+            train_model(model, train_set, val_dataset=val_set, epochs=args.recovery_epochs, lr=args.lr,
+                        optimizer="adamw", class_weighted=True, batch_transform=normalize,
+                        batch_size=args.batch_size, device=device)
+        metrics = evaluate_model(model, test_set, device=device, batch_transform=normalize)
+
+        name = f"heads{int(head_fraction * 100)}_layers{num_layers}"
+        out = os.path.join(args.out_dir, name)
+        model.save_pretrained(out)
+        processor.save_pretrained(out)
+        torch.set_num_threads(args.threads)
+        cpu_model = copy.deepcopy(model).cpu().eval()
+        with torch.inference_mode():
+            latency = measure_cost_ms(lambda X: cpu_model(normalize.cpu()(X) if normalize else X).logits)
+        torch.set_num_threads(threads)
+        report.append({
+            "level": name, "path": out, "dropped_layers": drop, "pruned_heads": model.config.pruned_heads,
+            "layers": model.config.num_hidden_layers, "heads": count_heads(model),
+            "parameters": count_parameters(model), "size_mb": os.path.getsize(os.path.join(out, "model.safetensors")) / 2**20,
+            "accuracy": metrics["accuracy"], "f1": metrics["f1"], "cpu_ms_per_clip": latency,
+        })
+        del model, cpu_model
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    with open(os.path.join(args.out_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    recovery = f", {args.recovery_epochs} recovery epoch(s)" if args.recovery_epochs else ""
+    print(f"{'level':<20} {'layers':>6} {'heads':>6} {'params':>8} {'size':>8} {'test acc':>9} {'F1':>7} "
+          f"{'CPU ms/clip':>12}  ({args.threads} thread(s){recovery})")
+    for row in report:
+        print(f"{row['level']:<20} {row['layers']:>6} {row['heads']:>6} {row['parameters']/1e6:>7.2f}M "
+              f"{row['size_mb']:>6.1f}MB {row['accuracy']*100:>8.2f}% {row['f1']:>7.4f} {row['cpu_ms_per_clip']:>12.1f}")
@@ -0,0 +1,100 @@
+"""
+pruning.py — Structured head / layer pruning for Wav2Vec2 classifiers
+---------------------------------------------------------------------
+prune_heads slices the removed heads' rows out of q/k/v_proj and their
+columns out of out_proj; prune_layers drops whole transformer layers. Both
+shrink the weights (and the compute), rather than masking them.
+
+A pruned model is saved with save_pretrained. Dropped layers only change
+config.num_hidden_layers. Removed heads are recorded in config.pruned_heads
+({layer: [original head indices]}), since Wav2Vec2's attention is built at
+full width from the config. load_classifier rebuilds those shapes before
+loading the weights, and is how the API's engines load the model.
+"""
+
+import torch
+import torch.nn as nn
+
+
+def _slice_linear(linear, index, dim):
+    """Copy of linear keeping the given output rows (dim=0) or input columns (dim=1)."""
+    weight = linear.weight.detach().index_select(dim, index.to(linear.weight.device)).clone()
+    out_features, in_features = weight.shape
+    sliced = nn.Linear(in_features, out_features, bias=linear.bias is not None,
+                       device=weight.device, dtype=weight.dtype)
+    sliced.weight.data.copy_(weight)
+    if linear.bias is not None:
+        bias = linear.bias.detach()
+        sliced.bias.data.copy_(bias[index.to(bias.device)] if dim == 0 else bias)
+    return sliced
+
+
+def pruned_heads_of(config):
+    """config.pruned_heads with int layer keys (JSON turns them into strings)."""
+    return {int(layer): sorted(int(h) for h in heads) for layer, heads in (getattr(config, "pruned_heads", None) or {}).items()}
+
+
+def prune_heads(model, heads):
+    """
+    Remove attention heads in place. heads: {layer: original head indices}, so
+    pruning in several rounds works. Every layer keeps at least one head.
+    """
+    config = model.config
+    pruned = pruned_heads_of(config)
+    layers = model.wav2vec2.encoder.layers
+    for layer, new_heads in heads.items():
+        done = set(pruned.get(layer, []))
+        new_heads = set(int(h) for h in new_heads) - done
+        if not new_heads:
+            continue
+        remaining = [h for h in range(config.num_attention_heads) if h not in done]
+        if not set(remaining) - new_heads:
+            raise ValueError(f"Cannot remove every attention head of layer {layer}; drop the layer instead")
+        attention = layers[layer].attention
+        d = attention.head_dim
+        keep = [i for i, h in enumerate(remaining) if h not in new_heads]  # positions in the current weights
+        index = torch.cat([torch.arange(i * d, (i + 1) * d) for i in keep])
+        attention.q_proj = _slice_linear(attention.q_proj, index, 0)
+        attention.k_proj = _slice_linear(attention.k_proj, index, 0)
+        attention.v_proj = _slice_linear(attention.v_proj, index, 0)
+        attention.out_proj = _slice_linear(attention.out_proj, index, 1)
+        attention.num_heads = len(keep)
+        pruned[layer] = sorted(done | new_heads)
+    config.pruned_heads = {layer: heads for layer, heads in sorted(pruned.items())}
+    return model
+
+
+def prune_layers(model, layers):
+    """Remove the given transformer layers in place; the rest are renumbered."""
+    config = model.config
+    encoder = model.wav2vec2.encoder
+    drop = set(int(layer) for layer in layers)
+    keep = [i for i in range(len(encoder.layers)) if i not in drop]
+    encoder.layers = nn.ModuleList(encoder.layers[i] for i in keep)
+    if getattr(model, "layer_weights", None) is not None:  # use_weighted_layer_sum: entry 0 is the embeddings
+        model.layer_weights = nn.Parameter(model.layer_weights.detach()[[0] + [i + 1 for i in keep]].clone())
+    pruned = pruned_heads_of(config)
+    config.pruned_heads = {new: pruned[old] for new, old in enumerate(keep) if old in pruned}
+    config.num_hidden_layers = len(keep)
+    return model
+
+
+def count_heads(model):
+    return sum(layer.attention.num_heads for layer in model.wav2vec2.encoder.layers)
+
+
+def load_classifier(model_path):
+    """Wav2Vec2ForSequenceClassification.from_pretrained that also restores pruned attention heads."""
+    from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+    from transformers.utils import cached_file
+    from safetensors.torch import load_file
+
+    config = Wav2Vec2Config.from_pretrained(model_path)
+    heads = pruned_heads_of(config)
+    if not heads:
+        return Wav2Vec2ForSequenceClassification.from_pretrained(model_path)
+    config.pruned_heads = {}  # the fresh model is full width; prune_heads records them again
+    model = Wav2Vec2ForSequenceClassification(config)
+    prune_heads(model, heads)
+    model.load_state_dict(load_file(cached_file(model_path, "model.safetensors")))
+    return model.eval()
@@ -0,0 +1,125 @@
+"""
+resampling.py — Cached polyphase resampler
+------------------------------------------
+Band-limited (Hann-windowed sinc) resampling, numerically equivalent to
+torchaudio.functional.resample's default "sinc_interp_hann" method. The
+polyphase filter bank is built once per (orig_sr, new_sr) pair and cached;
+audio stays float32 throughout. StreamingResampler resamples chunked input
+with the same output as resampling the concatenated signal in one go.
+
+The filter bank holds about orig × new taps for the reduced ratio orig:new
+(441:160 for 44.1 → 16 kHz). Rates with a large reduced ratio (22051 → 16000
+is 22051:16000, several GB) are resampled at the nearest ratio with both
+terms <= MAX_BLOCK instead; the output is stretched by that ratio's relative
+error (4e-7 there), far below anything audible.
+"""
+
+import math
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAX_BLOCK = 1024  # cap on input / output samples per polyphase block (kernel of ~MAX_BLOCK² taps)
+
+
+def block_sizes(orig_sr, new_sr, max_block=MAX_BLOCK):
+    """(orig, new) samples per polyphase block: the reduced ratio, or its nearest approximation within max_block."""
+    ratio = Fraction(int(new_sr), int(orig_sr))
+    if max(ratio.numerator, ratio.denominator) > max_block:
+        # limit_denominator bounds the smaller term, which keeps the larger one within max_block too
+        ratio = ratio.limit_denominator(max_block) if ratio <= 1 else 1 / (1 / ratio).limit_denominator(max_block)
+    return ratio.denominator, ratio.numerator
+
+
+class Resampler:
+    def __init__(self, orig_sr, new_sr, lowpass_filter_width=6, rolloff=0.99):
+        self.orig_sr, self.new_sr = int(orig_sr), int(new_sr)
+        # input / output samples per polyphase block
+        self.orig, self.new = block_sizes(self.orig_sr, self.new_sr)
+        self.kernel, self.width = self._build_kernel(lowpass_filter_width, rolloff)
+
+    def _build_kernel(self, lowpass_filter_width, rolloff):
+        """(kernel_size, new) filter bank: column p produces output phase p of each block."""
+        base_freq = min(self.orig, self.new) * rolloff
+        width = math.ceil(lowpass_filter_width * self.orig / base_freq)
+        idx = np.arange(-width, width + self.orig, dtype=np.float64)[None, :] / self.orig
+        t = (-np.arange(self.new, dtype=np.float64)[:, None] / self.new + idx) * base_freq
+        t = np.clip(t, -lowpass_filter_width, lowpass_filter_width)
+        window = np.cos(t * math.pi / lowpass_filter_width / 2) ** 2
+        t *= math.pi
+        with np.errstate(invalid="ignore", divide="ignore"):
+            kernel = np.where(t == 0, 1.0, np.sin(t) / t)
+        kernel *= window * base_freq / self.orig
+        return np.ascontiguousarray(kernel.T, dtype=np.float32), width
+
+    @property
+    def kernel_size(self):
+        return self.kernel.shape[0]
+
+    def _apply(self, padded):
+        """Run whole blocks of an already padded (..., time) float32 array."""
+        n_blocks = (padded.shape[-1] - self.kernel_size) // self.orig + 1
+        if n_blocks <= 0:
+            return np.zeros(padded.shape[:-1] + (0,), dtype=np.float32)
+        frames = sliding_window_view(padded, self.kernel_size, axis=-1)[..., :n_blocks * self.orig:self.orig, :]
+        out = frames @ self.kernel  # (..., n_blocks, new)
+        return out.reshape(out.shape[:-2] + (-1,))
+
+    def __call__(self, waveform):
+        """Resample a (..., time) numpy array or torch tensor along its last axis."""
+        is_tensor = not isinstance(waveform, np.ndarray)
+        audio = np.asarray(waveform.numpy() if is_tensor else waveform, dtype=np.float32)
+        if self.orig == self.new:
+            out = audio
+        else:
+            length = audio.shape[-1]
+            pad = [(0, 0)] * (audio.ndim - 1) + [(self.width, self.width + self.orig)]
+            out = self._apply(np.pad(audio, pad))[..., :math.ceil(self.new * length / self.orig)]
+        if is_tensor:
+            import torch
+
+            return torch.from_numpy(np.ascontiguousarray(out))
+        return out
+
+    def stream(self):
+        return StreamingResampler(self)
+
+
+class StreamingResampler:
+    """Incremental 1-D resampling: push() chunks as they arrive, flush() at the end."""
+
+    def __init__(self, resampler):
+        self.resampler = resampler
+        # Input history still needed by upcoming blocks, starting with the left padding
+        self._buf = np.zeros(resampler.width, dtype=np.float32)
+        self._n_in = 0
+        self._n_out = 0
+
+    def push(self, chunk):
+        r = self.resampler
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if r.orig == r.new:
+            return chunk
+        self._n_in += len(chunk)
+        self._buf = np.concatenate([self._buf, chunk])
+        out = r._apply(self._buf)
+        self._buf = self._buf[len(out) // r.new * r.orig:]
+        self._n_out += len(out)
+        return out
+
+    def flush(self):
+        """Emit the tail of the signal (right padding) and reset to a fresh stream."""
+        r = self.resampler
+        if r.orig == r.new:
+            return np.zeros(0, dtype=np.float32)
+        out = r._apply(np.concatenate([self._buf, np.zeros(r.width + r.orig, dtype=np.float32)]))
+        out = out[:max(math.ceil(r.new * self._n_in / r.orig) - self._n_out, 0)]
+        self.__init__(r)
+        return out
+
+
+@lru_cache(maxsize=32)
+def get_resampler(orig_sr, new_sr):
+    """Shared Resampler for a sample-rate pair; filter banks are built once per process."""
+    return Resampler(orig_sr, new_sr)
@@ -6,6 +6,7 @@ Provides stratified train/val/test split for SER datasets.
 
 import numpy as np
 from sklearn.model_selection import train_test_split
+from torch.utils.data import Subset
 
 def stratified_split(samples, labels, val_size=0.1, test_size=0.1, random_state=42):
     """
@@ -16,3 +17,9 @@ def stratified_split(samples, labels, val_size=0.1, test_size=0.1, random_state=
     train_idx, test_idx = train_test_split(idx, test_size=test_size, stratify=labels, random_state=random_state)
     train_idx, val_idx = train_test_split(train_idx, test_size=val_size/(1-test_size), stratify=[labels[i] for i in train_idx], random_state=random_state)
     return train_idx, val_idx, test_idx
+
+def split_dataset(dataset, val_size=0.1, test_size=0.1, random_state=42):
+    """(train, val, test) Subsets of a dataset with .samples, stratified by label."""
+    labels = [label for _, label in dataset.samples]
+    train_idx, val_idx, test_idx = stratified_split(dataset.samples, labels, val_size, test_size, random_state)
+    return Subset(dataset, train_idx), Subset(dataset, val_idx), Subset(dataset, test_idx)
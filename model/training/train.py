@@ -2,36 +2,168 @@
 train.py — Training utilities
 -----------------------------
 Generic PyTorch training loop, evaluation, and logging.
+
+One forward per step, optional bf16/fp16 autocast, gradient accumulation and
+torch.compile; the DataLoader uses worker processes with prefetching (pinned
+memory on CUDA). Each epoch logs samples/s and time per step split into
+waiting on data vs. compute, so input-bound runs are easy to spot.
 """
 
 
+import inspect
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import DataLoader
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
-import numpy as np
-import os
+from torch.utils.data import Subset
 from training import config
+from training.bucketing import LengthBucketSampler, dataset_lengths, pad_collate
+from training.checkpoint import (CheckpointWriter, latest_checkpoint, load_checkpoint,
+                                 restore_training_state, training_state)
+from training.metrics import ConfusionMatrix
+
+
+def logits_of(output):
+    """Logits from a plain tensor or a Hugging Face ModelOutput."""
+    return output if torch.is_tensor(output) else output["logits"]
+
+
+def class_weights(dataset):
+    """dataset.class_weights(), also for a Subset (counted over its indices only)."""
+    if not isinstance(dataset, Subset):
+        return dataset.class_weights()
+    emotions = dataset.dataset.emotions
+    counts = torch.zeros(len(emotions))
+    for i in dataset.indices:
+        counts[emotions.index(dataset.dataset.samples[i][1])] += 1
+    return 1.0 / counts.clamp(min=1)
+
+
+def unpack_batch(batch, device, takes_mask):
+    """
+    (X, y, forward kwargs) on the device, from (X, y) or pad_collate's (X, attention_mask, y).
+    y is a (labels, teacher logits) tuple for a distill.DistillationDataset.
+    """
+    X, y = batch[0].to(device, non_blocking=True), batch[-1]
+    if isinstance(y, (list, tuple)):
+        y = tuple(t.to(device, non_blocking=True) for t in y)
+    else:
+        y = y.to(device, non_blocking=True)
+    kwargs = {}
+    if len(batch) == 3 and takes_mask:
+        kwargs["attention_mask"] = batch[1].to(device, non_blocking=True)
+    return X, y, kwargs
+
+
+def make_loader(dataset, batch_size=config.BATCH_SIZE, shuffle=False, sampler=None, device="cpu",
+                num_workers=config.NUM_WORKERS, prefetch_factor=config.PREFETCH_FACTOR, bucket_by_length=False):
+    """
+    DataLoader with worker processes, prefetching and (on CUDA) pinned memory for async copies.
+    bucket_by_length: LengthBucketSampler batches padded by pad_collate, yielding (X, attention_mask, y).
+    """
+    workers = num_workers > 0
+    options = dict(num_workers=num_workers, pin_memory=str(device).startswith("cuda"),
+                   prefetch_factor=prefetch_factor if workers else None, persistent_workers=workers)
+    if bucket_by_length:
+        if sampler is not None:
+            raise ValueError("bucket_by_length replaces the sampler; use one or the other")
+        batch_sampler = LengthBucketSampler(dataset_lengths(dataset), batch_size, shuffle=shuffle)
+        return DataLoader(dataset, batch_sampler=batch_sampler, collate_fn=pad_collate, **options)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle and sampler is None, sampler=sampler, **options)
+
+
+def evaluate_model(model, dataset, batch_size=config.EVAL_BATCH_SIZE, device=None, batch_transform=None,
+                   amp=config.AMP, num_workers=config.NUM_WORKERS, bucket_by_length=config.VARIABLE_LENGTH,
+                   criterion=None, loader=None):
+    """
+    Loss, accuracy, weighted precision / recall / F1 and confusion matrix on a
+    dataset (e.g. the val or test Subset from split.split_dataset). Runs in
+    inference mode with large batches; metrics accumulate on the device.
+    """
+    device = device or next(model.parameters()).device
+    device_type = torch.device(device).type
+    loader = loader or make_loader(dataset, batch_size, device=device, num_workers=num_workers,
+                                   bucket_by_length=bucket_by_length)
+    takes_mask = "attention_mask" in inspect.signature(model.forward).parameters
+    criterion = criterion or nn.CrossEntropyLoss()
+    was_training = model.training
+    model.eval()
+    if batch_transform is not None:
+        batch_transform.eval()  # no SpecAugment
+    metrics, total_loss = None, torch.zeros((), device=device)
+    with torch.inference_mode():
+        for batch in loader:
+            X, y, kwargs = unpack_batch(batch, device, takes_mask)
+            if batch_transform is not None:
+                X = batch_transform(X)
+            with torch.autocast(device_type, dtype=torch.bfloat16 if amp == "bf16" else torch.float16,
+                                enabled=amp is not None):
+                output = logits_of(model(X, **kwargs)).float()
+            total_loss += criterion(output, y) * len(y)
+            metrics = metrics or ConfusionMatrix(output.shape[1], device)
+            metrics.update(output.argmax(1), y)
+    model.train(was_training)
+    if batch_transform is not None:
+        batch_transform.train(was_training)
+    result = metrics.compute()
+    result["loss"] = total_loss.item() / max(int(metrics.matrix.sum()), 1)
+    return result
 
 
 def train_model(model, dataset, epochs=config.EPOCHS, lr=config.LEARNING_RATE,
                 optimizer="adam", weight_decay=config.WEIGHT_DECAY,
-                class_weighted=False, scheduler=None, device=None):
+                class_weighted=False, scheduler=None, device=None, batch_transform=None, sampler=None,
+                batch_size=config.BATCH_SIZE, num_workers=config.NUM_WORKERS, amp=config.AMP,
+                grad_accum_steps=1, compile=False, log_every=config.LOG_EVERY,
+                bucket_by_length=config.VARIABLE_LENGTH, val_dataset=None, test_dataset=None,
+                checkpoint_dir=None, keep_checkpoints=config.KEEP_CHECKPOINTS, resume=None, criterion=None):
     """
     Trains a model with the given dataset.
     - dataset: PyTorch Dataset object
+    - batch_transform: module applied to each collated batch on the device
+      (e.g. feature_extraction.BatchFeatures), for datasets yielding waveforms
+    - sampler: replaces shuffling (e.g. MultiDataset.corpus_sampler())
+    - amp: None, "bf16" (CPU or CUDA autocast) or "fp16" (CUDA, with loss scaling)
+    - grad_accum_steps: optimizer step every N batches (effective batch N * batch_size)
+    - compile: run the forward through torch.compile
+    - log_every: print throughput every N optimizer steps (0: per epoch only)
+    - bucket_by_length: length-bucketed, dynamically padded batches for a
+      variable_length dataset; the attention mask goes to models that take one
+    - val_dataset / test_dataset: evaluated with evaluate_model after every
+      epoch; the best checkpoint is chosen by validation F1 when given
+    - checkpoint_dir: write the full training state there after every epoch
+      (in the background; the last keep_checkpoints are kept)
+    - resume: a checkpoint path, or "latest" in checkpoint_dir, to continue
+      exactly where that run stopped
+    - criterion: loss called as criterion(logits, y), replacing the (class-weighted)
+      cross-entropy; e.g. distill.DistillationLoss with a DistillationDataset
+    Returns a list of per-epoch dicts (loss, accuracy, f1, samples_per_s, step_ms,
+    data_ms, plus "val" / "test" metrics).
     """
+    if resume == "latest" and not checkpoint_dir:
+        raise ValueError('resume="latest" needs the checkpoint_dir to look in')
     # Set random seed for reproducibility
     config.set_seed(42)
 
     device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    device_type = torch.device(device).type
     model = model.to(device)
+    if batch_transform is not None:
+        batch_transform = batch_transform.to(device).train()
+    forward = torch.compile(model) if compile else model
+    if amp not in (None, "bf16", "fp16"):
+        raise ValueError(f"Unknown amp mode {amp!r}; expected None, 'bf16' or 'fp16'")
+    amp_dtype = {"bf16": torch.bfloat16, "fp16": torch.float16}.get(amp)
+    scaler = torch.amp.GradScaler(device_type, enabled=amp == "fp16")
 
-    loader = DataLoader(dataset, batch_size=config.BATCH_SIZE, shuffle=True)
-    criterion = nn.CrossEntropyLoss(
-        weight=dataset.class_weights().to(device) if class_weighted else None
+    loader = make_loader(dataset, batch_size, shuffle=True, sampler=sampler, device=device,
+                         num_workers=num_workers, bucket_by_length=bucket_by_length)
+    takes_mask = "attention_mask" in inspect.signature(model.forward).parameters
+    criterion = criterion or nn.CrossEntropyLoss(
+        weight=class_weights(dataset).to(device) if class_weighted else None
     )
+    criterion = criterion.to(device)
     if optimizer == "adamw":
         opt = optim.AdamW(model.parameters(), lr=lr, weight_decay=weight_decay)
     else:
@@ -45,36 +177,105 @@ def train_model(model, dataset, epochs=config.EPOCHS, lr=config.LEARNING_RATE,
 
     best_f1 = 0
     best_model_path = "best_model.pt"
+    history = []
+    start_epoch = 0
+    if resume:
+        path = latest_checkpoint(checkpoint_dir) if resume == "latest" else resume
+        if path is None:
+            raise FileNotFoundError(f"No checkpoint to resume from in {checkpoint_dir!r}")
+        start_epoch, best_f1, history = restore_training_state(load_checkpoint(path), model, opt, sched, scaler)
+        if isinstance(loader.batch_sampler, LengthBucketSampler):
+            loader.batch_sampler.epoch = start_epoch
+        print(f"Resumed from {path} after epoch {start_epoch}")
+    # torch.save runs on a background thread; the loop only pays for a host copy
+    writer = CheckpointWriter(checkpoint_dir, keep=keep_checkpoints) if checkpoint_dir else None
+    eval_loaders = {
+        name: make_loader(split, config.EVAL_BATCH_SIZE, device=device, num_workers=num_workers,
+                          bucket_by_length=bucket_by_length)
+        for name, split in (("val", val_dataset), ("test", test_dataset)) if split is not None
+    }
+
+    finished = False
+    try:
+        for epoch in range(start_epoch, epochs):
+            model.train()
+            # Loss and confusion matrix stay on the device: no per-step host sync
+            total_loss, metrics = torch.zeros((), device=device), None
+            n_samples, data_time, step_time = 0, 0.0, 0.0
+            opt.zero_grad(set_to_none=True)
+            epoch_start = tick = time.perf_counter()
+            for step, batch in enumerate(loader, 1):
+                loaded = time.perf_counter()
+                data_time += loaded - tick
+
+                X, y, kwargs = unpack_batch(batch, device, takes_mask)
+                if batch_transform is not None:
+                    X = batch_transform(X)
+                # One forward: labels are not passed, so Hugging Face models skip their own loss
+                with torch.autocast(device_type, dtype=amp_dtype, enabled=amp is not None):
+                    output = logits_of(forward(X, **kwargs))
+                    loss = criterion(output.float(), y)
+                labels = y[0] if isinstance(y, tuple) else y
+                scaler.scale(loss / grad_accum_steps).backward()
+                if step % grad_accum_steps == 0 or step == len(loader):
+                    scaler.step(opt)
+                    scaler.update()
+                    opt.zero_grad(set_to_none=True)
+
+                total_loss += loss.detach()
+                metrics = metrics or ConfusionMatrix(output.shape[1], device)
+                metrics.update(output.detach().argmax(1), labels)
+
+                tick = time.perf_counter()
+                step_time += tick - loaded
+                n_samples += len(labels)
+                if log_every and step % (log_every * grad_accum_steps) == 0:
+                    print(f"  step {step}/{len(loader)} - {n_samples / (tick - epoch_start):.1f} samples/s - "
+                          f"{(tick - epoch_start) / step * 1000:.0f} ms/step "
+                          f"(data {data_time / step * 1000:.0f} ms, compute {step_time / step * 1000:.0f} ms)")
+
+            total_loss = total_loss.item() / len(loader)
+            elapsed = time.perf_counter() - epoch_start
+            train_metrics = metrics.compute()
+            acc, f1 = train_metrics["accuracy"], train_metrics["f1"]
+            print(f"Epoch {epoch+1}/{epochs} - Loss: {total_loss:.4f} - Acc: {acc*100:.2f}% - F1: {f1:.4f}")
+            print(f"Precision: {train_metrics['precision']:.4f}  Recall: {train_metrics['recall']:.4f}")
+            print(f"Confusion Matrix:\n{train_metrics['confusion_matrix'].numpy()}")
+            print(f"Throughput: {n_samples / elapsed:.1f} samples/s - {elapsed / len(loader) * 1000:.0f} ms/step "
+                  f"(data {data_time / len(loader) * 1000:.0f} ms, compute {step_time / len(loader) * 1000:.0f} ms)")
+            record = {
+                "epoch": epoch + 1, "loss": total_loss, "accuracy": acc, "f1": f1,
+                "samples_per_s": n_samples / elapsed, "step_ms": elapsed / len(loader) * 1000,
+                "data_ms": data_time / len(loader) * 1000,
+            }
+            for name, eval_loader in eval_loaders.items():
+                result = evaluate_model(model, None, device=device, batch_transform=batch_transform, amp=amp,
+                                        loader=eval_loader)
+                print(f"  {name} - Loss: {result['loss']:.4f} - Acc: {result['accuracy']*100:.2f}% - F1: {result['f1']:.4f}")
+                record[name] = {k: v for k, v in result.items() if k != "confusion_matrix"}
+            history.append(record)
+
+            # Save best model by F1 (validation F1 when a val split is given)
+            if "val" in record:
+                f1 = record["val"]["f1"]
+            if f1 > best_f1:
+                best_f1 = f1
+                if writer is not None:
+                    writer.save(model.state_dict(), best_model_path)
+                else:
+                    torch.save(model.state_dict(), best_model_path)
+
+            if sched:
+                if scheduler == "plateau":
+                    sched.step(total_loss)
+                else:
+                    sched.step()
 
-    for epoch in range(epochs):
-        model.train()
-        total_loss, preds, targets = 0, [], []
-        for X, y in loader:
-            X, y = X.to(device), y.to(device)
-            opt.zero_grad()
-            output = model(X) if not isinstance(output := model(X, labels=y), dict) else output["logits"]
-            loss = criterion(output, y)
-            loss.backward()
-            opt.step()
-
-            total_loss += loss.item()
-            preds.extend(output.argmax(1).cpu().numpy())
-            targets.extend(y.cpu().numpy())
-
-        acc = accuracy_score(targets, preds)
-        precision, recall, f1, _ = precision_recall_fscore_support(targets, preds, average="weighted", zero_division=0)
-        cm = confusion_matrix(targets, preds)
-        print(f"Epoch {epoch+1}/{epochs} - Loss: {total_loss/len(loader):.4f} - Acc: {acc*100:.2f}% - F1: {f1:.4f}")
-        print(f"Precision: {precision:.4f}  Recall: {recall:.4f}")
-        print(f"Confusion Matrix:\n{cm}")
-
-        # Save best model by F1
-        if f1 > best_f1:
-            best_f1 = f1
-            torch.save(model.state_dict(), best_model_path)
-
-        if sched:
-            if scheduler == "plateau":
-                sched.step(total_loss)
-            else:
-                sched.step()
+            if writer is not None:
+                writer.save_epoch(training_state(model, opt, sched, scaler, epoch + 1, best_f1, history), epoch + 1)
+        finished = True
+    finally:
+        if writer is not None:
+            # After a training error, a failed write is only reported, so that error is the one raised
+            writer.close(raise_error=finished)
+    return history
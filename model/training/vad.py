@@ -0,0 +1,57 @@
+"""
+vad.py — Silence trimming and loudness normalization
+----------------------------------------------------
+Energy-based voice-activity trimming: frame energies come from one cumulative
+sum of squares (no Python loop over frames), and leading/trailing frames more
+than `top_db` below the loudest frame are cut, keeping `pad_ms` of context
+around the speech. normalize_volume scales RMS loudness to a target dBFS.
+Both work on 1-D float numpy arrays.
+
+Serving and training apply the same steps with the same defaults.
+"""
+
+import numpy as np
+
+TOP_DB = 30
+TARGET_DB = -25
+
+
+def speech_bounds(audio, sample_rate, top_db=TOP_DB, frame_ms=25, hop_ms=10, pad_ms=100):
+    """(start, end) sample range from the first to the last frame within top_db of the loudest one."""
+    n = len(audio)
+    frame = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    if n <= frame:
+        return 0, n
+    power = np.concatenate(([0.0], np.cumsum(np.square(audio, dtype=np.float64))))
+    starts = np.arange(0, n - frame + 1, hop)
+    energy = (power[starts + frame] - power[starts]) / frame
+    if energy.max() < 1e-12:  # digital silence: nothing to anchor on
+        return 0, n
+    db = 10 * np.log10(np.maximum(energy, 1e-20))
+    active = np.flatnonzero(db > db.max() - top_db)
+    pad = int(sample_rate * pad_ms / 1000)
+    return max(int(starts[active[0]]) - pad, 0), min(int(starts[active[-1]]) + frame + pad, n)
+
+
+def trim_silence(audio, sample_rate, top_db=TOP_DB, min_seconds=0.5):
+    """Cut leading/trailing silence; returns (trimmed audio, samples removed). Keeps at least min_seconds."""
+    n = len(audio)
+    start, end = speech_bounds(audio, sample_rate, top_db)
+    shortfall = int(min_seconds * sample_rate) - (end - start)
+    if shortfall > 0:  # widen around the speech instead of returning a sliver
+        start = max(start - shortfall // 2, 0)
+        end = min(start + int(min_seconds * sample_rate), n)
+        start = max(end - int(min_seconds * sample_rate), 0)
+    return audio[start:end], n - (end - start)
+
+
+def normalize_volume(audio, target_dB=TARGET_DB):
+    """Normalize RMS loudness of the audio to target dB."""
+    rms = np.sqrt(np.mean(audio**2))
+    if rms < 1e-6:  # avoid division by zero
+        return audio
+    scalar = 10 ** (target_dB / 20) / rms
+    audio = audio * scalar
+    # Clip to valid range [-1, 1]
+    return np.clip(audio, -1.0, 1.0)
@@ -0,0 +1,141 @@
+"""
+waveform_cache.py — Memory-mapped cache of preprocessed waveforms
+-----------------------------------------------------------------
+Decoding, resampling, downmixing, silence trimming and padding a clip gives
+the same result every epoch, so BaseSERDataset does it once per file and
+writes the fixed-length 16 kHz waveforms into one contiguous (N, samples)
+.npy array (float32 or float16), with a JSON manifest of source paths,
+labels and unpadded lengths. Epochs then read rows straight from the memory
+map; variable-length datasets slice each row to its length.
+
+The cache key hashes the source files (path, size, mtime) together with every
+config value that changes the waveforms (SAMPLE_RATE, MAX_AUDIO_SAMPLES and
+the trimming / loudness settings) and the dtype, so editing, adding or
+removing a file, or changing the config, builds a fresh cache on next use.
+
+    dataset = RAVDESSDataset("datasets/ravdess").build_cache("cache/waveforms", num_workers=4)
+    # or set config.WAVEFORM_CACHE_DIR to cache every dataset on construction
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+from training import config
+
+DTYPES = ("float32", "float16")
+CACHE_VERSION = 2  # bump when the on-disk layout changes
+
+
+def cache_settings(dtype="float32"):
+    """The config values that shape the cached waveforms, and the dtype."""
+    return repr((CACHE_VERSION, config.SAMPLE_RATE, config.MAX_AUDIO_SAMPLES, config.TRIM_SILENCE, config.TRIM_TOP_DB,
+                 config.NORMALIZE_LOUDNESS, config.TARGET_DB, dtype))
+
+
+def cache_key(samples, dtype="float32"):
+    """Hash of the source files and of the config values that shape the cached waveforms."""
+    digest = hashlib.sha256()
+    digest.update(cache_settings(dtype).encode())
+    for path, label in samples:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{label}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+class _SourceWaveforms(Dataset):
+    """Decodes the dataset's files (in DataLoader workers during a build)."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset.samples)
+
+    def __getitem__(self, idx):
+        return self.dataset.load_waveform(self.dataset.samples[idx][0], pad=False)[0]
+
+
+class WaveformCache:
+    """Read-only view of a built cache: `cache[i]` is a (samples,) float32 tensor."""
+
+    def __init__(self, array_path, manifest):
+        self.manifest = manifest
+        self.lengths = np.asarray(manifest["lengths"], dtype=np.int64)
+        # Copy-on-write map: rows wrap the page cache without a copy, and torch
+        # gets a writable buffer (a float16 cache is widened on access)
+        self.waveforms = np.load(array_path, mmap_mode="c")
+
+    def __len__(self):
+        return len(self.waveforms)
+
+    def __getitem__(self, idx):
+        row = self.waveforms[idx]
+        if row.dtype != np.float32:
+            row = row.astype(np.float32)
+        return torch.from_numpy(row)
+
+    @classmethod
+    def open_or_build(cls, dataset, cache_dir, dtype="float32", num_workers=0):
+        """Open the cache for dataset.samples in cache_dir, building it first if missing or stale."""
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown cache dtype {dtype!r}; expected one of {DTYPES}")
+        os.makedirs(cache_dir, exist_ok=True)
+        root = hashlib.sha256(os.path.abspath(dataset.root_dir).encode()).hexdigest()[:8]
+        prefix = f"{type(dataset).__name__.lower()}-{root}"
+        stem = os.path.join(cache_dir, f"{prefix}-{cache_key(dataset.samples, dtype)}")
+        if not os.path.exists(stem + ".json"):
+            build(dataset, stem, dtype, num_workers)
+            _remove_stale(cache_dir, prefix, keep=os.path.basename(stem), settings=cache_settings(dtype))
+        with open(stem + ".json") as f:
+            manifest = json.load(f)
+        return cls(stem + ".npy", manifest)
+
+
+def build(dataset, stem, dtype="float32", num_workers=0):
+    """Write stem.npy (N, MAX_AUDIO_SAMPLES) and then stem.json; a crash midway leaves no manifest."""
+    samples = dataset.samples
+    tmp_path = stem + ".npy.tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(len(samples), config.MAX_AUDIO_SAMPLES))
+    loader = DataLoader(_SourceWaveforms(dataset), batch_size=None, num_workers=num_workers)
+    lengths = []
+    for idx, waveform in enumerate(loader):
+        out[idx, :len(waveform)] = waveform.numpy()  # the rest stays zero (open_memmap zero-fills)
+        lengths.append(len(waveform))
+    out.flush()
+    del out
+    os.replace(tmp_path, stem + ".npy")
+    manifest = {
+        "sample_rate": config.SAMPLE_RATE,
+        "num_samples": config.MAX_AUDIO_SAMPLES,
+        "dtype": dtype,
+        "settings": cache_settings(dtype),
+        "paths": [path for path, _ in samples],
+        "labels": [label for _, label in samples],
+        "lengths": lengths,
+    }
+    with open(stem + ".json", "w") as f:
+        json.dump(manifest, f)
+
+
+def _remove_stale(cache_dir, prefix, keep, settings):
+    """
+    Drop earlier builds for the same dataset, root, dtype and config (i.e. of an
+    older file list) so stale caches do not pile up. Builds with another dtype
+    or config are still valid for those settings and are left alone.
+    """
+    for name in os.listdir(cache_dir):
+        if not name.startswith(prefix + "-") or not name.endswith(".json") or name.startswith(keep):
+            continue
+        stem = os.path.join(cache_dir, name[:-len(".json")])
+        try:
+            with open(stem + ".json") as f:
+                if json.load(f).get("settings") != settings:
+                    continue
+        except (OSError, ValueError):
+            continue
+        os.remove(stem + ".json")  # manifest first: a build without one is never opened
+        if os.path.exists(stem + ".npy"):
+            os.remove(stem + ".npy")